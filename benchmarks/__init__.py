@@ -0,0 +1,8 @@
+"""Synthetic dossiers and scaling benchmarks of the workflow scripts.
+
+Run the benchmarks with ``python -m benchmarks.runner``.
+"""
+
+from .generateur import ParametresGeneration, generer_dossier
+
+__all__ = ["ParametresGeneration", "generer_dossier"]
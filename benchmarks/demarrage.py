@@ -0,0 +1,134 @@
+"""Track the import cost of the command-line entry points.
+
+Usage::
+
+    python -m benchmarks.demarrage
+    python -m benchmarks.demarrage --repetitions 10 --sortie demarrage.json
+
+Each case runs in a fresh interpreter with ``python -X importtime``; the
+cumulative time of the top-level imports is compared with a budget, and the
+heavy dependencies that the case must not load (pandas, NumPy, openpyxl,
+and YAML for the bare CLI) are reported. The command exits with status
+``1`` when a budget is exceeded or such a dependency is loaded.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PAQUETS_DIFFERES = ("pandas", "numpy", "openpyxl")
+
+# python arguments, import budget in milliseconds, packages that must stay unloaded
+CAS: dict[str, tuple[list[str], float, tuple[str, ...]]] = {
+    "import main": (["-c", "import main"], 150.0, (*PAQUETS_DIFFERES, "yaml")),
+    "main --help": (["main.py", "--help"], 150.0, (*PAQUETS_DIFFERES, "yaml")),
+    "import workflow.logger": (["-c", "import workflow.logger"], 100.0, PAQUETS_DIFFERES),
+    "import core.objectifs": (["-c", "import core.objectifs"], 250.0, PAQUETS_DIFFERES),
+}
+
+
+def analyser_importtime(sortie: str) -> dict[str, tuple[int, int]]:
+    """Return ``{module: (self_us, cumulative_us)}`` from ``-X importtime`` output.
+
+    Module names are stripped of the indentation marking nested imports.
+    """
+    modules: dict[str, tuple[int, int]] = {}
+    for ligne in sortie.splitlines():
+        if not ligne.startswith("import time:") or "[us]" in ligne:
+            continue
+        propre, cumul, nom = ligne[len("import time:"):].split("|")
+        modules.setdefault(nom.strip(), (int(propre), int(cumul)))
+    return modules
+
+
+def _racines(sortie: str) -> list[str]:
+    """Return the modules imported at top level, not by another import."""
+    racines = []
+    for ligne in sortie.splitlines():
+        if ligne.startswith("import time:") and "[us]" not in ligne:
+            nom = ligne.split("|")[2]
+            if nom.startswith(" ") and not nom.startswith("  "):
+                racines.append(nom.strip())
+    return racines
+
+
+def mesurer_cas(
+    arguments: list[str], repetitions: int = 5, interdits: tuple[str, ...] = PAQUETS_DIFFERES
+) -> dict[str, Any]:
+    """Run ``python -X importtime <arguments>`` and summarise the imports.
+
+    Returns
+    -------
+    dict[str, Any]
+        Median and minimum total import time in milliseconds, the ten most
+        expensive modules of the last run and the ``interdits`` it loaded.
+    """
+    totaux = []
+    modules: dict[str, tuple[int, int]] = {}
+    for _ in range(repetitions):
+        resultat = subprocess.run(
+            [sys.executable, "-X", "importtime", *arguments],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        modules = analyser_importtime(resultat.stderr)
+        racines = _racines(resultat.stderr)
+        totaux.append(sum(modules[m][1] for m in racines) / 1000)
+    couteux = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:10]
+    return {
+        "mediane_ms": round(statistics.median(totaux), 2),
+        "min_ms": round(min(totaux), 2),
+        "modules": {nom: round(cumul / 1000, 2) for nom, (_, cumul) in couteux},
+        "differes_charges": sorted(p for p in interdits if p in modules),
+    }
+
+
+def lancer(repetitions: int = 5, cas: list[str] | None = None) -> dict[str, Any]:
+    """Measure every case of :data:`CAS` and check it against its budget."""
+    from benchmarks.runner import _version
+
+    resultats = {}
+    for nom, (arguments, budget, interdits) in CAS.items():
+        if cas and nom not in cas:
+            continue
+        mesure = mesurer_cas(arguments, repetitions, interdits)
+        mesure["budget_ms"] = budget
+        mesure["respecte"] = mesure["min_ms"] <= budget and not mesure["differes_charges"]
+        resultats[nom] = mesure
+        print(
+            f"{nom:<24} {mesure['mediane_ms']:>8.1f} ms (budget {budget:.0f})"
+            + (f"  charge {', '.join(mesure['differes_charges'])}"
+               if mesure["differes_charges"] else ""),
+            file=sys.stderr,
+        )
+    return {"version": _version(), "repetitions": repetitions, "resultats": resultats}
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point of ``python -m benchmarks.demarrage``."""
+    parser = argparse.ArgumentParser(description="Temps d'import des points d'entree")
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--cas", nargs="+", choices=list(CAS), help="Limit to these cases")
+    parser.add_argument(
+        "--sortie", type=Path, help="JSON report, logs/benchmarks/demarrage-<version>.json"
+    )
+    args = parser.parse_args(argv)
+
+    rapport = lancer(args.repetitions, args.cas)
+    sortie = args.sortie or ROOT / "logs" / "benchmarks" / f"demarrage-{rapport['version']}.json"
+    sortie.parent.mkdir(parents=True, exist_ok=True)
+    sortie.write_text(json.dumps(rapport, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Resultats ecrits dans {sortie}")
+    if not all(r["respecte"] for r in rapport["resultats"].values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
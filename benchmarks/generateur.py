@@ -0,0 +1,142 @@
+"""Generate realistic synthetic certification dossiers of any size.
+
+The workbooks mimic the real inputs of the scripts: same sheet and column
+names, applicability and criticity labels spelled with accent and case
+variants, a controlled rate of missing cells and of duplicated identifiers.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+from openpyxl import Workbook
+
+SHEET = "Liste_documentaire"
+OUI = ["Oui", "oui", "OUI", " Oui"]
+NON = ["Non", "non", "NON"]
+CRITICITES = ["Haute", "haute", "Élevée", "elevee", "ÉLEVÉE", "Moyenne", "Basse", "Faible"]
+COMMENTAIRES = [
+    "Point corrigé dans la version B",
+    "Résolu après revue",
+    "Pris en compte pour la prochaine livraison",
+    "À compléter",
+    "Référence manquante",
+    "Incohérence avec la spécification",
+]
+MOPS = ["T", "A", "I", "D", "T/A"]
+
+
+@dataclass(frozen=True)
+class ParametresGeneration:
+    """Shape of a synthetic dossier.
+
+    Parameters
+    ----------
+    lignes : int
+        Number of requirements; evidence and feedback sheets have as many rows.
+    taux_nuls : float
+        Probability that an optional cell (justification, MOP, evidence) is empty.
+    taux_doublons : float
+        Share of evidence rows reusing the identifier of another requirement.
+    taux_applicable : float
+        Share of applicable requirements.
+    graine : int
+        Seed of the random generator, for reproducible dossiers.
+    """
+
+    lignes: int = 1000
+    taux_nuls: float = 0.1
+    taux_doublons: float = 0.05
+    taux_applicable: float = 0.8
+    graine: int = 0
+
+
+def _ecrire(path: Path, colonnes: list[str], lignes: Iterable[tuple[object, ...]]) -> Path:
+    """Write ``lignes`` to a single-sheet workbook in streaming mode."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(SHEET)
+    sheet.append(colonnes)
+    for ligne in lignes:
+        sheet.append(ligne)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    workbook.save(path)
+    return path
+
+
+def _choix(rng: np.random.Generator, valeurs: list[str], n: int) -> list[str]:
+    return [valeurs[i] for i in rng.integers(0, len(valeurs), n)]
+
+
+def _avec_nuls(rng: np.random.Generator, valeurs: list[str], taux: float) -> list[str | None]:
+    nuls = rng.random(len(valeurs)) < taux
+    return [None if nul else valeur for valeur, nul in zip(valeurs, nuls)]
+
+
+def generer_dossier(repertoire: Path, parametres: ParametresGeneration) -> dict[str, Path]:
+    """Write ``exigences``, ``mop``, ``preuves`` and ``retours`` workbooks.
+
+    Parameters
+    ----------
+    repertoire : Path
+        Directory receiving the workbooks, typically ``<workspace>/data``.
+    parametres : ParametresGeneration
+        Size and data quality of the dossier.
+
+    Returns
+    -------
+    dict[str, Path]
+        Workbook paths keyed by name.
+    """
+    rng = np.random.default_rng(parametres.graine)
+    n = parametres.lignes
+    ids = [f"EX-{i:07d}" for i in range(n)]
+    applicable = rng.random(n) < parametres.taux_applicable
+    applicabilite = [
+        OUI[i % len(OUI)] if a else NON[i % len(NON)]
+        for i, a in zip(rng.integers(0, 12, n), applicable)
+    ]
+
+    justification = _avec_nuls(
+        rng, [f"Non applicable au lot {i % 7}" for i in range(n)], parametres.taux_nuls
+    )
+    justification = [None if a else j for a, j in zip(applicable, justification)]
+    fichiers = {
+        "exigences": _ecrire(
+            repertoire / "exigences.xlsx",
+            ["ID", "Libellé", "Applicabilité", "Justification non-applicabilité"],
+            zip(ids, (f"Exigence {i}" for i in range(n)), applicabilite, justification),
+        ),
+        "mop": _ecrire(
+            repertoire / "mop.xlsx",
+            ["ID", "Applicabilité", "MOP"],
+            zip(ids, applicabilite, _avec_nuls(rng, _choix(rng, MOPS, n), parametres.taux_nuls)),
+        ),
+    }
+
+    ids_preuves = list(ids)
+    doublons = rng.random(n) < parametres.taux_doublons
+    for i in np.flatnonzero(doublons):
+        ids_preuves[i] = ids[rng.integers(0, n)]
+    fichiers["preuves"] = _ecrire(
+        repertoire / "preuves.xlsx",
+        ["ID", "Applicabilité", "Preuve_conception", "Preuve_test"],
+        zip(
+            ids_preuves,
+            applicabilite,
+            _avec_nuls(rng, [f"DOC-{i}" for i in range(n)], parametres.taux_nuls),
+            _avec_nuls(rng, [f"TST-{i}" for i in range(n)], parametres.taux_nuls),
+        ),
+    )
+    fichiers["retours"] = _ecrire(
+        repertoire / "retours.xlsx",
+        ["Exigence", "Commentaire", "Criticité"],
+        zip(
+            _choix(rng, ids, n),
+            _choix(rng, COMMENTAIRES, n),
+            _choix(rng, CRITICITES, n),
+        ),
+    )
+    return fichiers
@@ -0,0 +1,252 @@
+"""Time the workflow scripts on synthetic dossiers of increasing size.
+
+Usage::
+
+    python -m benchmarks.runner --tailles 1000 10000 100000 --repetitions 3
+    python -m benchmarks.runner --comparer ancien.json nouveau.json
+
+Each function is timed on a cold cache (parsed workbooks are dropped before
+every repetition) and the end-to-end pipeline runs every step script on the
+synthetic workspace. Results are written as JSON, tagged with the commit and
+library versions, so that two runs can be compared with ``--comparer``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.generateur import ParametresGeneration, generer_dossier  # noqa: E402
+from scripts.analyse_retours import compute_impact  # noqa: E402
+from scripts.cache import WORKBOOK_CACHE  # noqa: E402
+from scripts.check_exigences import verify_exigences  # noqa: E402
+from scripts.check_mop import check_mop  # noqa: E402
+from scripts.check_preuves import check_preuves, exigences_sans_preuves  # noqa: E402
+from scripts.gerer_retours import extract_critiques, update_traitement  # noqa: E402
+from scripts.synthese_retours import synthese_retours  # noqa: E402
+from scripts.validation import evaluer  # noqa: E402
+from workflow import CertificationDossier, WorkflowCertifEngine  # noqa: E402
+
+DEFAULT_TAILLES = [1_000, 10_000, 100_000]
+
+
+def _cas(data: Path, travail: Path) -> dict[str, Callable[[], Any]]:
+    """Return the benchmarked calls on the workbooks of ``data``."""
+
+    def traitement() -> Any:
+        copie = travail / "retours.xlsx"
+        shutil.copyfile(data / "retours.xlsx", copie)
+        return update_traitement(copie, mode="cellules")
+
+    return {
+        "verify_exigences": lambda: verify_exigences(data / "exigences.xlsx"),
+        "check_mop": lambda: check_mop(data / "mop.xlsx"),
+        "check_preuves": lambda: check_preuves(data / "preuves.xlsx"),
+        "exigences_sans_preuves": lambda: exigences_sans_preuves(
+            data / "exigences.xlsx", data / "preuves.xlsx"
+        ),
+        "validation": lambda: evaluer(
+            {nom: data / f"{nom}.xlsx" for nom in ("exigences", "mop", "preuves")}
+        ),
+        "compute_impact": lambda: compute_impact(data / "retours.xlsx"),
+        "extract_critiques": lambda: extract_critiques(data / "retours.xlsx"),
+        "update_traitement": traitement,
+        "synthese_retours": lambda: synthese_retours(
+            data / "retours.xlsx", travail / "synthese.xlsx"
+        ),
+    }
+
+
+def _pipeline(espace: Path, cfg: Path) -> Callable[[], Any]:
+    """Return a call running every step script on ``espace``, failures included."""
+    engine = WorkflowCertifEngine()
+    engine.charger_workflow(cfg)
+    dossier = CertificationDossier("BENCH", espace / "data", espace_travail=espace)
+
+    def executer() -> list[bool]:
+        return [etape.executer(dossier) for etape in engine.etapes]
+
+    return executer
+
+
+def _mesurer(appel: Callable[[], Any], repetitions: int) -> dict[str, Any]:
+    """Return the timings of ``repetitions`` cold calls of ``appel``."""
+    durees = []
+    resultat: Any = None
+    for _ in range(repetitions):
+        WORKBOOK_CACHE.clear()
+        debut = time.perf_counter()
+        resultat = appel()
+        durees.append(time.perf_counter() - debut)
+    mesure: dict[str, Any] = {
+        "secondes": [round(d, 6) for d in durees],
+        "min": round(min(durees), 6),
+        "mediane": round(statistics.median(durees), 6),
+    }
+    if isinstance(resultat, pd.DataFrame):
+        mesure["lignes_resultat"] = len(resultat)
+    return mesure
+
+
+def _version() -> str:
+    """Return the current commit, or ``"inconnue"`` outside a git checkout."""
+    try:
+        sortie = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnue"
+    return sortie.stdout.strip()
+
+
+def lancer_benchmarks(
+    tailles: list[int],
+    repetitions: int = 3,
+    parametres: ParametresGeneration | None = None,
+    pipeline: bool = True,
+    cfg: Path = ROOT / "workflow_certif.yaml",
+    fonctions: list[str] | None = None,
+) -> dict[str, Any]:
+    """Generate a dossier per size, time every function and return the report.
+
+    Parameters
+    ----------
+    tailles : list[int]
+        Numbers of requirements of the generated dossiers.
+    repetitions : int
+        Timed calls per function and size.
+    parametres : ParametresGeneration | None
+        Data quality of the dossiers; ``lignes`` is overridden by each size.
+    pipeline : bool
+        Also time the end-to-end execution of the step scripts.
+    cfg : Path
+        Workflow YAML file used for the end-to-end run.
+    fonctions : list[str] | None
+        Restrict the benchmark to these functions.
+
+    Returns
+    -------
+    dict[str, Any]
+        Report with the environment and one record per size and function.
+    """
+    parametres = parametres or ParametresGeneration()
+    resultats = []
+    with tempfile.TemporaryDirectory(prefix="bench-certif-") as tmp:
+        for taille in tailles:
+            espace = Path(tmp) / str(taille)
+            travail = espace / "travail"
+            travail.mkdir(parents=True)
+            debut = time.perf_counter()
+            generer_dossier(espace / "data", replace(parametres, lignes=taille))
+            generation = time.perf_counter() - debut
+
+            cas = _cas(espace / "data", travail)
+            if pipeline:
+                cas["pipeline"] = _pipeline(espace, cfg)
+            for nom, appel in cas.items():
+                if fonctions and nom not in fonctions:
+                    continue
+                mesure = _mesurer(appel, repetitions)
+                resultats.append({"taille": taille, "fonction": nom, **mesure})
+                print(f"{taille:>9} {nom:<24} {mesure['mediane']:.3f}s", file=sys.stderr)
+            resultats.append(
+                {"taille": taille, "fonction": "generation", "mediane": round(generation, 6)}
+            )
+
+    return {
+        "version": _version(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plateforme": platform.platform(),
+        "repetitions": repetitions,
+        "parametres": {
+            "taux_nuls": parametres.taux_nuls,
+            "taux_doublons": parametres.taux_doublons,
+            "taux_applicable": parametres.taux_applicable,
+            "graine": parametres.graine,
+        },
+        "resultats": resultats,
+    }
+
+
+def comparer(ancien: dict[str, Any], nouveau: dict[str, Any]) -> list[dict[str, Any]]:
+    """Return the median ratio ``nouveau / ancien`` of every common measurement."""
+    index = {(r["taille"], r["fonction"]): r["mediane"] for r in ancien["resultats"]}
+    lignes = []
+    for record in nouveau["resultats"]:
+        avant = index.get((record["taille"], record["fonction"]))
+        if avant:
+            lignes.append(
+                {
+                    "taille": record["taille"],
+                    "fonction": record["fonction"],
+                    "avant": avant,
+                    "apres": record["mediane"],
+                    "ratio": round(record["mediane"] / avant, 3),
+                }
+            )
+    return lignes
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point of ``python -m benchmarks.runner``."""
+    parser = argparse.ArgumentParser(description="Benchmarks du workflow de certification")
+    parser.add_argument("--tailles", type=int, nargs="+", default=DEFAULT_TAILLES)
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--taux-nuls", type=float, default=0.1)
+    parser.add_argument("--taux-doublons", type=float, default=0.05)
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--fonctions", nargs="+", help="Limit the benchmark to these functions")
+    parser.add_argument("--sans-pipeline", action="store_true", help="Skip the end-to-end run")
+    parser.add_argument(
+        "--sortie", type=Path, help="JSON report, logs/benchmarks/<version>.json by default"
+    )
+    parser.add_argument("--comparer", type=Path, nargs=2, metavar=("ANCIEN", "NOUVEAU"))
+    args = parser.parse_args(argv)
+
+    if args.comparer:
+        ancien, nouveau = (json.loads(p.read_text(encoding="utf-8")) for p in args.comparer)
+        for ligne in comparer(ancien, nouveau):
+            print(
+                f"{ligne['taille']:>9} {ligne['fonction']:<24} "
+                f"{ligne['avant']:.3f}s -> {ligne['apres']:.3f}s  x{ligne['ratio']}"
+            )
+        return
+
+    parametres = ParametresGeneration(
+        taux_nuls=args.taux_nuls, taux_doublons=args.taux_doublons, graine=args.graine
+    )
+    rapport = lancer_benchmarks(
+        args.tailles,
+        args.repetitions,
+        parametres,
+        not args.sans_pipeline,
+        fonctions=args.fonctions,
+    )
+    sortie = args.sortie or ROOT / "logs" / "benchmarks" / f"{rapport['version']}.json"
+    sortie.parent.mkdir(parents=True, exist_ok=True)
+    sortie.write_text(json.dumps(rapport, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Resultats ecrits dans {sortie}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,47 @@
-"""Core utilities for objective-based workflow management."""
+"""Core utilities for objective-based workflow management.
 
-from .objectifs import Objectif, ObjectifManager, objectif
+Public names are resolved lazily (PEP 562), like those of :mod:`workflow`.
+"""
 
-__all__ = ["Objectif", "ObjectifManager", "objectif"]
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .batch import EntreeLot as EntreeLot
+    from .batch import ResultatDossier as ResultatDossier
+    from .batch import lancer_lot as lancer_lot
+    from .batch import lire_manifeste as lire_manifeste
+    from .batch import resumer as resumer
+    from .objectifs import Objectif as Objectif
+    from .objectifs import ObjectifManager as ObjectifManager
+    from .objectifs import graphe_objectifs as graphe_objectifs
+    from .objectifs import objectif as objectif
+
+_EXPORTS = {
+    "Objectif": "objectifs",
+    "ObjectifManager": "objectifs",
+    "objectif": "objectifs",
+    "graphe_objectifs": "objectifs",
+    "EntreeLot": "batch",
+    "ResultatDossier": "batch",
+    "lancer_lot": "batch",
+    "lire_manifeste": "batch",
+    "resumer": "batch",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(nom: str) -> Any:
+    module = _EXPORTS.get(nom)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nom!r}")
+    valeur = getattr(importlib.import_module(f".{module}", __name__), nom)
+    globals()[nom] = valeur
+    return valeur
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_EXPORTS])
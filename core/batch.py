@@ -0,0 +1,203 @@
+"""Batch certification of many dossiers across processes."""
+
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List
+
+from workflow import CertificationDossier, WorkflowCertifEngine
+from workflow.logger import contexte
+from workflow.tracing import ecrire_fragment, span
+
+from .objectifs import ObjectifManager
+
+
+@dataclass
+class EntreeLot:
+    """Dossier listed in a batch manifest.
+
+    ``chemin`` is the dossier workspace, holding its own ``data/``, ``audit/``
+    and ``logs/`` directories so that dossiers can run side by side.
+    """
+
+    id: str
+    chemin: Path
+
+
+@dataclass
+class ResultatDossier:
+    """Result record of one dossier of a batch.
+
+    Parameters
+    ----------
+    id : str
+        Identifier of the dossier.
+    chemin : str
+        Directory of the dossier.
+    statut : str
+        Final dossier status, or ``"erreur"`` if processing crashed.
+    etapes : Dict[str, str]
+        Status of every workflow step.
+    objectifs : Dict[str, str]
+        Status of every objective.
+    duree : float
+        Processing time in seconds.
+    erreur : str
+        Error message when the processing failed.
+    """
+
+    id: str
+    chemin: str
+    statut: str
+    etapes: Dict[str, str] = field(default_factory=dict)
+    objectifs: Dict[str, str] = field(default_factory=dict)
+    duree: float = 0.0
+    erreur: str = ""
+
+
+def lire_manifeste(path: Path) -> List[EntreeLot]:
+    """Return the dossiers listed in a CSV or JSONL manifest.
+
+    Each record provides an ``id`` and a ``chemin`` (or ``path``). Relative
+    paths are resolved against the manifest directory.
+
+    Raises
+    ------
+    ValueError
+        If a record lacks the identifier or the path.
+    """
+    records: list[dict[str, Any]]
+    with path.open("r", encoding="utf-8") as fh:
+        if path.suffix.lower() in {".jsonl", ".json"}:
+            records = [json.loads(line) for line in fh if line.strip()]
+        else:
+            records = list(csv.DictReader(fh))
+
+    entrees = []
+    for numero, record in enumerate(records, start=1):
+        ident = str(record.get("id") or "").strip()
+        chemin = str(record.get("chemin") or record.get("path") or "").strip()
+        if not ident or not chemin:
+            raise ValueError(f"Entree {numero} invalide dans {path}: {record}")
+        chemin_dossier = Path(chemin)
+        if not chemin_dossier.is_absolute():
+            chemin_dossier = path.parent / chemin_dossier
+        entrees.append(EntreeLot(ident, chemin_dossier))
+    return entrees
+
+
+def traiter_dossier(
+    entree: EntreeLot, cfg: Path, obj_file: Path, workers: int = 1
+) -> ResultatDossier:
+    """Run the workflow then the objectives on one dossier.
+
+    Steps read and write inside the dossier workspace only. Failures are
+    captured in the returned record instead of being raised, so that one
+    dossier never stops the batch.
+    """
+    debut = time.perf_counter()
+    resultat = ResultatDossier(entree.id, str(entree.chemin), "erreur")
+    with contexte(dossier_id=entree.id), span(entree.id, "dossier") as details:
+        _traiter(entree, cfg, obj_file, workers, resultat)
+        details["statut"] = resultat.statut
+    # pool processes exit without running atexit hooks
+    ecrire_fragment()
+    resultat.duree = time.perf_counter() - debut
+    return resultat
+
+
+def _traiter(
+    entree: EntreeLot, cfg: Path, obj_file: Path, workers: int, resultat: ResultatDossier
+) -> None:
+    """Fill ``resultat`` by processing ``entree``; see :func:`traiter_dossier`."""
+    try:
+        engine = WorkflowCertifEngine()
+        engine.charger_workflow(cfg)
+        dossier = CertificationDossier(
+            entree.id, entree.chemin / "data", espace_travail=entree.chemin
+        )
+        try:
+            engine.lancer(dossier, workers=workers)
+        except RuntimeError as exc:
+            resultat.erreur = str(exc)
+        else:
+            manager = ObjectifManager(entree.chemin / "logs" / "objectifs.log")
+            manager.charger_yaml(obj_file)
+            manager.declencher(engine, dossier, workers=workers)
+            resultat.objectifs = {o.id: o.statut for o in manager.objectifs.values()}
+        resultat.etapes = {r.id: r.statut for r in engine.resultats}
+        resultat.statut = dossier.statut
+    except Exception as exc:  # keep the batch running whatever happens
+        logging.getLogger("workflow_certif").exception("Dossier %s en erreur", entree.id)
+        resultat.erreur = str(exc)
+
+
+def lancer_lot(
+    entrees: List[EntreeLot],
+    cfg: Path,
+    obj_file: Path,
+    concurrence: int = 1,
+    workers: int = 1,
+    sortie: Path | None = None,
+) -> List[ResultatDossier]:
+    """Process ``entrees`` in a pool of ``concurrence`` processes.
+
+    Parameters
+    ----------
+    entrees : List[EntreeLot]
+        Dossiers to certify.
+    cfg : Path
+        Workflow YAML file.
+    obj_file : Path
+        Objectives YAML file.
+    concurrence : int
+        Number of dossiers processed at the same time.
+    workers : int
+        Number of steps run concurrently inside each dossier.
+    sortie : Path | None
+        JSONL file receiving one record per dossier as soon as it completes.
+
+    Returns
+    -------
+    List[ResultatDossier]
+        Records in manifest order.
+    """
+    resultats: dict[int, ResultatDossier] = {}
+    fh = None
+    if sortie:
+        sortie.parent.mkdir(parents=True, exist_ok=True)
+        fh = sortie.open("w", encoding="utf-8")
+    try:
+        with ProcessPoolExecutor(max_workers=concurrence) as pool:
+            futures = {
+                pool.submit(traiter_dossier, entree, cfg, obj_file, workers): i
+                for i, entree in enumerate(entrees)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                resultats[index] = future.result()
+                if fh:
+                    fh.write(json.dumps(asdict(resultats[index]), ensure_ascii=False) + "\n")
+                    fh.flush()
+    finally:
+        if fh:
+            fh.close()
+    return [resultats[i] for i in range(len(entrees))]
+
+
+def resumer(resultats: List[ResultatDossier]) -> Dict[str, Any]:
+    """Return an aggregated summary of batch ``resultats``."""
+    statuts = Counter(r.statut for r in resultats)
+    return {
+        "total": len(resultats),
+        "statuts": dict(sorted(statuts.items())),
+        "echecs": [r.id for r in resultats if r.statut != "termine"],
+        "duree_cumulee": round(sum(r.duree for r in resultats), 3),
+    }
@@ -2,19 +2,30 @@
 
 from __future__ import annotations
 
-import logging
+import contextvars
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Callable, Dict, List
-
-import yaml
+from typing import Any, Callable, Dict, Iterable, List
 
 from workflow import CertificationDossier, WorkflowCertifEngine
+from workflow.configuration import compiler
+from workflow.instantane import InstantaneFS
+from workflow.logger import configurer_journal
+from workflow.scheduler import chemins_chevauchent
+from workflow.steps import EtapeWorkflow
+from workflow.tracing import span
 
 
 @dataclass
 class Objectif:
-    """Represent a certification objective."""
+    """Represent a certification objective.
+
+    ``objectifs_requis`` lists the objectives that must be ``atteint`` before
+    this one starts; ``etapes_requises`` lists workflow steps (ids or script
+    paths) run, memoised, before the actions.
+    """
 
     id: str
     nom: str = ""
@@ -23,38 +34,57 @@ class Objectif:
     actions: List[str] = field(default_factory=list)
     resultats_attendus: List[Dict[str, Any]] = field(default_factory=list)
     criticite: str = ""
+    objectifs_requis: List[str] = field(default_factory=list)
+    etapes_requises: List[str] = field(default_factory=list)
     statut: str = field(default="non_declenche", init=False)
 
-    def preconditions_ok(self, engine: WorkflowCertifEngine) -> bool:
-        """Return ``True`` if every precondition is satisfied."""
+    def preconditions_ok(
+        self, engine: WorkflowCertifEngine, dossier: CertificationDossier | None = None
+    ) -> bool:
+        """Return ``True`` if every precondition is satisfied.
+
+        File preconditions are resolved against the workspace of ``dossier``
+        and checked against the filesystem snapshot of ``engine``.
+        """
+        racine = dossier.racine if dossier else Path(".")
         for pre in self.preconditions:
             if pre in engine.etapes_dict:
                 continue
-            if not Path(pre).exists():
+            if not engine.fs.existe(racine / pre):
                 return False
         return True
 
     def executer(self, engine: WorkflowCertifEngine, dossier: CertificationDossier) -> bool:
         """Run objective actions through ``engine``."""
+        with span(self.id, "objectif", dossier_id=dossier.id) as details:
+            self.statut = self._executer_actions(engine, dossier)
+            details["statut"] = self.statut
+        return self.statut == "atteint"
+
+    def _executer_actions(
+        self, engine: WorkflowCertifEngine, dossier: CertificationDossier
+    ) -> str:
+        """Run the actions and return the resulting status."""
         self.statut = "en_cours"
-        for act in self.actions:
-            step = engine.etapes_dict.get(act)
+        for act in [*self.etapes_requises, *self.actions]:
+            step = engine.trouver_etape(act)
             if not step:
                 continue
-            if not step.executer(dossier):
-                self.statut = "bloque"
-                return False
-        if self.resultats_valides():
-            self.statut = "atteint"
-        else:
-            self.statut = "bloque"
-        return self.statut == "atteint"
+            if not engine.executer_etape(step, dossier):
+                return "bloque"
+        return "atteint" if self.resultats_valides(dossier.racine, engine.fs) else "bloque"
 
-    def resultats_valides(self) -> bool:
-        """Check expected results presence."""
+    def resultats_valides(
+        self, racine: Path = Path("."), fs: InstantaneFS | None = None
+    ) -> bool:
+        """Check expected results presence under the workspace ``racine``.
+
+        Existence is answered by the snapshot ``fs`` when given.
+        """
+        existe = fs.existe if fs else os.path.exists
         for res in self.resultats_attendus:
-            path = Path(res.get("fichier", ""))
-            if res.get("existe") and not path.exists():
+            path = racine / res.get("fichier", "")
+            if res.get("existe") and not existe(path):
                 return False
         return True
 
@@ -64,6 +94,9 @@ class Objectif:
         resultats = list(data.get("resultats_attendus", []))
         if not resultats and data.get("output_attendu"):
             resultats = [{"fichier": data["output_attendu"], "existe": True}]
+        dependances = data.get("dependances") or {}
+        if not isinstance(dependances, dict):
+            dependances = {"objectifs": dependances}
         return Objectif(
             id=identifier,
             nom=data.get("nom", ""),
@@ -72,53 +105,263 @@ class Objectif:
             actions=list(data.get("actions", [])),
             resultats_attendus=resultats,
             criticite=data.get("criticite", ""),
+            objectifs_requis=list(dependances.get("objectifs", [])),
+            etapes_requises=list(dependances.get("etapes", [])),
+        )
+
+
+def graphe_objectifs(objectifs: Dict[str, Objectif]) -> Dict[str, List[str]]:
+    """Return, for each objective, the objectives it depends on.
+
+    Raises
+    ------
+    ValueError
+        If a dependency is unknown or the dependencies form a cycle.
+    """
+    graphe = {ident: list(dict.fromkeys(o.objectifs_requis)) for ident, o in objectifs.items()}
+    for ident, deps in graphe.items():
+        inconnus = [d for d in deps if d not in graphe]
+        if inconnus:
+            raise ValueError(f"Objectif {ident}: dependance inconnue {', '.join(inconnus)}")
+
+    # iterative depth-first search, ``chemin`` holds the objectives being visited
+    etats: Dict[str, int] = {}
+    for racine in graphe:
+        if racine in etats:
+            continue
+        chemin = [racine]
+        a_visiter = [iter(graphe[racine])]
+        etats[racine] = 1
+        while a_visiter:
+            suivant = next(a_visiter[-1], None)
+            if suivant is None:
+                etats[chemin.pop()] = 2
+                a_visiter.pop()
+            elif etats.get(suivant) == 1:
+                cycle = chemin[chemin.index(suivant):] + [suivant]
+                raise ValueError(f"Cycle de dependances: {' -> '.join(cycle)}")
+            elif suivant not in etats:
+                etats[suivant] = 1
+                chemin.append(suivant)
+                a_visiter.append(iter(graphe[suivant]))
+    return graphe
+
+
+def _ancetres(graphe: Dict[str, List[str]], cibles: Iterable[str]) -> set[str]:
+    """Return ``cibles`` and every objective they transitively depend on."""
+    resultat: set[str] = set()
+    a_visiter = list(cibles)
+    while a_visiter:
+        courant = a_visiter.pop()
+        if courant not in resultat:
+            resultat.add(courant)
+            a_visiter.extend(graphe[courant])
+    return resultat
+
+
+def _en_conflit(a: List[EtapeWorkflow], b: List[EtapeWorkflow]) -> bool:
+    """Return ``True`` if steps of ``a`` and ``b`` cannot run side by side.
+
+    A step reading, through its ``preconditions``, a path written by the
+    ``outputs`` of a step of the other list is a conflict. A step shared by
+    both lists is not: the engine runs it once per dossier.
+    """
+    return any(
+        x is not y
+        and any(
+            chemins_chevauchent(p, o)
+            for lectures, ecritures in ((x.preconditions, y.outputs), (y.preconditions, x.outputs))
+            for p in lectures
+            for o in ecritures
         )
+        for x in a
+        for y in b
+    )
+
+
+@dataclass(frozen=True)
+class CatalogueObjectifs:
+    """Compiled objectives file: definitions in file order and their graph."""
+
+    definitions: tuple[tuple[str, Dict[str, Any]], ...]
+    graphe: Dict[str, List[str]]
+
+    @staticmethod
+    def depuis(donnees: Dict[str, Any]) -> "CatalogueObjectifs":
+        """Build the catalogue from its compiled data."""
+        definitions = tuple((ident, data) for ident, data in donnees["objectifs"])
+        return CatalogueObjectifs(definitions, donnees["graphe"])
+
+
+def compiler_objectifs(data: Any, chemin: Path) -> Dict[str, Any]:
+    """Validate a parsed objectives file and return its compiled data.
+
+    Raises
+    ------
+    ValueError
+        If a dependency is unknown or the dependencies form a cycle.
+    """
+    items: list[tuple[str, Dict[str, Any]]] = []
+    if isinstance(data, list):
+        items = [(item.get("id", ""), item) for item in data]
+    elif isinstance(data, dict):
+        if "objectifs" in data:
+            items = list(data.get("objectifs", {}).items())
+        else:
+            items = list(data.items())
+    items = [(ident, obj_data) for ident, obj_data in items if ident]
+    try:
+        graphe = graphe_objectifs({i: Objectif.from_dict(i, d) for i, d in items})
+    except ValueError as exc:
+        raise ValueError(f"{chemin}: {exc}") from exc
+    return {"objectifs": [[ident, obj_data] for ident, obj_data in items], "graphe": graphe}
+
+
+def charger_catalogue(chemin: Path) -> CatalogueObjectifs:
+    """Return the compiled objectives of ``chemin``."""
+    return compiler(chemin, "objectifs", compiler_objectifs, CatalogueObjectifs.depuis)
 
 
 class ObjectifManager:
-    """Manage a collection of :class:`Objectif` instances."""
+    """Manage a collection of :class:`Objectif` instances.
+
+    Without ``log_file``, the records go to ``logs/objectifs.log`` of the
+    workspace of the dossier given to :meth:`declencher`, of the current
+    directory before that.
+    """
 
     def __init__(self, log_file: Path | None = None) -> None:
         self.objectifs: Dict[str, Objectif] = {}
-        log_file = log_file or Path("logs/objectifs.log")
-        log_file.parent.mkdir(parents=True, exist_ok=True)
-        logging.basicConfig(
-            filename=log_file,
-            level=logging.INFO,
-            format="%(asctime)s - %(levelname)s - %(message)s",
+        self.graphe: Dict[str, List[str]] = {}
+        self.log_file = log_file
+        self._logger = configurer_journal(
+            log_file or Path("logs/objectifs.log"), "objectif_manager"
         )
-        self._logger = logging.getLogger("objectif_manager")
 
     def charger_yaml(self, yaml_path: Path) -> None:
-        """Load objectives definitions from ``yaml_path``."""
-        with yaml_path.open("r", encoding="utf-8") as fh:
-            data = yaml.safe_load(fh) or {}
-
-        items: list[tuple[str, Dict[str, Any]]] = []
-        if isinstance(data, list):
-            items = [(item.get("id", ""), item) for item in data]
-        elif isinstance(data, dict):
-            if "objectifs" in data:
-                items = list(data.get("objectifs", {}).items())
-            else:
-                items = list(data.items())
-
-        for ident, obj_data in items:
-            if not ident:
-                continue
+        """Load objectives definitions from ``yaml_path``, compiled and cached."""
+        catalogue = charger_catalogue(yaml_path)
+        nouveaux = not self.objectifs
+        for ident, obj_data in catalogue.definitions:
             self.objectifs[ident] = Objectif.from_dict(ident, obj_data)
+        self.graphe = dict(catalogue.graphe) if nouveaux else graphe_objectifs(self.objectifs)
         self._logger.info("%d objectifs charges", len(self.objectifs))
 
-    def declencher(self, engine: WorkflowCertifEngine, dossier: CertificationDossier) -> None:
-        """Trigger all objectives sequentially."""
+    def declencher(
+        self,
+        engine: WorkflowCertifEngine,
+        dossier: CertificationDossier,
+        workers: int = 1,
+        cibles: Iterable[str] | None = None,
+    ) -> None:
+        """Trigger the objectives, independent ones concurrently.
+
+        Parameters
+        ----------
+        engine : WorkflowCertifEngine
+            Engine running the steps; shared steps run once per dossier.
+        dossier : CertificationDossier
+            Dossier processed by the objectives.
+        workers : int
+            Maximum number of objectives running at the same time. An
+            objective starts as soon as its ``objectifs_requis`` are
+            ``atteint``; it is ``bloque`` if one of them is not. It also
+            waits for the running objectives whose steps write what its own
+            steps read, or read what they write.
+        cibles : Iterable[str] | None
+            Only trigger these objectives and the ones they depend on.
+
+        Raises
+        ------
+        ValueError
+            If the dependencies are unknown or cyclic.
+        """
+        if workers < 1:
+            raise ValueError("workers doit etre superieur ou egal a 1")
+        if self.log_file is None:
+            self._logger = configurer_journal(
+                dossier.racine / "logs" / "objectifs.log", "objectif_manager"
+            )
+        if self.graphe.keys() == self.objectifs.keys():
+            graphe = self.graphe
+        else:  # objectives added or removed after loading
+            graphe = graphe_objectifs(self.objectifs)
         for obj in self.objectifs.values():
-            if not obj.preconditions_ok(engine):
+            inconnues = [e for e in obj.etapes_requises if engine.trouver_etape(e) is None]
+            if inconnues:
+                raise ValueError(f"Objectif {obj.id}: etape inconnue {', '.join(inconnues)}")
+        retenus = _ancetres(graphe, cibles) if cibles is not None else set(graphe)
+        ordre = [ident for ident in self.objectifs if ident in retenus]
+        etapes: Dict[str, List[EtapeWorkflow]] = {}
+        for ident in ordre:
+            obj = self.objectifs[ident]
+            references = [*obj.etapes_requises, *obj.actions]
+            etapes[ident] = [e for e in map(engine.trouver_etape, references) if e is not None]
+        for ident in ordre:
+            self.objectifs[ident].statut = "non_declenche"
+        restants = {ident: set(graphe[ident]) for ident in ordre}
+        prets = [ident for ident in ordre if not restants[ident]]
+        en_cours: Dict[Future[None], str] = {}
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while prets or en_cours:
+                while prets and len(en_cours) < workers:
+                    ident = next(
+                        (
+                            i
+                            for i in prets
+                            if not any(_en_conflit(etapes[i], etapes[j]) for j in en_cours.values())
+                        ),
+                        None,
+                    )
+                    if ident is None:  # every ready objective waits for a running one
+                        break
+                    prets.remove(ident)
+                    obj = self.objectifs[ident]
+                    contexte = contextvars.copy_context()
+                    future = pool.submit(contexte.run, self._declencher_un, obj, engine, dossier)
+                    en_cours[future] = obj.id
+                termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+                for future in termines:
+                    ident = en_cours.pop(future)
+                    atteint = self.objectifs[ident].statut == "atteint"
+                    for suivant in ordre:
+                        if ident not in restants[suivant]:
+                            continue
+                        restants[suivant].discard(ident)
+                        if not atteint:
+                            self._bloquer(suivant, ident, restants)
+                        elif not restants[suivant] and suivant not in prets:
+                            prets.append(suivant)
+                prets.sort(key=ordre.index)
+
+    def _declencher_un(
+        self, obj: Objectif, engine: WorkflowCertifEngine, dossier: CertificationDossier
+    ) -> None:
+        """Check the preconditions of ``obj`` then execute it."""
+        try:
+            if not obj.preconditions_ok(engine, dossier):
                 obj.statut = "bloque"
                 self._logger.warning("Preconditions manquantes pour %s", obj.id)
-                continue
+                return
             self._logger.info("Execution objectif %s", obj.id)
             obj.executer(engine, dossier)
-            self._logger.info("Statut %s: %s", obj.id, obj.statut)
+        except Exception:  # one objective never stops the others
+            obj.statut = "bloque"
+            self._logger.exception("Erreur objectif %s", obj.id)
+        self._logger.info("Statut %s: %s", obj.id, obj.statut)
+
+    def _bloquer(self, ident: str, cause: str, restants: Dict[str, set[str]]) -> None:
+        """Block ``ident`` and its dependents because ``cause`` was not reached."""
+        a_bloquer = [ident]
+        while a_bloquer:
+            courant = a_bloquer.pop()
+            if self.objectifs[courant].statut == "bloque":
+                continue
+            self.objectifs[courant].statut = "bloque"
+            restants[courant] = {cause}
+            self._logger.warning("Objectif %s bloque: %s non atteint", courant, cause)
+            a_bloquer.extend(j for j, deps in restants.items() if courant in deps)
 
     def rapport(self) -> str:
         """Return a synthetic status report."""
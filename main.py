@@ -1,20 +1,29 @@
-"""Command-line interface for the certification workflow."""
+"""Command-line interface for the certification workflow.
+
+The workflow, its compiled configuration and pandas are imported by the
+subcommands that use them, so that ``--help`` and light invocations start
+quickly; see ``python -m benchmarks.demarrage``.
+"""
 
 from __future__ import annotations
 
 import argparse
+import json
+import os
+import sys
 from pathlib import Path
 import subprocess
+from typing import TYPE_CHECKING
 
-from workflow import CertificationDossier, WorkflowCertifEngine
-from core import ObjectifManager
-import yaml
+if TYPE_CHECKING:
+    from workflow import ResultatEtape
 
 
 def load_workflow(yaml_path: Path) -> dict:
-    """Return the parsed YAML configuration."""
-    with yaml_path.open("r", encoding="utf-8") as fh:
-        return yaml.safe_load(fh)
+    """Return the parsed YAML configuration, cached by content hash."""
+    from workflow.configuration import lire_yaml
+
+    return lire_yaml(yaml_path)
 
 
 def run_step(step: dict) -> int:
@@ -26,34 +35,129 @@ def run_step(step: dict) -> int:
     return result.returncode
 
 
-def run_pipeline(cfg: Path, obj_file: Path, dossier_id: str, dossier_path: Path) -> None:
+def run_pipeline(
+    cfg: Path,
+    obj_file: Path,
+    dossier_id: str,
+    dossier_path: Path,
+    workers: int = 1,
+    etat: Path | None = None,
+    force: bool = False,
+    espace: Path | None = None,
+) -> None:
     """Run the workflow then evaluate objectives."""
-    engine = WorkflowCertifEngine()
+    from core import ObjectifManager
+    from workflow import CertificationDossier, WorkflowCertifEngine
+
+    engine = WorkflowCertifEngine(fichier_etat=etat)
     engine.charger_workflow(cfg)
-    dossier = CertificationDossier(dossier_id, dossier_path)
-    engine.lancer(dossier)
+    dossier = CertificationDossier(dossier_id, dossier_path, espace_travail=espace)
+    engine.lancer(dossier, workers=workers, force=force)
 
-    manager = ObjectifManager(Path("logs/objectifs.log"))
+    manager = ObjectifManager(dossier.racine / "logs" / "objectifs.log")
     manager.charger_yaml(obj_file)
-    manager.declencher(engine, dossier)
+    manager.declencher(engine, dossier, workers=workers)
 
 
 def run_objectif(
-    name: str, cfg: Path, objectifs_file: Path, dossier_id: str, dossier_path: Path
+    name: str,
+    cfg: Path,
+    objectifs_file: Path,
+    dossier_id: str,
+    dossier_path: Path,
+    workers: int = 1,
 ) -> None:
     """Run steps adaptively to reach ``name`` objective."""
+    from core import ObjectifManager
+    from workflow import CertificationDossier, WorkflowCertifEngine
+
     engine = WorkflowCertifEngine()
     engine.charger_workflow(cfg)
     dossier = CertificationDossier(dossier_id, dossier_path)
 
-    manager = ObjectifManager(Path("logs/objectifs.log"))
+    manager = ObjectifManager(dossier.racine / "logs" / "objectifs.log")
     manager.charger_yaml(objectifs_file)
-    obj = manager.objectifs.get(name)
-    if not obj:
+    if name not in manager.objectifs:
         raise ValueError(f"Objectif inconnu: {name}")
-    if obj.preconditions_ok(engine):
-        obj.executer(engine, dossier)
-    manager._logger.info("Statut %s: %s", obj.id, obj.statut)
+    manager.declencher(engine, dossier, workers=workers, cibles=[name])
+
+
+def run_watch(
+    cfg: Path,
+    dossier_id: str,
+    dossier_path: Path,
+    etat: Path | None = None,
+    espace: Path | None = None,
+    intervalle: float = 0.5,
+    delai: float = 0.3,
+) -> None:
+    """Watch ``dossier_path`` and re-run the affected steps until interrupted."""
+    from workflow import CertificationDossier, WorkflowCertifEngine
+    from workflow.surveillance import Surveillance
+
+    engine = WorkflowCertifEngine(fichier_etat=etat)
+    engine.charger_workflow(cfg)
+    dossier = CertificationDossier(dossier_id, dossier_path, espace_travail=espace)
+
+    def rapporter(resultats: list[ResultatEtape]) -> None:
+        for r in resultats:
+            suffixe = " (inchangee)" if r.reutilise else f" en {r.duree:.2f}s"
+            print(f"{r.id}: {r.statut}{suffixe}", flush=True)
+        print(f"Dossier {dossier.id}: {dossier.statut}", flush=True)
+
+    surveillance = Surveillance(engine, dossier, intervalle, delai, rapporter)
+    print(f"Surveillance de {dossier_path} (Ctrl+C pour arreter)", flush=True)
+    try:
+        surveillance.surveiller()
+    except KeyboardInterrupt:
+        surveillance.arreter()
+
+
+def run_batch(
+    manifest: Path,
+    cfg: Path,
+    obj_file: Path,
+    concurrence: int,
+    workers: int = 1,
+    sortie: Path | None = None,
+) -> dict:
+    """Certify every dossier of ``manifest`` in parallel and return the summary."""
+    from core import lancer_lot, lire_manifeste, resumer
+
+    entrees = lire_manifeste(manifest)
+    resultats = lancer_lot(entrees, cfg, obj_file, concurrence, workers, sortie)
+    return resumer(resultats)
+
+
+def precompute_cache(paths: list[Path], cache_dir: Path, max_bytes: int) -> int:
+    """Write the sidecars of every workbook in ``paths`` and return their count.
+
+    Besides the full sheet, the projections the scripts read from a workbook
+    of the same name (the audit rules, the feedback analysis) are written.
+    """
+    from scripts import analyse_retours, validation
+    from scripts.cache import configure_sidecar
+    from scripts.utils import DEFAULT_SHEETS, read_first_sheet, read_sheet
+
+    # the audit rules cache the raw values of their columns
+    schemas = {
+        Path(chemin).name: [validation.schema_classeur(classeur).untyped()]
+        for classeur, chemin in validation.CLASSEURS.items()
+    }
+    schemas.setdefault(analyse_retours.DATA_FILE.name, []).append(analyse_retours.SCHEMA)
+
+    configure_sidecar(cache_dir, max_bytes)
+    workbooks: list[Path] = []
+    for path in paths:
+        workbooks.extend(sorted(path.rglob("*.xlsx")) if path.is_dir() else [path])
+    for workbook in workbooks:
+        read_first_sheet(workbook, DEFAULT_SHEETS)
+        for schema in schemas.get(workbook.name, []):
+            try:
+                read_sheet(workbook, schema, DEFAULT_SHEETS)
+            except KeyError:  # the rules report the missing columns when run
+                continue
+    return len(workbooks)
 
 
 def run_main(yaml_file: str) -> None:
@@ -76,6 +180,29 @@ def main() -> None:
     p_pipeline.add_argument("--objectifs", default="config/objectifs.yaml")
     p_pipeline.add_argument("--dossier", default="CAF001")
     p_pipeline.add_argument("--chemin", default="data")
+    p_pipeline.add_argument(
+        "--espace", help="Dossier workspace holding data/, audit/ and logs/"
+    )
+    p_pipeline.add_argument(
+        "--workers", type=int, default=1, help="Number of steps and objectives run concurrently"
+    )
+    p_pipeline.add_argument(
+        "--etat",
+        default="logs/etat_workflow.json",
+        help="Run-state file used to skip unchanged steps",
+    )
+    p_pipeline.add_argument(
+        "--force", action="store_true", help="Run every step, even unchanged ones"
+    )
+    p_pipeline.add_argument(
+        "--cache-dir", help="Directory of persistent workbook sidecars used by the steps"
+    )
+    p_pipeline.add_argument(
+        "--chunk-size", type=int, help="Stream workbooks in chunks of this many rows"
+    )
+    p_pipeline.add_argument(
+        "--trace", help="Directory receiving the Chrome trace of the run"
+    )
 
     p_obj = sub.add_parser("objectif", help="Run workflow to reach an objective")
     p_obj.add_argument("name")
@@ -83,13 +210,103 @@ def main() -> None:
     p_obj.add_argument("--objectifs", default="objectifs.yaml")
     p_obj.add_argument("--dossier", default="CAF001")
     p_obj.add_argument("--chemin", default="data")
+    p_obj.add_argument("--workers", type=int, default=1, help="Objectives run concurrently")
+
+    p_watch = sub.add_parser("watch", help="Re-run the affected steps when data files change")
+    p_watch.add_argument("--yaml", default="workflow_certif.yaml")
+    p_watch.add_argument("--dossier", default="CAF001")
+    p_watch.add_argument("--chemin", default="data")
+    p_watch.add_argument("--espace", help="Dossier workspace holding data/, audit/ and logs/")
+    p_watch.add_argument("--etat", default="logs/etat_workflow.json")
+    p_watch.add_argument("--intervalle", type=float, default=0.5, help="Seconds between polls")
+    p_watch.add_argument(
+        "--delai", type=float, default=0.3, help="Seconds a change must settle before a run"
+    )
+    p_watch.add_argument("--trace", help="Directory receiving the Chrome trace of the session")
+
+    p_batch = sub.add_parser("batch", help="Certify the dossiers listed in a manifest")
+    p_batch.add_argument("manifest", help="CSV or JSONL file with id and chemin fields")
+    p_batch.add_argument("--yaml", default="workflow_certif.yaml")
+    p_batch.add_argument("--objectifs", default="config/objectifs.yaml")
+    p_batch.add_argument(
+        "--concurrence", type=int, default=os.cpu_count() or 1, help="Dossiers run in parallel"
+    )
+    p_batch.add_argument("--workers", type=int, default=1, help="Steps run in parallel per dossier")
+    p_batch.add_argument("--sortie", default="logs/batch_resultats.jsonl")
+    p_batch.add_argument("--trace", help="Directory receiving the Chrome trace of the run")
+
+    p_cache = sub.add_parser("precompute-cache", help="Warm the workbook sidecar cache")
+    p_cache.add_argument("chemins", nargs="*", default=["data"])
+    p_cache.add_argument("--cache-dir", default=".cache/classeurs")
+    p_cache.add_argument("--max-bytes", type=int, default=1 << 30)
 
     args = parser.parse_args()
+    if getattr(args, "trace", None):
+        from workflow.tracing import activer_trace
+
+        activer_trace(Path(args.trace), args.mode)
+    try:
+        _executer(args)
+    finally:
+        # tracing is only loaded, possibly from CERTIF_TRACE_DIR, by the runs using it
+        tracing = sys.modules.get("workflow.tracing")
+        trace = tracing.ecrire_trace() if tracing else None
+        if trace:
+            print(f"Trace ecrite dans {trace}")
+
+
+def _executer(args: argparse.Namespace) -> None:
+    """Run the subcommand selected by ``args``."""
+    if args.mode == "precompute-cache":
+        count = precompute_cache(
+            [Path(p) for p in args.chemins], Path(args.cache_dir), args.max_bytes
+        )
+        print(f"{count} classeur(s) en cache dans {args.cache_dir}")
+        return
+    if args.mode == "batch":
+        summary = run_batch(
+            Path(args.manifest),
+            Path(args.yaml),
+            Path(args.objectifs),
+            args.concurrence,
+            args.workers,
+            Path(args.sortie),
+        )
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        if summary["echecs"]:
+            raise SystemExit(1)
+        return
+
     chemin = Path(args.chemin)
     if args.mode == "pipeline":
-        run_pipeline(Path(args.yaml), Path(args.objectifs), args.dossier, chemin)
+        if args.cache_dir:
+            os.environ["CERTIF_CACHE_DIR"] = args.cache_dir
+        if args.chunk_size:
+            os.environ["CERTIF_CHUNK_SIZE"] = str(args.chunk_size)
+        run_pipeline(
+            Path(args.yaml),
+            Path(args.objectifs),
+            args.dossier,
+            chemin,
+            args.workers,
+            Path(args.etat),
+            args.force,
+            Path(args.espace) if args.espace else None,
+        )
+    elif args.mode == "watch":
+        run_watch(
+            Path(args.yaml),
+            args.dossier,
+            chemin,
+            Path(args.etat),
+            Path(args.espace) if args.espace else None,
+            args.intervalle,
+            args.delai,
+        )
     else:
-        run_objectif(args.name, Path(args.yaml), Path(args.objectifs), args.dossier, chemin)
+        run_objectif(
+            args.name, Path(args.yaml), Path(args.objectifs), args.dossier, chemin, args.workers
+        )
 
 
 if __name__ == "__main__":
@@ -8,29 +8,33 @@ from pathlib import Path
 
 import pandas as pd
 
-from .utils import DEFAULT_SHEETS, find_column, read_first_sheet
+from workflow.logger import configurer_journal
+from workflow.tracing import trace
 
-LOG_FILE = Path("logs/analyse_retours.log")
-REPORT_FILE = Path("audit/impact_retours.csv")
-DATA_FILE = Path("data/retours.xlsx")
+from .normalisation import CRITICITE, poids
+from .schema import CRITICITE_COL, SheetSchema
+from .utils import DEFAULT_SHEETS, read_sheet, workspace_path, write_csv
+
+LOG_FILE = workspace_path("logs/analyse_retours.log")
+REPORT_FILE = workspace_path("audit/impact_retours.csv")
+DATA_FILE = workspace_path("data/retours.xlsx")
+
+SCHEMA = SheetSchema.of(criticite=CRITICITE_COL)
+WEIGHTS = {"haute": 3, "moyenne": 2, "basse": 1}
 
 
 def setup_logger() -> None:
-    """Configure file-based logging.
+    """Configure JSON-lines logging through the shared workflow queue.
 
     Returns
     -------
     None
         The logger is configured for this module.
     """
-    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        filename=LOG_FILE,
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-    )
+    configurer_journal(LOG_FILE, nom=None)
 
 
+@trace("regle")
 def compute_impact(filepath: Path) -> pd.DataFrame:
     """Return weighted impact summary from evaluator feedback.
 
@@ -45,18 +49,16 @@ def compute_impact(filepath: Path) -> pd.DataFrame:
         DataFrame with columns ``Criticite``, ``Occurrences`` and ``Poids`` with
         a final row ``Score global``.
     """
-    df = read_first_sheet(filepath, DEFAULT_SHEETS)
-
-    criticity_col = find_column(df, [r"^Criticité$"], [r"critic"])
-    mapping = {"haute": 3, "moyenne": 2, "basse": 1}
+    df = read_sheet(filepath, SCHEMA, DEFAULT_SHEETS)
+    criticity = df[SCHEMA.resolve(df.columns)["criticite"]]
 
-    counts = (
-        df[criticity_col].str.lower().value_counts().rename_axis("Criticite")
-    )
-    summary = counts.rename("Occurrences").reset_index()
-    summary["Poids"] = summary["Criticite"].str.lower().map(mapping).fillna(0).astype(int)
+    counts = criticity.value_counts()
+    counts = counts[counts > 0]
+    counts.index = counts.index.astype(str)
+    summary = counts.rename_axis("Criticite").rename("Occurrences").reset_index()
+    summary["Poids"] = summary["Criticite"].map(WEIGHTS).fillna(0).astype(int)
 
-    global_score = int(df[criticity_col].str.lower().map(mapping).fillna(0).sum())
+    global_score = int(poids(criticity, CRITICITE, WEIGHTS).sum())
     summary.loc[len(summary)] = ["Score global", global_score, ""]
     return summary
 
@@ -86,8 +88,7 @@ def main() -> None:
         sys.exit(1)
 
     try:
-        REPORT_FILE.parent.mkdir(parents=True, exist_ok=True)
-        report.to_csv(REPORT_FILE, index=False)
+        write_csv(report, REPORT_FILE)
     except Exception as exc:
         logging.exception("Erreur lors de l'ecriture du rapport: %s", exc)
         sys.exit(1)
@@ -0,0 +1,362 @@
+"""Incremental zip archives of a directory.
+
+The writer emits every entry sequentially, sizes and CRC being known before
+its local header is written, so the output never needs to be seekable and can
+be a pipe. A JSON manifest of content hashes kept next to the archive lets a
+rebuild copy the compressed bytes of unchanged files from the previous
+archive instead of compressing them again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+#: Suffixes of formats that are already compressed and stored as they are.
+COMPRESSED_SUFFIXES = frozenset(
+    {
+        ".zip", ".xlsx", ".xlsm", ".docx", ".pptx", ".odt", ".ods", ".odp",
+        ".gz", ".bz2", ".xz", ".7z", ".png", ".jpg", ".jpeg", ".gif", ".mp4",
+    }
+)
+MANIFEST_SUFFIX = ".manifest.json"
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+COMPRESS_LEVEL = 6
+_BLOCK = 1 << 20
+_ZIP_LIMIT = 0xFFFFFFFF
+_UTF8_FLAG = 0x800
+_LOCAL = struct.Struct("<4s2B4HL2L2H")
+_CENTRAL = struct.Struct("<4s4B4HL2L5H2L")
+_END = struct.Struct("<4s4H2LH")
+
+
+@dataclass
+class FileEntry:
+    """File of the source directory with its fingerprint.
+
+    Parameters
+    ----------
+    path : Path
+        File on disk.
+    arcname : str
+        Name inside the archive, with ``/`` separators.
+    sha256 : str
+        Digest of the content.
+    crc : int
+        CRC-32 of the content.
+    size : int
+        Size in bytes.
+    mtime_ns : int
+        Modification time, used to reuse the manifest digest.
+    """
+
+    path: Path
+    arcname: str
+    sha256: str
+    crc: int
+    size: int
+    mtime_ns: int
+
+    def manifest(self) -> dict[str, object]:
+        """Return the manifest record of the entry."""
+        return {
+            "sha256": self.sha256,
+            "crc": self.crc,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+        }
+
+
+@dataclass
+class ArchiveStats:
+    """Counters of an archive build.
+
+    Parameters
+    ----------
+    compressed : int
+        Entries deflated during the build.
+    stored : int
+        Already compressed entries stored as they are.
+    reused : int
+        Entries copied from the previous archive.
+    unchanged : bool
+        ``True`` when the archive was up to date and left untouched.
+    """
+
+    compressed: int = 0
+    stored: int = 0
+    reused: int = 0
+    unchanged: bool = False
+
+
+def manifest_path(archive: Path) -> Path:
+    """Return the manifest file kept next to ``archive``."""
+    return archive.with_name(archive.name + MANIFEST_SUFFIX)
+
+
+def load_manifest(archive: Path) -> dict[str, dict[str, object]]:
+    """Return the manifest of ``archive``, empty if missing or unreadable."""
+    try:
+        return json.loads(manifest_path(archive).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def scan(source: Path, manifest: dict[str, dict[str, object]]) -> list[FileEntry]:
+    """Return the files of ``source`` sorted by archive name.
+
+    Files whose size and modification time match ``manifest`` are not read
+    again; the others are hashed in a single pass computing both digests.
+    """
+    entries = []
+    for path in sorted(p for p in source.rglob("*") if p.is_file()):
+        arcname = path.relative_to(source).as_posix()
+        stat = path.stat()
+        state = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        known = manifest.get(arcname)
+        if known and all(known.get(k) == v for k, v in state.items()):
+            sha256, crc = str(known["sha256"]), int(known["crc"])
+            entries.append(FileEntry(path, arcname, sha256, crc, **state))
+            continue
+        digest, crc = hashlib.sha256(), 0
+        with path.open("rb") as fh:
+            for block in iter(lambda: fh.read(_BLOCK), b""):
+                digest.update(block)
+                crc = zlib.crc32(block, crc)
+        entries.append(FileEntry(path, arcname, digest.hexdigest(), crc, **state))
+    return entries
+
+
+def _deflate(path: Path) -> bytes:
+    """Return the raw deflate stream of ``path``; zlib releases the GIL."""
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15)
+    chunks = []
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(_BLOCK), b""):
+            chunks.append(compressor.compress(block))
+    chunks.append(compressor.flush())
+    return b"".join(chunks)
+
+
+def _dos_time(mtime_ns: int) -> tuple[int, int]:
+    """Return the DOS time and date fields of ``mtime_ns``."""
+    t = time.localtime(mtime_ns / 1e9)
+    year = max(t.tm_year, 1980)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class _SequentialZip:
+    """Minimal zip writer that never seeks in its output."""
+
+    def __init__(self, out: BinaryIO) -> None:
+        self.out = out
+        self.offset = 0
+        self.central: list[bytes] = []
+
+    def _write(self, data: bytes) -> None:
+        self.out.write(data)
+        self.offset += len(data)
+
+    def add(
+        self,
+        name: str,
+        method: int,
+        crc: int,
+        csize: int,
+        size: int,
+        dos: tuple[int, int],
+        data: Iterator[bytes],
+    ) -> None:
+        """Write one entry whose ``data`` is already encoded with ``method``."""
+        if max(csize, size, self.offset) > _ZIP_LIMIT:
+            raise ValueError(f"Archive trop volumineuse pour le format zip standard: {name}")
+        encoded = name.encode("utf-8")
+        header_offset = self.offset
+        self._write(
+            _LOCAL.pack(
+                b"PK\x03\x04", 20, 0, _UTF8_FLAG, method, *dos, crc, csize, size, len(encoded), 0
+            )
+        )
+        self._write(encoded)
+        for block in data:
+            self._write(block)
+        self.central.append(
+            _CENTRAL.pack(
+                b"PK\x01\x02", 20, 3, 20, 0, _UTF8_FLAG, method, *dos, crc, csize, size,
+                len(encoded), 0, 0, 0, 0, 0o100644 << 16, header_offset,
+            )
+            + encoded
+        )
+
+    def close(self) -> None:
+        """Write the central directory."""
+        if len(self.central) > 0xFFFF:
+            raise ValueError("Trop d'entrees pour le format zip standard")
+        start = self.offset
+        for record in self.central:
+            self._write(record)
+        size = self.offset - start
+        count = len(self.central)
+        self._write(_END.pack(b"PK\x05\x06", 0, 0, count, count, size, start, 0))
+        self.out.flush()
+
+
+def _read_file(path: Path) -> Iterator[bytes]:
+    """Yield the content of ``path`` block by block."""
+    with path.open("rb") as fh:
+        yield from iter(lambda: fh.read(_BLOCK), b"")
+
+
+def _read_raw(previous: BinaryIO, info: zipfile.ZipInfo) -> Iterator[bytes]:
+    """Yield the compressed bytes of ``info`` from the ``previous`` archive."""
+    previous.seek(info.header_offset)
+    header = _LOCAL.unpack(previous.read(_LOCAL.size))
+    previous.seek(header[-2] + header[-1], os.SEEK_CUR)
+    remaining = info.compress_size
+    while remaining:
+        block = previous.read(min(_BLOCK, remaining))
+        if not block:
+            raise ValueError(f"Archive precedente tronquee: {info.filename}")
+        remaining -= len(block)
+        yield block
+
+
+def build_archive(
+    source: Path,
+    out: BinaryIO,
+    previous: Path | None = None,
+    manifest: dict[str, dict[str, object]] | None = None,
+    workers: int = DEFAULT_WORKERS,
+    entries: list[FileEntry] | None = None,
+) -> tuple[dict[str, dict[str, object]], ArchiveStats]:
+    """Write a zip of ``source`` to ``out`` and return its manifest.
+
+    Parameters
+    ----------
+    source : Path
+        Directory to archive.
+    out : BinaryIO
+        Destination; written sequentially, so a pipe or socket works.
+    previous : Path | None
+        Previous archive whose entries are reused when unchanged.
+    manifest : dict | None
+        Manifest of ``previous``.
+    workers : int
+        Threads compressing entries in parallel.
+    entries : list[FileEntry] | None
+        Result of :func:`scan`, computed if omitted.
+
+    Returns
+    -------
+    tuple[dict, ArchiveStats]
+        Manifest of the new archive and build counters.
+    """
+    manifest = manifest or {}
+    entries = scan(source, manifest) if entries is None else entries
+    stats = ArchiveStats()
+    reusable: dict[str, zipfile.ZipInfo] = {}
+    previous_fh: BinaryIO | None = None
+    if previous and previous.exists() and manifest:
+        try:
+            with zipfile.ZipFile(previous) as old:
+                infos = {info.filename: info for info in old.infolist()}
+        except zipfile.BadZipFile as exc:
+            logging.warning("Archive precedente illisible %s: %s", previous, exc)
+            infos = {}
+        for entry in entries:
+            info = infos.get(entry.arcname)
+            known = manifest.get(entry.arcname)
+            if info and known and known.get("sha256") == entry.sha256 and info.CRC == entry.crc:
+                reusable[entry.arcname] = info
+        if reusable:
+            previous_fh = previous.open("rb")
+
+    writer = _SequentialZip(out)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            pending: deque[tuple[FileEntry, Future[bytes] | None]] = deque()
+
+            def emit(entry: FileEntry, future: Future[bytes] | None) -> None:
+                dos = _dos_time(entry.mtime_ns)
+                info = reusable.get(entry.arcname)
+                if info is not None:
+                    stats.reused += 1
+                    writer.add(
+                        entry.arcname, info.compress_type, info.CRC, info.compress_size,
+                        info.file_size, dos, _read_raw(previous_fh, info),
+                    )
+                elif future is None:
+                    stats.stored += 1
+                    writer.add(
+                        entry.arcname, zipfile.ZIP_STORED, entry.crc, entry.size, entry.size,
+                        dos, _read_file(entry.path),
+                    )
+                else:
+                    data = future.result()
+                    stats.compressed += 1
+                    writer.add(
+                        entry.arcname, zipfile.ZIP_DEFLATED, entry.crc, len(data), entry.size,
+                        dos, iter((data,)),
+                    )
+
+            for entry in entries:
+                future = None
+                compressible = entry.path.suffix.lower() not in COMPRESSED_SUFFIXES
+                if entry.arcname not in reusable and compressible:
+                    future = pool.submit(_deflate, entry.path)
+                pending.append((entry, future))
+                # bound the compressed data held in memory
+                while len(pending) > 2 * max(1, workers):
+                    emit(*pending.popleft())
+            while pending:
+                emit(*pending.popleft())
+        writer.close()
+    finally:
+        if previous_fh:
+            previous_fh.close()
+    return {entry.arcname: entry.manifest() for entry in entries}, stats
+
+
+def update_archive(source: Path, archive: Path, workers: int = DEFAULT_WORKERS) -> ArchiveStats:
+    """Bring ``archive`` up to date with ``source``.
+
+    The archive is left untouched when the manifest shows no change.
+    Otherwise it is rebuilt into a temporary file, reusing the compressed
+    entries of unchanged files, then atomically replaced with its manifest.
+    """
+    manifest = load_manifest(archive) if archive.exists() else {}
+    entries = scan(source, manifest)
+    current = {entry.arcname: entry.manifest() for entry in entries}
+    if archive.exists() and current == manifest:
+        logging.info("Archive %s deja a jour", archive)
+        return ArchiveStats(unchanged=True)
+
+    archive.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=archive.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            manifest, stats = build_archive(source, fh, archive, manifest, workers, entries)
+        os.replace(tmp, archive)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    manifest_path(archive).write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+    logging.info(
+        "Archive %s: %d compressees, %d stockees, %d reutilisees",
+        archive, stats.compressed, stats.stored, stats.reused,
+    )
+    return stats
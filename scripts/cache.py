@@ -0,0 +1,273 @@
+"""Process-wide and persistent caches of parsed workbooks."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Hashable
+
+import pandas as pd
+
+DEFAULT_MAXSIZE = 16
+DEFAULT_SIDECAR_BYTES = 1 << 30
+SIDECAR_SUFFIX = ".pk5"
+_MAGIC = b"WBSIDE01"
+_ALIGN = 64
+
+
+def _copy_on_write() -> bool:
+    """Return ``True`` if pandas Copy-on-Write semantics are active."""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.options.mode.copy_on_write is True
+
+
+def _view(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of ``df`` that callers may modify freely.
+
+    Under Copy-on-Write a shallow copy is enough: data is only duplicated
+    when one side is modified. Otherwise a deep copy protects the cache.
+    """
+    return df.copy(deep=not _copy_on_write())
+
+
+class WorkbookCache:
+    """Bounded LRU cache of parsed sheets.
+
+    Entries are keyed by the resolved path, the size and modification time of
+    the file and the requested sheets, so a modified workbook is never served
+    from the cache.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of cached sheets.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE) -> None:
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple[Hashable, ...], pd.DataFrame] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(path: Path, *extra: Hashable) -> tuple[Hashable, ...]:
+        """Return the cache key of ``path`` for its current state on disk."""
+        stat = path.stat()
+        return (str(path.resolve()), stat.st_size, stat.st_mtime_ns, *extra)
+
+    def get_or_load(
+        self, path: Path, extra: tuple[Hashable, ...], loader: Callable[[], pd.DataFrame]
+    ) -> pd.DataFrame:
+        """Return the cached sheet for ``path`` or load it with ``loader``."""
+        key = self.key(path, *extra)
+        with self._lock:
+            df = self._entries.get(key)
+            if df is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _view(df)
+            self.misses += 1
+
+        df = loader()
+        with self._lock:
+            self._entries[key] = df
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return _view(df)
+
+    def invalidate(self, path: Path) -> None:
+        """Drop every cached sheet read from ``path``."""
+        resolved = str(path.resolve())
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == resolved]:
+                del self._entries[key]
+        logging.debug("Cache invalide pour %s", path)
+
+    def clear(self) -> None:
+        """Empty the cache."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def _padding(offset: int) -> int:
+    """Return the number of bytes aligning ``offset`` on ``_ALIGN``."""
+    return -offset % _ALIGN
+
+
+def content_hash(path: Path) -> str:
+    """Return the SHA-256 digest of the content of ``path``."""
+    h = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class SidecarCache:
+    """Persistent binary sidecars of parsed sheets.
+
+    Sheets are serialised with pickle protocol 5, array buffers being stored
+    out-of-band and aligned so that a later read memory-maps the file instead
+    of re-parsing the workbook. Sidecars are keyed by the SHA-256 of the
+    workbook content and the requested sheet, and the directory is kept
+    under ``max_bytes`` by evicting the least recently used files.
+
+    Parameters
+    ----------
+    directory : Path
+        Directory holding the sidecar files.
+    max_bytes : int
+        Maximum total size of the sidecar files.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_SIDECAR_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._hashes: dict[tuple[str, int, int], str] = {}
+
+    def sidecar_path(self, path: Path, extra: tuple[Hashable, ...]) -> Path:
+        """Return the sidecar file of ``path`` for the ``extra`` key."""
+        stat = path.stat()
+        state = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+        digest = self._hashes.get(state)
+        if digest is None:
+            digest = self._hashes[state] = content_hash(path)
+        suffix = hashlib.sha256(repr(extra).encode("utf-8")).hexdigest()[:16]
+        return self.directory / f"{digest}-{suffix}{SIDECAR_SUFFIX}"
+
+    def load(
+        self, path: Path, extra: tuple[Hashable, ...], loader: Callable[[], pd.DataFrame]
+    ) -> pd.DataFrame:
+        """Return the sheet from its sidecar, creating it with ``loader`` if absent."""
+        sidecar = self.sidecar_path(path, extra)
+        if sidecar.exists():
+            try:
+                df = self.read(sidecar)
+                os.utime(sidecar)
+                logging.debug("Sidecar utilise pour %s: %s", path, sidecar)
+                return df
+            except (OSError, ValueError, pickle.UnpicklingError) as exc:
+                logging.warning("Sidecar illisible %s: %s", sidecar, exc)
+        df = loader()
+        try:
+            self.write(sidecar, df)
+            self.evict()
+        except OSError as exc:
+            logging.warning("Ecriture du sidecar impossible %s: %s", sidecar, exc)
+        return df
+
+    def write(self, sidecar: Path, df: pd.DataFrame) -> None:
+        """Serialise ``df`` into ``sidecar`` atomically."""
+        buffers: list[pickle.PickleBuffer] = []
+        payload = pickle.dumps(df, protocol=5, buffer_callback=buffers.append)
+        raws = [buf.raw() for buf in buffers]
+
+        header = _MAGIC + struct.pack("<QI", len(payload), len(raws))
+        header += b"".join(struct.pack("<Q", raw.nbytes) for raw in raws)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(header)
+                fh.write(payload)
+                offset = len(header) + len(payload)
+                for raw in raws:
+                    fh.write(b"\0" * _padding(offset))
+                    offset += _padding(offset)
+                    fh.write(raw)
+                    offset += raw.nbytes
+            os.replace(tmp, sidecar)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def read(sidecar: Path) -> pd.DataFrame:
+        """Load a sheet from ``sidecar`` through a private memory map.
+
+        The map is copy-on-write, so arrays are writable without touching the
+        file and pages are only read when accessed.
+        """
+        with sidecar.open("rb") as fh:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_COPY)
+        view = memoryview(mapped)
+        if bytes(view[: len(_MAGIC)]) != _MAGIC:
+            raise ValueError(f"Sidecar invalide: {sidecar}")
+        offset = len(_MAGIC)
+        payload_len, count = struct.unpack_from("<QI", view, offset)
+        offset += struct.calcsize("<QI")
+        sizes = struct.unpack_from(f"<{count}Q", view, offset)
+        offset += 8 * count
+        payload = view[offset : offset + payload_len]
+        offset += payload_len
+        buffers = []
+        for size in sizes:
+            offset += _padding(offset)
+            buffers.append(view[offset : offset + size])
+            offset += size
+        return pickle.loads(payload, buffers=buffers)
+
+    def evict(self) -> None:
+        """Delete least recently used sidecars until under ``max_bytes``."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SIDECAR_SUFFIX):
+                stat = entry.stat()
+                files.append((stat.st_mtime_ns, stat.st_size, Path(entry.path)))
+        total = sum(size for _, size, _ in files)
+        for _, size, file in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                file.unlink()
+                total -= size
+            except OSError as exc:  # still mapped on some platforms
+                logging.debug("Eviction impossible %s: %s", file, exc)
+
+
+def configure_sidecar(
+    directory: Path | None, max_bytes: int = DEFAULT_SIDECAR_BYTES
+) -> SidecarCache | None:
+    """Enable persistent sidecars in ``directory``, or disable them with ``None``."""
+    global SIDECAR_CACHE
+    SIDECAR_CACHE = SidecarCache(directory, max_bytes) if directory else None
+    return SIDECAR_CACHE
+
+
+WORKBOOK_CACHE = WorkbookCache()
+SIDECAR_CACHE: SidecarCache | None = None
+if os.environ.get("CERTIF_CACHE_DIR"):
+    configure_sidecar(
+        Path(os.environ["CERTIF_CACHE_DIR"]),
+        int(os.environ.get("CERTIF_CACHE_MAX_BYTES", DEFAULT_SIDECAR_BYTES)),
+    )
+
+
+def load_sheet(
+    path: Path, extra: tuple[Hashable, ...], loader: Callable[[], pd.DataFrame]
+) -> pd.DataFrame:
+    """Return a sheet through the in-memory cache, then the sidecars, then ``loader``."""
+    sidecar = SIDECAR_CACHE
+    if sidecar is None:
+        return WORKBOOK_CACHE.get_or_load(path, extra, loader)
+    return WORKBOOK_CACHE.get_or_load(
+        path, extra, lambda: sidecar.load(path, extra, loader)
+    )
+
+
+def invalidate_cache(path: Path) -> None:
+    """Invalidate cached sheets of ``path`` after writing to it."""
+    WORKBOOK_CACHE.invalidate(path)
@@ -2,7 +2,8 @@
 
 The script implements step ``check_exigences`` defined in
 ``workflow_certif.yaml``. It reads ``data/exigences.xlsx`` and exports all
-non-conforming rows to ``audit/exigences_incompletes.csv``.
+non-conforming rows to ``audit/exigences_incompletes.csv``. The rule itself
+is ``exigences_incompletes`` of :mod:`scripts.validation`.
 """
 
 from __future__ import annotations
@@ -13,29 +14,31 @@ from pathlib import Path
 
 import pandas as pd
 
-from .utils import DEFAULT_SHEETS, find_column, read_first_sheet
+from workflow.logger import configurer_journal
+from workflow.tracing import trace
 
-LOG_FILE = Path("logs/check_exigences.log")
-AUDIT_FILE = Path("audit/exigences_incompletes.csv")
-DATA_FILE = Path("data/exigences.xlsx")
+from .utils import CHUNK_SIZE, workspace_path, write_csv
+from .validation import evaluer_regle, flux_violations
+
+LOG_FILE = workspace_path("logs/check_exigences.log")
+AUDIT_FILE = workspace_path("audit/exigences_incompletes.csv")
+DATA_FILE = workspace_path("data/exigences.xlsx")
+
+RULE = "exigences_incompletes"
 
 
 def setup_logger() -> None:
-    """Configure file-based logging.
+    """Configure JSON-lines logging through the shared workflow queue.
 
     Returns
     -------
     None
         This function only configures the logger.
     """
-    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        filename=LOG_FILE,
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-    )
+    configurer_journal(LOG_FILE, nom=None)
 
 
+@trace("regle")
 def verify_exigences(filepath: Path) -> pd.DataFrame:
     """Return non-conforming rows from the requirements file.
 
@@ -47,29 +50,30 @@ def verify_exigences(filepath: Path) -> pd.DataFrame:
     Returns
     -------
     pandas.DataFrame
-        DataFrame of rows where applicability is ``Oui`` and justification is
-        missing.
+        Identifier, applicability and justification of the rows where
+        applicability is ``Oui`` and justification is missing.
     """
-    df = read_first_sheet(filepath, DEFAULT_SHEETS)
+    return evaluer_regle(RULE, exigences=filepath)
 
-    try:
-        applicability_col = find_column(
-            df,
-            [r"^Applicabilit[ée]$", r"^Applicability$"],
-            [r"applicab"],
-        )
-        justification_col = find_column(
-            df,
-            [r"Justification\s+non-applicabilit[ée]"],
-            [r"justification"],
-        )
-    except KeyError as exc:
-        raise KeyError(f"Colonnes manquantes: {exc}") from exc
 
-    mask = (
-        df[applicability_col].str.lower() == "oui"
-    ) & df[justification_col].isna()
-    return df.loc[mask]
+def verify_exigences_chunks(filepath: Path, audit_file: Path, chunksize: int) -> int:
+    """Stream the requirements file and write non-conforming rows to ``audit_file``.
+
+    Parameters
+    ----------
+    filepath : Path
+        Path to the Excel file containing the requirements.
+    audit_file : Path
+        CSV file receiving the non-conforming rows.
+    chunksize : int
+        Number of rows held in memory at once.
+
+    Returns
+    -------
+    int
+        Number of non-conforming rows.
+    """
+    return flux_violations(RULE, filepath, audit_file, chunksize)
 
 
 def main() -> None:
@@ -88,7 +92,13 @@ def main() -> None:
 
     logging.info("Lecture du fichier: %s", DATA_FILE)
     try:
-        invalid_rows = verify_exigences(DATA_FILE)
+        if CHUNK_SIZE:
+            count = verify_exigences_chunks(DATA_FILE, AUDIT_FILE, CHUNK_SIZE)
+        else:
+            invalid_rows = verify_exigences(DATA_FILE)
+            count = len(invalid_rows)
+            if count:
+                write_csv(invalid_rows, AUDIT_FILE)
     except KeyError as exc:
         logging.error("%s", exc)
         sys.exit(1)
@@ -96,12 +106,8 @@ def main() -> None:
         logging.exception("Erreur lors de la lecture du fichier: %s", exc)
         sys.exit(1)
 
-    if not invalid_rows.empty:
-        AUDIT_FILE.parent.mkdir(parents=True, exist_ok=True)
-        invalid_rows.to_csv(AUDIT_FILE, index=False)
-        logging.warning(
-            "Exigences non conformes detectees: %d", len(invalid_rows)
-        )
+    if count:
+        logging.warning("Exigences non conformes detectees: %d", count)
         sys.exit(1)
 
     logging.info("Aucune anomalie detectee")
@@ -1,4 +1,7 @@
-"""Check the presence of MOP for each applicable requirement."""
+"""Check the presence of MOP for each applicable requirement.
+
+Entry point of the ``mop_manquants`` rule of :mod:`scripts.validation`.
+"""
 
 from __future__ import annotations
 
@@ -8,29 +11,31 @@ from pathlib import Path
 
 import pandas as pd
 
-from .utils import DEFAULT_SHEETS, find_column, read_first_sheet
+from workflow.logger import configurer_journal
+from workflow.tracing import trace
+
+from .utils import CHUNK_SIZE, workspace_path, write_csv
+from .validation import evaluer_regle, flux_violations
 
-LOG_FILE = Path("logs/check_mop.log")
-AUDIT_FILE = Path("audit/mop_manquants.csv")
-DATA_FILE = Path("data/mop.xlsx")
+LOG_FILE = workspace_path("logs/check_mop.log")
+AUDIT_FILE = workspace_path("audit/mop_manquants.csv")
+DATA_FILE = workspace_path("data/mop.xlsx")
+
+RULE = "mop_manquants"
 
 
 def setup_logger() -> None:
-    """Configure file-based logging.
+    """Configure JSON-lines logging through the shared workflow queue.
 
     Returns
     -------
     None
         The logger is configured for this module.
     """
-    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        filename=LOG_FILE,
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-    )
+    configurer_journal(LOG_FILE, nom=None)
 
 
+@trace("regle")
 def check_mop(filepath: Path) -> pd.DataFrame:
     """Return rows with missing MOP.
 
@@ -42,22 +47,29 @@ def check_mop(filepath: Path) -> pd.DataFrame:
     Returns
     -------
     pandas.DataFrame
-        DataFrame of requirements lacking a MOP.
+        Identifier, applicability and MOP of the requirements lacking a MOP.
     """
-    df = read_first_sheet(filepath, DEFAULT_SHEETS)
+    return evaluer_regle(RULE, mop=filepath)
 
-    try:
-        app_col = find_column(
-            df,
-            [r"^Applicabilit[ée]$", r"^Applicability$"],
-            [r"applicab"],
-        )
-        mop_col = find_column(df, [r"^MOP$"], [r"moyen.*preuve"])
-    except KeyError as exc:
-        raise KeyError(f"Colonnes manquantes: {exc}") from exc
 
-    mask = (df[app_col].str.lower() == "oui") & df[mop_col].isna()
-    return df.loc[mask]
+def check_mop_chunks(filepath: Path, audit_file: Path, chunksize: int) -> int:
+    """Stream the MOP file and write rows lacking a MOP to ``audit_file``.
+
+    Parameters
+    ----------
+    filepath : Path
+        Path to the Excel file describing the MOP.
+    audit_file : Path
+        CSV file receiving the rows lacking a MOP.
+    chunksize : int
+        Number of rows held in memory at once.
+
+    Returns
+    -------
+    int
+        Number of rows lacking a MOP.
+    """
+    return flux_violations(RULE, filepath, audit_file, chunksize)
 
 
 def main() -> None:
@@ -76,7 +88,13 @@ def main() -> None:
 
     logging.info("Lecture du fichier: %s", DATA_FILE)
     try:
-        invalid_rows = check_mop(DATA_FILE)
+        if CHUNK_SIZE:
+            count = check_mop_chunks(DATA_FILE, AUDIT_FILE, CHUNK_SIZE)
+        else:
+            invalid_rows = check_mop(DATA_FILE)
+            count = len(invalid_rows)
+            if count:
+                write_csv(invalid_rows, AUDIT_FILE)
     except KeyError as exc:
         logging.error("%s", exc)
         sys.exit(1)
@@ -84,10 +102,8 @@ def main() -> None:
         logging.exception("Erreur lors de la lecture du fichier: %s", exc)
         sys.exit(1)
 
-    if not invalid_rows.empty:
-        AUDIT_FILE.parent.mkdir(parents=True, exist_ok=True)
-        invalid_rows.to_csv(AUDIT_FILE, index=False)
-        logging.warning("MOP manquants: %d", len(invalid_rows))
+    if count:
+        logging.warning("MOP manquants: %d", count)
         sys.exit(1)
 
     logging.info("Tous les MOP sont renseignes")
@@ -1,4 +1,9 @@
-"""Validate design and test evidence for each applicable requirement."""
+"""Validate design and test evidence for each applicable requirement.
+
+Entry point of the ``preuves_manquantes`` and ``exigences_sans_preuves``
+rules of :mod:`scripts.validation`, evaluated on a single parse of each
+workbook.
+"""
 
 from __future__ import annotations
 
@@ -8,31 +13,33 @@ from pathlib import Path
 
 import pandas as pd
 
-from .utils import DEFAULT_SHEETS, find_column, read_first_sheet
+from workflow.logger import configurer_journal
+from workflow.tracing import trace
+
+from .utils import CHUNK_SIZE, workspace_path
+from .validation import ecrire, evaluer, evaluer_regle, flux_violations
 
-LOG_FILE = Path("logs/check_preuves.log")
-AUDIT_FILE = Path("audit/preuves_manquantes.csv")
-EXIG_AUDIT_FILE = Path("audit/exigences_sans_preuves.csv")
-PREUVES_FILE = Path("data/preuves.xlsx")
-EXIG_FILE = Path("data/exigences.xlsx")
+LOG_FILE = workspace_path("logs/check_preuves.log")
+AUDIT_FILE = workspace_path("audit/preuves_manquantes.csv")
+PREUVES_FILE = workspace_path("data/preuves.xlsx")
+EXIG_FILE = workspace_path("data/exigences.xlsx")
+
+RULE = "preuves_manquantes"
+EXIG_RULE = "exigences_sans_preuves"
 
 
 def setup_logger() -> None:
-    """Configure file-based logging.
+    """Configure JSON-lines logging through the shared workflow queue.
 
     Returns
     -------
     None
         The logger is configured for this module.
     """
-    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        filename=LOG_FILE,
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-    )
+    configurer_journal(LOG_FILE, nom=None)
 
 
+@trace("regle")
 def check_preuves(filepath: Path) -> pd.DataFrame:
     """Return rows missing design or test evidence.
 
@@ -46,30 +53,30 @@ def check_preuves(filepath: Path) -> pd.DataFrame:
     pandas.DataFrame
         DataFrame of requirements missing either design or test evidence.
     """
-    df = read_first_sheet(filepath, DEFAULT_SHEETS)
+    return evaluer_regle(RULE, preuves=filepath)
 
-    try:
-        applicability_col = find_column(
-            df,
-            [r"^Applicabilit[ée]$", r"^Applicability$"],
-            [r"applicab"],
-        )
-    except KeyError:
-        applicability_col = None
 
-    design_col = find_column(
-        df,
-        [r"preuve.*conception"],
-        [r"preuve.*conc"],
-    )
-    test_col = find_column(df, [r"preuve.*test"], None)
+def check_preuves_chunks(filepath: Path, audit_file: Path, chunksize: int) -> int:
+    """Stream the evidence file and write incomplete rows to ``audit_file``.
+
+    Parameters
+    ----------
+    filepath : Path
+        Path to the Excel file listing evidence.
+    audit_file : Path
+        CSV file receiving the rows missing evidence.
+    chunksize : int
+        Number of rows held in memory at once.
 
-    mask = df[design_col].isna() | df[test_col].isna()
-    if applicability_col:
-        mask &= df[applicability_col].str.lower() == "oui"
-    return df.loc[mask]
+    Returns
+    -------
+    int
+        Number of rows missing evidence.
+    """
+    return flux_violations(RULE, filepath, audit_file, chunksize)
 
 
+@trace("regle")
 def exigences_sans_preuves(
     exig_path: Path, preuves_path: Path
 ) -> pd.DataFrame:
@@ -85,29 +92,10 @@ def exigences_sans_preuves(
     Returns
     -------
     pandas.DataFrame
-        DataFrame listing requirement identifiers without associated evidence.
+        Identifiers of the requirements with no evidence row, or with an
+        evidence row lacking both design and test evidence.
     """
-    df_exig = read_first_sheet(exig_path, DEFAULT_SHEETS)
-    df_preuves = read_first_sheet(preuves_path, DEFAULT_SHEETS)
-
-    id_exig = find_column(df_exig, [r"^ID$", r"^Exig"], [r"id"])
-    id_prev = find_column(df_preuves, [r"^ID$", r"^Exig"], [r"id"])
-    design_col = find_column(
-        df_preuves,
-        [r"preuve.*conception"],
-        [r"preuve.*conc"],
-    )
-    test_col = find_column(df_preuves, [r"preuve.*test"], None)
-
-    merged = df_exig[[id_exig]].merge(
-        df_preuves[[id_prev, design_col, test_col]],
-        how="left",
-        left_on=id_exig,
-        right_on=id_prev,
-    )
-
-    mask = merged[design_col].isna() & merged[test_col].isna()
-    return merged.loc[mask, [id_exig]]
+    return evaluer_regle(EXIG_RULE, exigences=exig_path, preuves=preuves_path)
 
 
 def main() -> None:
@@ -126,9 +114,16 @@ def main() -> None:
             sys.exit(1)
 
     logging.info("Lecture des fichiers: %s et %s", PREUVES_FILE, EXIG_FILE)
+    chemins = {"preuves": PREUVES_FILE, "exigences": EXIG_FILE}
     try:
-        invalid_rows = check_preuves(PREUVES_FILE)
-        missing_exig = exigences_sans_preuves(EXIG_FILE, PREUVES_FILE)
+        if CHUNK_SIZE:
+            count = check_preuves_chunks(PREUVES_FILE, AUDIT_FILE, CHUNK_SIZE)
+            resultats = evaluer(chemins, [EXIG_RULE])
+        else:
+            resultats = evaluer(chemins, [RULE, EXIG_RULE])
+            count = len(resultats[RULE].valeur())
+        missing_exig = resultats[EXIG_RULE].valeur()
+        ecrire(resultats)
     except KeyError as exc:
         logging.error("%s", exc)
         sys.exit(1)
@@ -136,19 +131,15 @@ def main() -> None:
         logging.exception("Erreur lors de la lecture du fichier: %s", exc)
         sys.exit(1)
 
-    if not invalid_rows.empty:
-        AUDIT_FILE.parent.mkdir(parents=True, exist_ok=True)
-        invalid_rows.to_csv(AUDIT_FILE, index=False)
-        logging.warning("Preuves manquantes: %d", len(invalid_rows))
+    if count:
+        logging.warning("Preuves manquantes: %d", count)
 
     if not missing_exig.empty:
-        EXIG_AUDIT_FILE.parent.mkdir(parents=True, exist_ok=True)
-        missing_exig.to_csv(EXIG_AUDIT_FILE, index=False)
         logging.warning(
             "Exigences sans preuve associee: %d", len(missing_exig)
         )
 
-    if not invalid_rows.empty or not missing_exig.empty:
+    if count or not missing_exig.empty:
         sys.exit(1)
 
     logging.info("Toutes les preuves sont presentes")
@@ -0,0 +1,144 @@
+"""Constant-memory export of DataFrames to Excel workbooks."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from workflow.tracing import span
+
+
+@dataclass(frozen=True)
+class SheetStyle:
+    """Presentation of a sheet written by :func:`write_workbook`.
+
+    Parameters
+    ----------
+    header_bold : bool
+        Write the header row in bold.
+    header_fill : str | None
+        RGB background colour of the header cells, ``None`` for none.
+    freeze_header : bool
+        Keep the header row visible when scrolling.
+    widths : Mapping[str, float]
+        Width of the named columns.
+    auto_width : bool
+        Size the other columns after their header and the first chunk.
+    max_width : float
+        Upper bound of automatic widths.
+    """
+
+    header_bold: bool = True
+    header_fill: str | None = "DDEBF7"
+    freeze_header: bool = True
+    widths: Mapping[str, float] = field(default_factory=dict)
+    auto_width: bool = True
+    max_width: float = 60.0
+
+
+def _chunks(data: pd.DataFrame | Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """Yield ``data`` itself or its chunks."""
+    if isinstance(data, pd.DataFrame):
+        yield data
+    else:
+        yield from data
+
+
+def _rows(chunk: pd.DataFrame) -> Iterator[tuple]:
+    """Yield the rows of ``chunk`` with missing values as empty cells."""
+    cells = chunk.astype(object)
+    yield from cells.where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+def _widths(chunk: pd.DataFrame, style: SheetStyle) -> list[float | None]:
+    """Return the width of each column of ``chunk``, ``None`` to keep the default."""
+    widths: list[float | None] = []
+    for position, name in enumerate(chunk.columns):
+        if str(name) in style.widths:
+            widths.append(style.widths[str(name)])
+        elif style.auto_width:
+            values = chunk.iloc[:, position].dropna().astype(str)
+            longest = max(len(str(name)), int(values.str.len().max()) if len(values) else 0)
+            widths.append(min(longest + 2, style.max_width))
+        else:
+            widths.append(None)
+    return widths
+
+
+def _start_sheet(sheet, chunk: pd.DataFrame, style: SheetStyle | None) -> None:
+    """Set the layout of ``sheet`` and append its header row.
+
+    Write-only sheets need their layout before the first row is written.
+    """
+    if style is None:
+        sheet.append([str(c) for c in chunk.columns])
+        return
+    for position, width in enumerate(_widths(chunk, style), start=1):
+        if width is not None:
+            sheet.column_dimensions[get_column_letter(position)].width = width
+    if style.freeze_header:
+        sheet.freeze_panes = "A2"
+    font = Font(bold=True) if style.header_bold else None
+    fill = PatternFill("solid", fgColor=style.header_fill) if style.header_fill else None
+    header = []
+    for name in chunk.columns:
+        cell = WriteOnlyCell(sheet, value=str(name))
+        if font is not None:
+            cell.font = font
+        if fill is not None:
+            cell.fill = fill
+        header.append(cell)
+    sheet.append(header)
+
+
+def write_workbook(
+    path: Path,
+    sheets: Mapping[str, pd.DataFrame | Iterable[pd.DataFrame]],
+    style: SheetStyle | None = None,
+) -> int:
+    """Write ``sheets`` to ``path`` through openpyxl's write-only mode.
+
+    Rows are serialised as they are appended instead of building the whole
+    workbook in memory, so a sheet given as an iterable of chunks is never
+    held entirely in memory.
+
+    Parameters
+    ----------
+    path : Path
+        Destination workbook.
+    sheets : Mapping[str, pandas.DataFrame | Iterable[pandas.DataFrame]]
+        Content of each sheet, in order: a DataFrame or chunks sharing the
+        same columns. The header comes from the first chunk.
+    style : SheetStyle | None
+        Header styling and column widths applied to every sheet, plain
+        cells when ``None``.
+
+    Returns
+    -------
+    int
+        Number of data rows written.
+    """
+    count = 0
+    with span("write_workbook", "export", fichier=path.name) as details:
+        workbook = Workbook(write_only=True)
+        for name, data in sheets.items():
+            sheet = workbook.create_sheet(name)
+            started = False
+            for chunk in _chunks(data):
+                if not started:
+                    _start_sheet(sheet, chunk, style)
+                    started = True
+                for row in _rows(chunk):
+                    sheet.append(row)
+                count += len(chunk)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        workbook.save(path)
+        details["lignes"] = count
+    return count
@@ -1,36 +1,44 @@
-"""Generate the consolidated certification matrix."""
+"""Generate the consolidated certification matrix.
+
+Entry point of the ``matrice_finale`` rule of :mod:`scripts.validation`.
+"""
 
 from __future__ import annotations
 
 import logging
 import sys
+from itertools import chain
 from pathlib import Path
+from typing import Iterator
 
 import pandas as pd
 
-from .utils import DEFAULT_SHEETS, find_column, read_first_sheet
+from workflow.logger import configurer_journal
+from workflow.tracing import trace
+
+from .excel import write_workbook
+from .utils import CHUNK_SIZE, workspace_path
+from .validation import FEUILLE_SORTIE, STYLE_MATRICE, evaluer_regle, flux_selection
+
+LOG_FILE = workspace_path("logs/gen_matrice_finale.log")
+OUTPUT_FILE = workspace_path("audit/matrice_finale.xlsx")
+EVIDENCE_FILE = workspace_path("data/preuves.xlsx")
 
-LOG_FILE = Path("logs/gen_matrice_finale.log")
-OUTPUT_FILE = Path("audit/matrice_finale.xlsx")
-EVIDENCE_FILE = Path("data/preuves.xlsx")
+RULE = "matrice_finale"
 
 
 def setup_logger() -> None:
-    """Configure file-based logging.
+    """Configure JSON-lines logging through the shared workflow queue.
 
     Returns
     -------
     None
         The logger is configured for this module.
     """
-    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        filename=LOG_FILE,
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-    )
+    configurer_journal(LOG_FILE, nom=None)
 
 
+@trace("regle")
 def generate_matrix(filepath: Path) -> pd.DataFrame:
     """Return compliant evidence rows from the Excel file.
 
@@ -44,17 +52,25 @@ def generate_matrix(filepath: Path) -> pd.DataFrame:
     pandas.DataFrame
         Filtered DataFrame containing only valid entries.
     """
-    df = read_first_sheet(filepath, DEFAULT_SHEETS)
+    return evaluer_regle(RULE, preuves=filepath)
 
-    applicability_col = find_column(df, [r"^Applicabilit[ée]$", r"^Applicability$"], [r"applicab"])
-    design_col = find_column(df, [r"preuve.*conception"], [r"preuve.*conc"])
-    test_col = find_column(df, [r"preuve.*test"], None)
 
-    mask = (
-        df[applicability_col].str.lower() == "oui"
-    ) & df[design_col].notna() & df[test_col].notna()
+def generate_matrix_chunks(filepath: Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Yield compliant evidence rows chunk by chunk.
+
+    Parameters
+    ----------
+    filepath : Path
+        Path to the evidence Excel file.
+    chunksize : int
+        Number of rows read at once.
 
-    return df.loc[mask]
+    Yields
+    ------
+    pandas.DataFrame
+        Compliant rows of each chunk.
+    """
+    yield from flux_selection(RULE, filepath, chunksize)
 
 
 def main() -> None:
@@ -73,7 +89,13 @@ def main() -> None:
 
     logging.info("Lecture du fichier: %s", EVIDENCE_FILE)
     try:
-        matrix = generate_matrix(EVIDENCE_FILE)
+        if CHUNK_SIZE:
+            # the first chunk resolves the columns, before the export starts
+            chunks = generate_matrix_chunks(EVIDENCE_FILE, CHUNK_SIZE)
+            first = next(chunks, None)
+            matrix = chain([first], chunks) if first is not None else pd.DataFrame()
+        else:
+            matrix = generate_matrix(EVIDENCE_FILE)
     except KeyError as exc:
         logging.error("%s", exc)
         sys.exit(1)
@@ -82,13 +104,12 @@ def main() -> None:
         sys.exit(1)
 
     try:
-        OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-        matrix.to_excel(OUTPUT_FILE, index=False)
+        count = write_workbook(OUTPUT_FILE, {FEUILLE_SORTIE: matrix}, STYLE_MATRICE)
     except Exception as exc:
         logging.exception("Erreur lors de l'ecriture du fichier: %s", exc)
         sys.exit(1)
 
-    logging.info("Matrice finale géneree: %s", OUTPUT_FILE)
+    logging.info("Matrice finale géneree: %s (%d lignes)", OUTPUT_FILE, count)
     sys.exit(0)
 
 
@@ -2,36 +2,53 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
+import os
 import sys
 from pathlib import Path
 
 import pandas as pd
+from openpyxl import load_workbook
 
-from .utils import DEFAULT_SHEETS, find_column, read_first_sheet
+from workflow.logger import configurer_journal
+from workflow.tracing import trace
 
-LOG_FILE = Path("logs/gerer_retours.log")
-AUDIT_FILE = Path("audit/retours_critiques.csv")
-SUMMARY_FILE = Path("audit/retours_traite_nontraite.csv")
-DATA_FILE = Path("data/retours.xlsx")
+from .normalisation import CRITICITE, masque
+from .utils import (
+    DEFAULT_SHEETS,
+    find_column,
+    invalidate_cache,
+    read_first_sheet,
+    workspace_path,
+    write_csv,
+)
+
+LOG_FILE = workspace_path("logs/gerer_retours.log")
+AUDIT_FILE = workspace_path("audit/retours_critiques.csv")
+SUMMARY_FILE = workspace_path("audit/retours_traite_nontraite.csv")
+DATA_FILE = workspace_path("data/retours.xlsx")
+
+TRAITE_COL = "Traité"
+KEYWORDS = r"(?:résolu|corrigé|pris en compte)"
+#: ``"cellules"`` writes changed ``Traité`` cells in place, ``"sidecar"``
+#: keeps the classification in a JSON file next to the workbook.
+TRAITEMENT_MODE = os.environ.get("CERTIF_TRAITEMENT_MODE", "cellules")
 
 
 def setup_logger() -> None:
-    """Configure file-based logging.
+    """Configure JSON-lines logging through the shared workflow queue.
 
     Returns
     -------
     None
         The logger is configured for this module.
     """
-    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        filename=LOG_FILE,
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-    )
+    configurer_journal(LOG_FILE, nom=None)
 
 
+@trace("regle")
 def extract_critiques(filepath: Path) -> pd.DataFrame:
     """Return critical feedback lines.
 
@@ -48,33 +65,100 @@ def extract_critiques(filepath: Path) -> pd.DataFrame:
     df = read_first_sheet(filepath, DEFAULT_SHEETS)
 
     crit_col = find_column(df, [r"^Criticité$"], [r"critic"])
-    mask = df[crit_col].str.lower().isin(["elevee", "élevée", "haute"])
+    mask = masque(df[crit_col], CRITICITE, "élevée", "haute")
     return df.loc[mask]
 
 
-def update_traitement(filepath: Path) -> pd.DataFrame:
-    """Update feedback file with a ``Traité`` column and return summary.
+def sidecar_path(filepath: Path) -> Path:
+    """Return the JSON file keeping the classification of ``filepath``."""
+    return filepath.with_name(f"{filepath.name}.traite.json")
+
+
+def row_fingerprints(df: pd.DataFrame) -> list[str]:
+    """Return a digest of every row of ``df``, ignoring the ``Traité`` column."""
+    values = df.drop(columns=[TRAITE_COL], errors="ignore").astype(object)
+    values = values.where(values.notna(), None)
+    return [
+        hashlib.sha1(json.dumps(row, default=str, ensure_ascii=False).encode("utf-8")).hexdigest()
+        for row in values.itertuples(index=False, name=None)
+    ]
+
+
+def write_changed_cells(filepath: Path, traite: pd.Series) -> int:
+    """Write the ``Traité`` values differing from the sheet and return their count.
+
+    The workbook is opened in place, so other sheets and formatting are kept.
+    ``traite`` is indexed like the sheet read by :func:`read_first_sheet`,
+    row ``i`` being sheet row ``i + 2``.
+    """
+    workbook = load_workbook(filepath)
+    try:
+        matching = [s for s in DEFAULT_SHEETS if s in workbook.sheetnames]
+        worksheet = workbook[matching[0]] if matching else workbook.worksheets[0]
+        header = [cell.value for cell in worksheet[1]]
+        if TRAITE_COL in header:
+            column = header.index(TRAITE_COL) + 1
+        else:
+            column = len(header) + 1
+            worksheet.cell(row=1, column=column, value=TRAITE_COL)
+        changed = 0
+        for offset, value in enumerate(traite.tolist()):
+            cell = worksheet.cell(row=offset + 2, column=column)
+            if cell.value != value:
+                cell.value = value
+                changed += 1
+        workbook.save(filepath)
+    finally:
+        workbook.close()
+    return changed
+
+
+@trace("regle")
+def update_traitement(filepath: Path, mode: str | None = None) -> pd.DataFrame:
+    """Classify comments as treated or not and return the summary.
+
+    The classification is stored as a ``Traité`` column of the workbook or, in
+    ``"sidecar"`` mode, in a JSON file keyed by row fingerprint which leaves
+    the workbook untouched. In both modes nothing is written when the stored
+    classification is already up to date, so repeated runs keep the file and
+    the caches keyed on it valid.
 
     Parameters
     ----------
     filepath : Path
         Path to the Excel file with evaluator feedback.
+    mode : str | None
+        ``"cellules"`` or ``"sidecar"``; defaults to :data:`TRAITEMENT_MODE`.
 
     Returns
     -------
     pandas.DataFrame
         Counts of treated vs non-treated comments.
     """
+    mode = mode or TRAITEMENT_MODE
+    if mode not in {"cellules", "sidecar"}:
+        raise ValueError(f"Mode de traitement inconnu: {mode}")
     df = read_first_sheet(filepath, DEFAULT_SHEETS)
 
-    comment_col = find_column(df, [r"^Commentaire$"], [r"comment"]) 
-    keywords = r"(résolu|corrigé|pris en compte)"
+    comment_col = find_column(df, [r"^Commentaire$"], [r"comment"])
+    traite = df[comment_col].str.contains(KEYWORDS, case=False, na=False)
+    traite = traite.map({True: "Oui", False: "Non"})
 
-    df["Traité"] = df[comment_col].str.contains(keywords, case=False, na=False)
-    df["Traité"] = df["Traité"].map({True: "Oui", False: "Non"})
+    if mode == "sidecar":
+        sidecar = sidecar_path(filepath)
+        stored = json.loads(sidecar.read_text(encoding="utf-8")) if sidecar.exists() else None
+        current = dict(zip(row_fingerprints(df), traite.tolist()))
+        if stored != current:
+            sidecar.write_text(json.dumps(current, ensure_ascii=False), encoding="utf-8")
+            logging.info("Classification enregistree dans %s", sidecar)
+    elif TRAITE_COL not in df.columns or df[TRAITE_COL].tolist() != traite.tolist():
+        changed = write_changed_cells(filepath, traite)
+        invalidate_cache(filepath)
+        logging.info("Cellules %s mises a jour: %d", TRAITE_COL, changed)
+    else:
+        logging.info("Colonne %s deja a jour", TRAITE_COL)
 
-    df.to_excel(filepath, index=False, engine="openpyxl")
-    return df["Traité"].value_counts().rename_axis("Traite").reset_index(name="Occurrences")
+    return traite.value_counts().rename_axis("Traite").reset_index(name="Occurrences")
 
 
 def main() -> None:
@@ -102,12 +186,10 @@ def main() -> None:
         logging.exception("Erreur de lecture des retours: %s", exc)
         sys.exit(1)
 
-    SUMMARY_FILE.parent.mkdir(parents=True, exist_ok=True)
-    summary.to_csv(SUMMARY_FILE, index=False)
+    write_csv(summary, SUMMARY_FILE)
 
     if not critiques.empty:
-        AUDIT_FILE.parent.mkdir(parents=True, exist_ok=True)
-        critiques.to_csv(AUDIT_FILE, index=False)
+        write_csv(critiques, AUDIT_FILE)
         logging.warning("Retours critiques identifies: %d", len(critiques))
         sys.exit(1)
 
@@ -0,0 +1,93 @@
+"""Normalised categorical representation of enumerated columns."""
+
+from __future__ import annotations
+
+import unicodedata
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+
+def fold(value: str) -> str:
+    """Return ``value`` stripped, lowercased and without accents."""
+    decomposed = unicodedata.normalize("NFKD", str(value).strip().lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+@dataclass(frozen=True)
+class Vocabulaire:
+    """Canonical labels of an enumerated column.
+
+    Parameters
+    ----------
+    labels : tuple[str, ...]
+        Canonical labels, in the order of their categorical codes.
+    synonymes : tuple[tuple[str, str], ...]
+        Extra spellings mapped to a canonical label.
+    """
+
+    labels: tuple[str, ...]
+    synonymes: tuple[tuple[str, str], ...] = ()
+
+    @cached_property
+    def canonique(self) -> dict[str, str]:
+        """Return the folded spelling to canonical label mapping."""
+        mapping = {fold(label): label for label in self.labels}
+        mapping.update((fold(spelling), label) for spelling, label in self.synonymes)
+        return mapping
+
+    def est_normalise(self, series: pd.Series) -> bool:
+        """Return ``True`` if ``series`` was produced by :func:`normaliser`."""
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            return False
+        return tuple(series.cat.categories[: len(self.labels)]) == self.labels
+
+
+def normaliser(series: pd.Series, vocabulaire: Vocabulaire) -> pd.Series:
+    """Return ``series`` as a categorical of folded, canonical labels.
+
+    Distinct values are folded once each, not once per cell. The categories
+    start with the canonical labels of ``vocabulaire`` so that their codes are
+    stable; unknown values are appended in their folded form.
+    """
+    if vocabulaire.est_normalise(series):
+        return series
+    codes, uniques = pd.factorize(series)
+    canon = [vocabulaire.canonique.get(fold(u), fold(u)) for u in uniques]
+    extras = sorted(set(canon) - set(vocabulaire.labels))
+    categories = list(vocabulaire.labels) + extras
+    position = {label: i for i, label in enumerate(categories)}
+    lookup = np.array([position[label] for label in canon] + [-1], dtype=np.int64)
+    return pd.Series(
+        pd.Categorical.from_codes(lookup[codes], categories=categories),
+        index=series.index,
+        name=series.name,
+    )
+
+
+def masque(series: pd.Series, vocabulaire: Vocabulaire, *labels: str) -> pd.Series:
+    """Return the mask of ``series`` cells equal to one of ``labels``.
+
+    The comparison runs on the categorical codes.
+    """
+    series = normaliser(series, vocabulaire)
+    wanted = [vocabulaire.labels.index(label) for label in labels]
+    return pd.Series(np.isin(series.cat.codes.to_numpy(), wanted), index=series.index)
+
+
+def poids(series: pd.Series, vocabulaire: Vocabulaire, valeurs: dict[str, int]) -> np.ndarray:
+    """Return the weight of every cell of ``series`` from label ``valeurs``.
+
+    Unknown and missing values weigh ``0``.
+    """
+    series = normaliser(series, vocabulaire)
+    table = np.array(
+        [valeurs.get(label, 0) for label in series.cat.categories] + [0], dtype=np.int64
+    )
+    return table[series.cat.codes.to_numpy()]
+
+
+OUI_NON = Vocabulaire(("oui", "non"))
+CRITICITE = Vocabulaire(("haute", "élevée", "moyenne", "basse", "faible"))
@@ -0,0 +1,168 @@
+"""Declarative sheet schemas resolved once against a header row."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Iterable, Mapping, Sequence
+
+import pandas as pd
+
+from .normalisation import CRITICITE, OUI_NON, Vocabulaire, normaliser
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern: str) -> re.Pattern[str]:
+    """Return the case-insensitive compiled form of ``pattern``."""
+    return re.compile(pattern, flags=re.IGNORECASE)
+
+
+def match_column(
+    columns: Sequence[str], patterns: Iterable[str], alt_patterns: Iterable[str] | None = None
+) -> str:
+    """Return the first of ``columns`` matching ``patterns`` then ``alt_patterns``.
+
+    Raises
+    ------
+    KeyError
+        If no column matches any of the provided patterns.
+    """
+    patterns = list(patterns)
+    for group in (patterns, alt_patterns or []):
+        for pattern in group:
+            regex = compile_pattern(pattern)
+            for col in columns:
+                if regex.search(col):
+                    return col
+    raise KeyError(f"Aucune colonne ne correspond aux motifs {patterns}")
+
+
+def as_text(series: pd.Series) -> pd.Series:
+    """Return ``series`` with every non-null value converted to ``str``.
+
+    Missing values are kept as such, unlike ``astype(str)``. Whole-number
+    floats are written as integers: a numeric column with a blank cell is
+    read as floats, and ``1.0`` must still match the identifier ``1``.
+    """
+    out = series.astype(object)
+    present = series.notna()
+    values = series[present]
+    if pd.api.types.is_float_dtype(values.dtype):
+        text = values.astype(str)
+        whole = (values % 1 == 0) & (values.abs() < 2**63)
+        text[whole] = values[whole].astype("int64").astype(str)
+    else:
+        text = values.map(_text)
+    out[present] = text.astype(object)
+    return out
+
+
+def _text(value: object) -> str:
+    """Return ``value`` as text, whole-number floats as integers."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """Expected column of a sheet.
+
+    Parameters
+    ----------
+    patterns : tuple[str, ...]
+        Regex patterns matched first, case-insensitively.
+    alt_patterns : tuple[str, ...]
+        Tolerant patterns used if no strict pattern matches.
+    dtype : str | Vocabulaire | None
+        Type applied when reading: ``"text"`` for strings with missing values
+        preserved, a :class:`Vocabulaire` for a normalised categorical, any
+        pandas dtype otherwise, ``None`` to keep the inferred one.
+    required : bool
+        Whether resolution fails when the column is absent.
+    """
+
+    patterns: tuple[str, ...]
+    alt_patterns: tuple[str, ...] = ()
+    dtype: str | Vocabulaire | None = None
+    required: bool = True
+
+
+@dataclass(frozen=True)
+class SheetSchema:
+    """Logical column names of a sheet mapped to their :class:`ColumnSpec`.
+
+    Build it with :meth:`of`; schemas are hashable so that they can key the
+    workbook caches.
+    """
+
+    columns: tuple[tuple[str, ColumnSpec], ...]
+
+    @classmethod
+    def of(cls, **columns: ColumnSpec) -> "SheetSchema":
+        """Return a schema from keyword ``columns``."""
+        return cls(tuple(columns.items()))
+
+    def resolve(self, header: Iterable[str]) -> dict[str, str]:
+        """Return the logical to actual column mapping for ``header``.
+
+        Resolutions are memoised by header signature. Absent optional columns
+        are left out of the mapping.
+
+        Raises
+        ------
+        KeyError
+            If a required column is missing.
+        """
+        return dict(_resolve(self, tuple(header)))
+
+    def project(self, header: Sequence[str]) -> list[int]:
+        """Return the indices of ``header`` holding the columns of the schema."""
+        wanted = set(self.resolve(header).values())
+        return [i for i, name in enumerate(header) if name in wanted]
+
+    def untyped(self) -> "SheetSchema":
+        """Return the schema reading the same columns with their raw values."""
+        return SheetSchema(tuple((name, replace(spec, dtype=None)) for name, spec in self.columns))
+
+    def apply_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Cast the resolved columns of ``df`` to their declared dtypes."""
+        specs = dict(self.columns)
+        for logical, actual in self.resolve(df.columns).items():
+            dtype = specs[logical].dtype
+            if isinstance(dtype, Vocabulaire):
+                df[actual] = normaliser(df[actual], dtype)
+            elif dtype == "text":
+                df[actual] = as_text(df[actual])
+            elif dtype:
+                df[actual] = df[actual].astype(dtype)
+        return df
+
+
+@lru_cache(maxsize=512)
+def _resolve(schema: SheetSchema, header: tuple[str, ...]) -> tuple[tuple[str, str], ...]:
+    """Resolve ``schema`` against ``header`` (memoised)."""
+    resolved = []
+    for logical, spec in schema.columns:
+        try:
+            resolved.append((logical, match_column(header, spec.patterns, spec.alt_patterns)))
+        except KeyError:
+            if spec.required:
+                raise
+    return tuple(resolved)
+
+
+def columns_of(schema: SheetSchema, df: pd.DataFrame) -> Mapping[str, str]:
+    """Return the resolved columns of ``df``, wrapping errors like the scripts do."""
+    try:
+        return schema.resolve(df.columns)
+    except KeyError as exc:
+        raise KeyError(f"Colonnes manquantes: {exc}") from exc
+
+
+APPLICABILITE = ColumnSpec((r"^Applicabilit[ée]$", r"^Applicability$"), (r"applicab",), OUI_NON)
+CRITICITE_COL = ColumnSpec((r"^Criticité$",), (r"critic",), CRITICITE)
+IDENTIFIANT = ColumnSpec((r"^ID$", r"^Exig"), (r"id",), "text")
+PREUVE_CONCEPTION = ColumnSpec((r"preuve.*conception",), (r"preuve.*conc",))
+PREUVE_TEST = ColumnSpec((r"preuve.*test",))
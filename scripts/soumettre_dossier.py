@@ -2,40 +2,53 @@
 
 from __future__ import annotations
 
+import argparse
 import logging
-import shutil
 import sys
-from pathlib import Path
 
-LOG_FILE = Path("logs/soumettre_dossier.log")
-OUTPUT_ARCHIVE = Path("audit/dossier_soumission.zip")
-DATA_DIR = Path("data")
+from workflow.logger import configurer_journal
+from workflow.tracing import span
+
+from .archive import DEFAULT_WORKERS, build_archive, load_manifest, update_archive
+from .utils import workspace_path
+
+LOG_FILE = workspace_path("logs/soumettre_dossier.log")
+OUTPUT_ARCHIVE = workspace_path("audit/dossier_soumission.zip")
+DATA_DIR = workspace_path("data")
 
 
 def setup_logger() -> None:
-    """Configure file-based logging.
+    """Configure JSON-lines logging through the shared workflow queue.
 
     Returns
     -------
     None
         The logger is configured for this module.
     """
-    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        filename=LOG_FILE,
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-    )
+    configurer_journal(LOG_FILE, nom=None)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Create or update the archive of the data directory.
 
+    Unchanged files are copied from the previous archive without being
+    compressed again. With ``--flux`` the archive is streamed to the standard
+    output as it is built instead of being written to ``OUTPUT_ARCHIVE``.
 
-def main() -> None:
-    """Create an archive of the data directory.
+    Parameters
+    ----------
+    argv : list[str] | None
+        Command line arguments, ``sys.argv[1:]`` by default.
 
     Returns
     -------
     None
         Exits with ``0`` on success, ``1`` if an error occurred.
     """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--flux", action="store_true", help="Ecrire l'archive sur la sortie standard")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Threads de compression")
+    args = parser.parse_args(argv)
     setup_logger()
 
     if not DATA_DIR.exists():
@@ -43,10 +56,19 @@ def main() -> None:
         sys.exit(1)
 
     try:
-        OUTPUT_ARCHIVE.parent.mkdir(parents=True, exist_ok=True)
-        if OUTPUT_ARCHIVE.exists():
-            OUTPUT_ARCHIVE.unlink()
-        shutil.make_archive(OUTPUT_ARCHIVE.with_suffix(""), "zip", DATA_DIR)
+        if args.flux:
+            build_archive(
+                DATA_DIR,
+                sys.stdout.buffer,
+                OUTPUT_ARCHIVE,
+                load_manifest(OUTPUT_ARCHIVE),
+                args.workers,
+            )
+            logging.info("Archive de soumission diffusee sur la sortie standard")
+            sys.exit(0)
+        with span("update_archive", "export", fichier=OUTPUT_ARCHIVE.name) as details:
+            stats = update_archive(DATA_DIR, OUTPUT_ARCHIVE, args.workers)
+            details.update(compressees=stats.compressed, reutilisees=stats.reused)
     except Exception as exc:
         logging.exception("Erreur lors de la creation de l'archive: %s", exc)
         sys.exit(1)
@@ -1,26 +1,82 @@
-"""Produce a summarized view of evaluator feedback."""
+"""Produce a summarized view of evaluator feedback.
 
+Usage::
+
+    python -m scripts.synthese_retours [--flux] [--sans-tous-retours]
+
+``--flux`` writes the workbook through the constant-memory writer of
+:mod:`scripts.excel` (``CERTIF_SYNTHESE_FLUX=1`` has the same effect for
+workflow runs) and ``--sans-tous-retours`` omits the ``Tous_Retours`` sheet,
+a plain copy of the input.
+"""
+
+import argparse
 import logging
+import os
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
-from .utils import DEFAULT_SHEETS, find_column, read_first_sheet
+from workflow.logger import configurer_journal
+from workflow.tracing import span, trace
 
-LOG_FILE = Path("logs/synthese_retours.log")
+from .excel import write_workbook
+from .utils import DEFAULT_SHEETS, find_column, read_first_sheet, workspace_path
+
+LOG_FILE = workspace_path("logs/synthese_retours.log")
+STREAMING = os.environ.get("CERTIF_SYNTHESE_FLUX", "") not in ("", "0")
 
 
 def setup_logger() -> None:
-    """Configure file-based logging."""
-    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        filename=LOG_FILE,
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-    )
+    """Configure JSON-lines logging through the shared workflow queue."""
+    configurer_journal(LOG_FILE, nom=None)
+
 
+def join_by_group(codes: np.ndarray, values: pd.Series, sep: str, groups: int) -> np.ndarray:
+    """Join the values of each group with ``sep``, in their original order.
 
-def synthese_retours(input_path: Path, output_path: Path) -> None:
+    Rows are stably sorted by group once; each segment between two group
+    boundaries is then joined with :meth:`str.join`, linear in its size.
+
+    Parameters
+    ----------
+    codes : numpy.ndarray
+        Group of each row in ``range(groups)``, negative to ignore the row.
+    values : pandas.Series
+        Values to join; missing ones are skipped.
+    sep : str
+        Separator placed between the values of a group.
+    groups : int
+        Number of groups.
+
+    Returns
+    -------
+    numpy.ndarray
+        Joined string of each group, empty for a group without values.
+    """
+    keep = (codes >= 0) & values.notna().to_numpy()
+    codes = codes[keep]
+    texts = values.to_numpy(dtype=object)[keep].astype(str).tolist()
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order]
+    texts = [texts[i] for i in order]
+
+    joined = np.full(groups, "", dtype=object)
+    if len(codes):
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], len(codes)]
+        joined[codes[starts]] = [sep.join(texts[a:b]) for a, b in zip(starts, ends)]
+    return joined
+
+
+@trace("regle")
+def synthese_retours(
+    input_path: Path,
+    output_path: Path,
+    streaming: bool = STREAMING,
+    include_raw: bool = True,
+) -> None:
     """Generate a synthesis workbook from evaluator feedback.
 
     Parameters
@@ -29,6 +85,11 @@ def synthese_retours(input_path: Path, output_path: Path) -> None:
         Excel file containing raw feedback.
     output_path : Path
         Destination of the synthesized Excel file.
+    streaming : bool
+        Write through :func:`scripts.excel.write_workbook` instead of
+        building the workbook in memory with :class:`pandas.ExcelWriter`.
+    include_raw : bool
+        Copy the input rows to a ``Tous_Retours`` sheet.
 
     Returns
     -------
@@ -55,25 +116,51 @@ def synthese_retours(input_path: Path, output_path: Path) -> None:
             f"Colonnes attendues manquantes dans le fichier : {required_cols}"
         )
 
-    grouped = (
-        df.groupby(requirement_col).agg(
+    with span("regroupement", "regle", lignes=len(df)) as details:
+        codes, requirements = pd.factorize(df[requirement_col], sort=True)
+        grouped = pd.DataFrame(
             {
-                comment_col: lambda x: " | ".join(x),
-                criticity_col: lambda x: ", ".join(x),
+                requirement_col: requirements,
+                comment_col: join_by_group(codes, df[comment_col], " | ", len(requirements)),
+                criticity_col: join_by_group(codes, df[criticity_col], ", ", len(requirements)),
             }
         )
-        .reset_index()
-    )
+        details["groupes"] = len(grouped)
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    sheets = {"Tous_Retours": df, "Synthèse": grouped}
+    if not include_raw:
+        del sheets["Tous_Retours"]
 
-    with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-        df.to_excel(writer, sheet_name="Tous_Retours", index=False)
-        grouped.to_excel(writer, sheet_name="Synthèse", index=False)
+    if streaming:
+        write_workbook(output_path, sheets)
+    else:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with span("to_excel", "export", fichier=output_path.name, lignes=len(df)):
+            with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
+                for name, sheet in sheets.items():
+                    sheet.to_excel(writer, sheet_name=name, index=False)
 
     logging.info("Synthèse générée: %s", output_path)
 
 
-if __name__ == "__main__":
+def main(argv: list[str] | None = None) -> None:
+    """Generate ``audit/synthese_retours.xlsx`` from ``data/retours.xlsx``."""
+    parser = argparse.ArgumentParser(description="Synthese des retours par exigence")
+    parser.add_argument(
+        "--flux", action="store_true", default=STREAMING, help="Ecriture en flux a memoire constante"
+    )
+    parser.add_argument(
+        "--sans-tous-retours", action="store_true", help="Ne pas recopier les retours bruts"
+    )
+    args = parser.parse_args(argv)
     setup_logger()
-    synthese_retours(Path("data/retours.xlsx"), Path("audit/synthese_retours.xlsx"))
+    synthese_retours(
+        workspace_path("data/retours.xlsx"),
+        workspace_path("audit/synthese_retours.xlsx"),
+        streaming=args.flux,
+        include_raw=not args.sans_tous_retours,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,59 @@
 from __future__ import annotations
 
 import logging
+import os
+import sys
 from pathlib import Path
-from typing import Iterable
-import re
+from typing import Callable, Iterable, Iterator, TypeVar
 
 import pandas as pd
+from openpyxl import load_workbook
 
+from workflow.tracing import span
+
+from .cache import invalidate_cache, load_sheet
+from .schema import SheetSchema, match_column
+
+__all__ = [
+    "CHUNK_SIZE",
+    "DEFAULT_SHEETS",
+    "find_column",
+    "invalidate_cache",
+    "iter_sheet_chunks",
+    "read_first_sheet",
+    "read_sheet",
+    "stream_violations",
+    "workspace_path",
+    "write_csv",
+]
 
 DEFAULT_SHEETS = ["Liste_documentaire", "Liste_Documentaire"]
+DEFAULT_CHUNKSIZE = 50_000
+#: Rows per chunk in streaming mode, ``None`` to load whole sheets.
+CHUNK_SIZE = int(os.environ.get("CERTIF_CHUNK_SIZE", "0")) or None
+
+T = TypeVar("T")
+
+
+def workspace_path(relative: str) -> Path:
+    """Return ``relative`` resolved in the dossier workspace.
+
+    The workflow engine exports the workspace of the dossier being processed
+    as ``CERTIF_WORKSPACE``; without it the current directory is used.
+    """
+    return Path(os.environ.get("CERTIF_WORKSPACE", ".")) / relative
 
 
 def read_first_sheet(path: Path, sheets: Iterable[str] | None = None) -> pd.DataFrame:
     """Read the first matching sheet from an Excel file.
 
+    Parsed sheets are kept in a process-wide LRU cache keyed by path, size,
+    modification time and ``sheets``. Each call returns its own copy, so
+    callers may modify the result. Scripts writing back to a workbook call
+    :func:`invalidate_cache` afterwards. When ``CERTIF_CACHE_DIR`` is set (or
+    :func:`scripts.cache.configure_sidecar` called), parsed sheets are also
+    persisted as memory-mapped sidecars shared between processes.
+
     Parameters
     ----------
     path : Path
@@ -28,6 +68,15 @@ def read_first_sheet(path: Path, sheets: Iterable[str] | None = None) -> pd.Data
     pandas.DataFrame
         Data contained in the selected sheet.
     """
+    key = tuple(sheets) if sheets else None
+    with span("read_first_sheet", "classeur", fichier=path.name) as details:
+        df = load_sheet(path, (key,), lambda: _parse_sheet(path, key))
+        details["lignes"] = len(df)
+    return df
+
+
+def _parse_sheet(path: Path, sheets: Iterable[str] | None) -> pd.DataFrame:
+    """Parse the first matching sheet of ``path`` with openpyxl."""
     xls = pd.ExcelFile(path, engine="openpyxl")
     if sheets:
         for sheet in sheets:
@@ -61,15 +110,168 @@ def find_column(df: pd.DataFrame, patterns: Iterable[str], alt_patterns: Iterabl
     KeyError
         If no column matches any of the provided patterns.
     """
-    for pattern in patterns:
-        regex = re.compile(pattern, flags=re.IGNORECASE)
-        for col in df.columns:
-            if regex.search(col):
-                return col
-    if alt_patterns:
-        for pattern in alt_patterns:
-            regex = re.compile(pattern, flags=re.IGNORECASE)
-            for col in df.columns:
-                if regex.search(col):
-                    return col
-    raise KeyError(f"Aucune colonne ne correspond aux motifs {list(patterns)}")
+    return match_column(list(df.columns), patterns, alt_patterns)
+
+
+def read_sheet(
+    path: Path, schema: SheetSchema, sheets: Iterable[str] | None = None
+) -> pd.DataFrame:
+    """Read only the columns declared by ``schema`` from an Excel file.
+
+    The header row is resolved once against ``schema``; cells of the other
+    columns are skipped while reading and the declared dtypes are applied.
+    Results go through the same caches as :func:`read_first_sheet`.
+
+    Parameters
+    ----------
+    path : Path
+        Excel file path.
+    schema : SheetSchema
+        Columns to load.
+    sheets : Iterable[str] | None
+        Possible sheet names to search for. If ``None`` the first sheet is read.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The projected sheet, keeping the original column names.
+
+    Raises
+    ------
+    KeyError
+        If a required column of ``schema`` is missing.
+    """
+    key = tuple(sheets) if sheets else None
+    with span("read_sheet", "classeur", fichier=path.name) as details:
+        df = load_sheet(
+            path,
+            (key, schema),
+            lambda: next(iter_sheet_chunks(path, key, sys.maxsize, schema)),
+        )
+        details["lignes"] = len(df)
+    return df
+
+
+def iter_sheet_chunks(
+    path: Path,
+    sheets: Iterable[str] | None = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    schema: SheetSchema | None = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield the first matching sheet of ``path`` as DataFrames of ``chunksize`` rows.
+
+    The workbook is opened in openpyxl read-only mode, so memory stays bounded
+    whatever the number of rows. Blank rows are skipped. An empty chunk
+    carrying the header is yielded when the sheet has no data rows, so that
+    callers can still resolve their columns. With a ``schema``, the header is
+    resolved once and only its columns are kept, with their declared dtypes.
+
+    Parameters
+    ----------
+    path : Path
+        Excel file path.
+    sheets : Iterable[str] | None
+        Possible sheet names to search for. If ``None`` the first sheet is read.
+    chunksize : int
+        Maximum number of rows per chunk.
+    schema : SheetSchema | None
+        Columns to keep. ``None`` keeps every column.
+
+    Yields
+    ------
+    pandas.DataFrame
+        Consecutive slices of the sheet.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        matching = [s for s in (sheets or []) if s in workbook.sheetnames]
+        worksheet = workbook[matching[0]] if matching else workbook.worksheets[0]
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        names = [
+            str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)
+        ]
+        indices = schema.project(names) if schema else list(range(len(names)))
+        columns = [names[i] for i in indices]
+        width = len(names)
+
+        def frame(records: list[tuple[object, ...]]) -> pd.DataFrame:
+            df = pd.DataFrame.from_records(records, columns=columns)
+            return schema.apply_dtypes(df) if schema else df
+
+        buffer: list[tuple[object, ...]] = []
+        emitted = False
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            buffer.append(tuple(row[i] for i in indices))
+            if len(buffer) >= chunksize:
+                yield frame(buffer)
+                buffer = []
+                emitted = True
+        if buffer or not emitted:
+            yield frame(buffer)
+    finally:
+        workbook.close()
+
+
+def stream_violations(
+    chunks: Iterable[pd.DataFrame],
+    resolve: Callable[[pd.DataFrame], T],
+    mask: Callable[[pd.DataFrame, T], pd.Series],
+    audit_file: Path,
+) -> int:
+    """Append rows selected by ``mask`` to ``audit_file`` chunk by chunk.
+
+    Parameters
+    ----------
+    chunks : Iterable[pandas.DataFrame]
+        Chunks of a sheet, typically from :func:`iter_sheet_chunks`.
+    resolve : Callable
+        Resolves the columns of interest once, on the first chunk.
+    mask : Callable
+        Returns the boolean mask of violating rows of a chunk.
+    audit_file : Path
+        CSV file receiving the violations. It is only created when at least
+        one violation is found.
+
+    Returns
+    -------
+    int
+        Number of violating rows written.
+    """
+    count = 0
+    columns: T | None = None
+    with span("stream_violations", "regle", fichier=audit_file.name) as details:
+        details["lignes"] = 0
+        for chunk in chunks:
+            details["lignes"] += len(chunk)
+            if columns is None:
+                columns = resolve(chunk)
+            rows = chunk.loc[mask(chunk, columns)]
+            if rows.empty:
+                continue
+            if count == 0:
+                audit_file.parent.mkdir(parents=True, exist_ok=True)
+                rows.to_csv(audit_file, index=False)
+            else:
+                rows.to_csv(audit_file, mode="a", header=False, index=False)
+            count += len(rows)
+        details["violations"] = count
+    return count
+
+
+def write_csv(df: pd.DataFrame, path: Path) -> None:
+    """Write ``df`` to the CSV file ``path``, creating its directory.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Rows to export.
+    path : Path
+        Destination file.
+    """
+    with span("write_csv", "export", fichier=path.name, lignes=len(df)):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(path, index=False)
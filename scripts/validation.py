@@ -0,0 +1,566 @@
+"""Single-pass validation of the dossier workbooks.
+
+Every audit rule is registered in :data:`REGLES` with the workbook it reads,
+the columns it needs and a vectorised mask. :func:`evaluer` parses each
+workbook once, with the union of the columns of its rules, normalises the
+shared columns (such as the applicability) once and evaluates every rule on
+that table; :func:`ecrire` then writes all the audit outputs. The rules
+failed by each requirement are also indexed as a bitmap, see
+:mod:`scripts.violations`.
+
+Usage::
+
+    python -m scripts.validation
+
+The step scripts (``check_exigences``, ``check_mop``, ``check_preuves`` and
+``gen_matrice_finale``) are thin entry points evaluating their own rules.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Mapping
+
+import numpy as np
+import pandas as pd
+
+from workflow.logger import configurer_journal
+from workflow.tracing import span
+
+from .excel import SheetStyle, write_workbook
+from .normalisation import OUI_NON, masque
+from .schema import (
+    APPLICABILITE,
+    IDENTIFIANT,
+    PREUVE_CONCEPTION,
+    PREUVE_TEST,
+    ColumnSpec,
+    SheetSchema,
+    columns_of,
+)
+from .utils import (
+    DEFAULT_SHEETS,
+    iter_sheet_chunks,
+    read_first_sheet,
+    read_sheet,
+    stream_violations,
+    workspace_path,
+    write_csv,
+)
+from .violations import INDEX_FILE, IndexViolations
+
+LOG_FILE = workspace_path("logs/validation.log")
+
+# workbook outputs keep the sheet name of DataFrame.to_excel, with a styled header
+FEUILLE_SORTIE = "Sheet1"
+STYLE_MATRICE = SheetStyle()
+
+# logical workbook name -> path relative to the dossier workspace
+CLASSEURS = {
+    "exigences": "data/exigences.xlsx",
+    "mop": "data/mop.xlsx",
+    "preuves": "data/preuves.xlsx",
+}
+
+SCHEMA_EXIGENCES = SheetSchema.of(
+    identifiant=replace(IDENTIFIANT, alt_patterns=(), required=False),
+    applicabilite=APPLICABILITE,
+    justification=ColumnSpec((r"Justification\s+non-applicabilit[ée]",), (r"justification",)),
+)
+SCHEMA_MOP = SheetSchema.of(
+    identifiant=replace(IDENTIFIANT, alt_patterns=(), required=False),
+    applicabilite=APPLICABILITE,
+    mop=ColumnSpec((r"^MOP$",), (r"moyen.*preuve",)),
+)
+SCHEMA_PREUVES = SheetSchema.of(
+    identifiant=replace(IDENTIFIANT, required=False),
+    applicabilite=replace(APPLICABILITE, required=False),
+    conception=PREUVE_CONCEPTION,
+    test=PREUVE_TEST,
+)
+SCHEMA_IDENTIFIANTS = SheetSchema.of(identifiant=IDENTIFIANT)
+SCHEMA_MATRICE = SheetSchema.of(
+    applicabilite=APPLICABILITE, conception=PREUVE_CONCEPTION, test=PREUVE_TEST
+)
+
+
+@dataclass(frozen=True)
+class IndexIdentifiants:
+    """Identifiers of a table factorised into integer codes.
+
+    Parameters
+    ----------
+    codes : numpy.ndarray
+        Code of each row in ``valeurs``, ``-1`` for a missing identifier.
+    valeurs : pandas.Index
+        Distinct identifiers, hashed for lookups.
+    """
+
+    codes: np.ndarray
+    valeurs: pd.Index
+
+    @classmethod
+    def construire(cls, identifiants: pd.Series) -> "IndexIdentifiants":
+        """Return the index of the column ``identifiants``."""
+        codes, valeurs = pd.factorize(identifiants)
+        return cls(codes, pd.Index(valeurs))
+
+    def positions(self, identifiants: pd.Series) -> np.ndarray:
+        """Return the code of each of ``identifiants``, ``len(valeurs)`` when absent."""
+        positions = self.valeurs.get_indexer(identifiants)
+        positions[positions < 0] = len(self.valeurs)
+        return positions
+
+    def compter(self, lignes: np.ndarray | None = None) -> np.ndarray:
+        """Return the number of rows of each identifier, among ``lignes`` if given."""
+        presents = self.codes >= 0
+        if lignes is not None:
+            presents &= lignes
+        return np.bincount(self.codes[presents], minlength=len(self.valeurs))
+
+
+class Tables(dict):
+    """Normalised tables of an evaluation by workbook, with their identifier indexes.
+
+    An index is built on first use and shared by every rule of the evaluation.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._index: dict[tuple[str, str], IndexIdentifiants] = {}
+
+    def index(self, classeur: str, colonne: str) -> IndexIdentifiants:
+        """Return the index of the identifier column ``colonne`` of ``classeur``."""
+        cle = (classeur, colonne)
+        if cle not in self._index:
+            with span("index_identifiants", "regle", classeur=classeur) as details:
+                self._index[cle] = IndexIdentifiants.construire(self[classeur][colonne])
+                details["identifiants"] = len(self._index[cle].valeurs)
+        return self._index[cle]
+
+
+Masque = Callable[[pd.DataFrame, Mapping[str, str], Tables], pd.Series]
+
+
+@dataclass(frozen=True)
+class Regle:
+    """Audit rule evaluated on one workbook.
+
+    Parameters
+    ----------
+    nom : str
+        Identifier of the rule.
+    classeur : str
+        Logical workbook read by the rule, a key of :data:`CLASSEURS`.
+    schema : SheetSchema
+        Columns of the workbook needed by the rule.
+    masque : Masque
+        Return the mask of selected rows from the normalised table, its
+        resolved columns and the tables of every loaded workbook.
+    sortie : str
+        Output file relative to the workspace, CSV or ``.xlsx``.
+    anomalie : bool
+        Whether selected rows are violations; otherwise they are a product,
+        such as the final matrix, written even when empty.
+    lignes_completes : bool
+        Export every column of the selected rows, as read from the workbook.
+    colonnes : tuple[str, ...] | None
+        Logical columns exported, all the resolved ones when ``None``.
+    annexes : tuple[tuple[str, SheetSchema], ...]
+        Other workbooks read by the mask, with the columns it needs.
+    """
+
+    nom: str
+    classeur: str
+    schema: SheetSchema
+    masque: Masque
+    sortie: str
+    anomalie: bool = True
+    lignes_completes: bool = False
+    colonnes: tuple[str, ...] | None = None
+    annexes: tuple[tuple[str, SheetSchema], ...] = ()
+
+
+REGLES: dict[str, Regle] = {}
+
+
+def regle(
+    nom: str, classeur: str, schema: SheetSchema, sortie: str, **options: Any
+) -> Callable[[Masque], Masque]:
+    """Decorator registering a mask function as the rule ``nom``."""
+
+    def enregistrer(fonction: Masque) -> Masque:
+        REGLES[nom] = Regle(nom, classeur, schema, fonction, sortie, **options)
+        return fonction
+
+    return enregistrer
+
+
+@regle("exigences_incompletes", "exigences", SCHEMA_EXIGENCES, "audit/exigences_incompletes.csv")
+def _justification_manquante(
+    df: pd.DataFrame, colonnes: Mapping[str, str], tables: Tables
+) -> pd.Series:
+    """Applicable requirements lacking a justification."""
+    applicable = masque(df[colonnes["applicabilite"]], OUI_NON, "oui")
+    return applicable & df[colonnes["justification"]].isna()
+
+
+@regle("mop_manquants", "mop", SCHEMA_MOP, "audit/mop_manquants.csv")
+def _mop_manquant(
+    df: pd.DataFrame, colonnes: Mapping[str, str], tables: Tables
+) -> pd.Series:
+    """Applicable requirements lacking a MOP."""
+    return masque(df[colonnes["applicabilite"]], OUI_NON, "oui") & df[colonnes["mop"]].isna()
+
+
+@regle("preuves_manquantes", "preuves", SCHEMA_PREUVES, "audit/preuves_manquantes.csv")
+def _preuve_manquante(
+    df: pd.DataFrame, colonnes: Mapping[str, str], tables: Tables
+) -> pd.Series:
+    """Applicable rows missing design or test evidence."""
+    mask = df[colonnes["conception"]].isna() | df[colonnes["test"]].isna()
+    if "applicabilite" in colonnes:
+        mask &= masque(df[colonnes["applicabilite"]], OUI_NON, "oui")
+    return mask
+
+
+@regle(
+    "exigences_sans_preuves",
+    "exigences",
+    SCHEMA_IDENTIFIANTS,
+    "audit/exigences_sans_preuves.csv",
+    colonnes=("identifiant",),
+    annexes=(("preuves", SCHEMA_PREUVES),),
+)
+def _sans_preuve(
+    df: pd.DataFrame, colonnes: Mapping[str, str], tables: Tables
+) -> pd.Series:
+    """Requirements without evidence, or with an evidence row lacking both kinds.
+
+    The requirement identifiers are looked up in the hashed index of the
+    evidence identifiers; no joined frame is built.
+    """
+    preuves = tables["preuves"]
+    colonnes_preuves = SCHEMA_PREUVES.resolve(preuves.columns)
+    if "identifiant" not in colonnes_preuves:
+        raise KeyError("Colonnes manquantes: identifiant absent des preuves")
+    index = tables.index("preuves", colonnes_preuves["identifiant"])
+    vides = (
+        preuves[colonnes_preuves["conception"]].isna() & preuves[colonnes_preuves["test"]].isna()
+    )
+    # one flag per evidence identifier, plus a trailing one for absent identifiers
+    sans_preuve = np.append(index.compter(vides.to_numpy()) > 0, True)
+    return pd.Series(sans_preuve[index.positions(df[colonnes["identifiant"]])], index=df.index)
+
+
+@regle(
+    "matrice_finale",
+    "preuves",
+    SCHEMA_MATRICE,
+    "audit/matrice_finale.xlsx",
+    anomalie=False,
+    lignes_completes=True,
+)
+def _conforme(
+    df: pd.DataFrame, colonnes: Mapping[str, str], tables: Tables
+) -> pd.Series:
+    """Applicable rows with both design and test evidence."""
+    return (
+        masque(df[colonnes["applicabilite"]], OUI_NON, "oui")
+        & df[colonnes["conception"]].notna()
+        & df[colonnes["test"]].notna()
+    )
+
+
+@dataclass
+class ResultatRegle:
+    """Outcome of a rule: its selected rows, or the error that prevented it.
+
+    ``identifiants`` holds the requirement identifiers of the evaluated
+    table and ``selection`` the mask of the selected rows, when the rule's
+    workbook has an identifier column; they feed :func:`index_violations`.
+    """
+
+    regle: Regle
+    lignes: pd.DataFrame | None = None
+    erreur: Exception | None = None
+    identifiants: pd.Series | None = None
+    selection: pd.Series | None = None
+
+    @property
+    def anomalies(self) -> int:
+        """Number of violating rows, ``0`` for product rules."""
+        if not self.regle.anomalie or self.lignes is None:
+            return 0
+        return len(self.lignes)
+
+    def valeur(self) -> pd.DataFrame:
+        """Return the selected rows, raising the error of the rule if any."""
+        if self.erreur is not None:
+            raise self.erreur
+        assert self.lignes is not None
+        return self.lignes
+
+
+def schema_union(schemas: Iterable[SheetSchema]) -> SheetSchema:
+    """Return a schema loading every column of ``schemas``, all optional.
+
+    Missing columns are reported per rule when its own schema is resolved.
+    """
+    specs = dict.fromkeys(
+        replace(spec, required=False) for schema in schemas for _, spec in schema.columns
+    )
+    return SheetSchema(tuple((f"colonne_{i}", spec) for i, spec in enumerate(specs)))
+
+
+def schema_classeur(classeur: str) -> SheetSchema:
+    """Return the projection parsed from ``classeur``: the columns of every rule reading it.
+
+    Whatever the rules evaluated, a workbook is always read with this
+    schema, so that they share its cache entries and
+    ``main.py cache`` can warm them in advance.
+    """
+    schemas = [r.schema for r in REGLES.values() if r.classeur == classeur]
+    schemas += [s for r in REGLES.values() for c, s in r.annexes if c == classeur]
+    return schema_union(schemas)
+
+
+def normaliser(brut: pd.DataFrame, schema: SheetSchema) -> pd.DataFrame:
+    """Return the columns of ``schema`` from a raw sheet, with their dtypes applied."""
+    table = brut.iloc[:, schema.project(list(brut.columns))].copy()
+    return schema.apply_dtypes(table)
+
+
+def charger(
+    chemin: Path, schema: SheetSchema, complet: bool = False
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Parse the workbook ``chemin`` once.
+
+    The raw values are cached and normalised here, once per evaluation: the
+    rules compare the normalised columns, the outputs export the raw ones.
+
+    Returns
+    -------
+    tuple[pandas.DataFrame, pandas.DataFrame]
+        The normalised columns of ``schema`` and the raw sheet, restricted to
+        the columns of ``schema`` unless ``complet`` is set.
+    """
+    if complet:
+        brut = read_first_sheet(chemin, DEFAULT_SHEETS)
+    else:
+        brut = read_sheet(chemin, schema.untyped(), DEFAULT_SHEETS)
+    return normaliser(brut, schema), brut
+
+
+def _selection(
+    r: Regle, brut: pd.DataFrame, colonnes: Mapping[str, str], mask: pd.Series
+) -> pd.DataFrame:
+    """Return the exported rows of ``mask`` for the rule ``r``, with their raw values."""
+    if r.lignes_completes:
+        return brut.loc[mask]
+    noms = r.colonnes or tuple(colonnes)
+    gardees = {colonnes[n] for n in noms if n in colonnes}
+    return brut.loc[mask, [c for c in brut.columns if c in gardees]]
+
+
+def evaluer(
+    chemins: Mapping[str, Path] | None = None, noms: Iterable[str] | None = None
+) -> dict[str, ResultatRegle]:
+    """Evaluate the rules ``noms`` (all by default) in a single pass.
+
+    Each workbook is parsed once with :func:`schema_classeur`, the columns
+    of all the rules reading it. A missing column or unreadable workbook fails only the rules that
+    need it; the error is kept in their :class:`ResultatRegle`.
+
+    Parameters
+    ----------
+    chemins : Mapping[str, Path] | None
+        Path of each logical workbook; :data:`CLASSEURS` in the workspace
+        for the ones not given.
+    noms : Iterable[str] | None
+        Rules to evaluate, in order.
+
+    Returns
+    -------
+    dict[str, ResultatRegle]
+        Result of each rule, by name.
+    """
+    chemins = chemins or {}
+    regles = [REGLES[nom] for nom in (noms or REGLES)]
+    besoins = dict.fromkeys(c for r in regles for c in (r.classeur, *(c for c, _ in r.annexes)))
+    complets = {r.classeur for r in regles if r.lignes_completes}
+
+    tables = Tables()
+    bruts: dict[str, pd.DataFrame] = {}
+    erreurs: dict[str, Exception] = {}
+    for classeur in besoins:
+        chemin = Path(chemins.get(classeur) or workspace_path(CLASSEURS[classeur]))
+        try:
+            tables[classeur], bruts[classeur] = charger(
+                chemin, schema_classeur(classeur), classeur in complets
+            )
+        except Exception as exc:
+            erreurs[classeur] = exc
+
+    resultats: dict[str, ResultatRegle] = {}
+    for r in regles:
+        echec = next(
+            (erreurs[c] for c in (r.classeur, *(c for c, _ in r.annexes)) if c in erreurs), None
+        )
+        if echec is not None:
+            resultats[r.nom] = ResultatRegle(r, erreur=echec)
+            continue
+        table = tables[r.classeur]
+        with span(r.nom, "regle", lignes=len(table)) as details:
+            try:
+                colonnes = columns_of(r.schema, table)
+                mask = r.masque(table, colonnes, tables)
+                lignes = _selection(r, bruts[r.classeur], colonnes, mask)
+            except Exception as exc:
+                resultats[r.nom] = ResultatRegle(r, erreur=exc)
+                continue
+            details["selection"] = len(lignes)
+        identifiants = table[colonnes["identifiant"]] if "identifiant" in colonnes else None
+        resultats[r.nom] = ResultatRegle(r, lignes, None, identifiants, mask)
+    return resultats
+
+
+def index_violations(resultats: Mapping[str, ResultatRegle]) -> IndexViolations:
+    """Return the bitmap of the anomaly rules failed by each requirement.
+
+    Only the successful anomaly rules whose workbook has an identifier
+    column take part; a requirement appearing in any of their tables is
+    indexed, with no bit set when it fails none of them.
+    """
+    retenus = [
+        r
+        for r in resultats.values()
+        if r.regle.anomalie and r.erreur is None and r.identifiants is not None
+    ]
+    if not retenus:
+        return IndexViolations.construire(np.array([], dtype=str), (), np.zeros((0, 0), bool))
+    ids = pd.unique(pd.concat([r.identifiants for r in retenus], ignore_index=True).dropna())
+    position = pd.Index(ids)
+    bits = np.zeros((len(ids), len(retenus)), dtype=bool)
+    for j, r in enumerate(retenus):
+        echecs = r.identifiants[r.selection].dropna().unique()
+        bits[position.get_indexer(echecs), j] = True
+    return IndexViolations.construire(
+        np.asarray(ids, dtype=str), tuple(r.regle.nom for r in retenus), bits
+    )
+
+
+def evaluer_regle(nom: str, **chemins: Path) -> pd.DataFrame:
+    """Return the rows selected by the rule ``nom``, raising its error if any."""
+    return evaluer(chemins, [nom])[nom].valeur()
+
+
+def flux_violations(nom: str, chemin: Path, audit_file: Path, chunksize: int) -> int:
+    """Stream ``chemin`` and append the violations of the rule ``nom`` to ``audit_file``.
+
+    Only rules reading a single workbook can be streamed. Each chunk is
+    read raw and normalised for the mask, so the written rows keep the
+    values of the workbook.
+
+    Returns
+    -------
+    int
+        Number of violating rows written.
+    """
+    r = REGLES[nom]
+    chunks = iter_sheet_chunks(chemin, DEFAULT_SHEETS, chunksize, r.schema.untyped())
+    return stream_violations(
+        chunks,
+        lambda chunk: columns_of(r.schema, chunk),
+        lambda chunk, colonnes: r.masque(normaliser(chunk, r.schema), colonnes, Tables()),
+        audit_file,
+    )
+
+
+def flux_selection(nom: str, chemin: Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Yield the complete rows selected by the rule ``nom``, chunk by chunk."""
+    r = REGLES[nom]
+    colonnes = None
+    for brut in iter_sheet_chunks(chemin, DEFAULT_SHEETS, chunksize):
+        table = normaliser(brut, r.schema)
+        if colonnes is None:
+            colonnes = columns_of(r.schema, table)
+        yield brut.loc[r.masque(table, colonnes, Tables())]
+
+
+def ecrire(resultats: Mapping[str, ResultatRegle], racine: Path | None = None) -> list[Path]:
+    """Write the output of every successful rule.
+
+    Anomaly CSVs are only written when the rule selected rows; product
+    workbooks are always written.
+
+    Parameters
+    ----------
+    resultats : Mapping[str, ResultatRegle]
+        Results of :func:`evaluer`.
+    racine : Path | None
+        Directory the outputs are relative to, the workspace by default.
+
+    Returns
+    -------
+    list[Path]
+        Files written.
+    """
+    ecrits = []
+    for resultat in resultats.values():
+        if resultat.erreur is not None or resultat.lignes is None:
+            continue
+        sortie = resultat.regle.sortie
+        chemin = workspace_path(sortie) if racine is None else Path(racine) / sortie
+        if chemin.suffix == ".xlsx":
+            write_workbook(chemin, {FEUILLE_SORTIE: resultat.lignes}, STYLE_MATRICE)
+        elif resultat.lignes.empty:
+            continue
+        else:
+            write_csv(resultat.lignes, chemin)
+        ecrits.append(chemin)
+    return ecrits
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Evaluate every rule, write the audit outputs and log a summary.
+
+    Returns
+    -------
+    None
+        Exits with status ``0`` when no rule failed or found an anomaly,
+        ``1`` otherwise.
+    """
+    configurer_journal(LOG_FILE, nom=None)
+    noms = argv if argv is not None else sys.argv[1:]
+    inconnues = [nom for nom in noms if nom not in REGLES]
+    if inconnues:
+        logging.error("Regles inconnues: %s", ", ".join(inconnues))
+        sys.exit(1)
+
+    resultats = evaluer(noms=noms or None)
+    try:
+        ecrire(resultats)
+        index_violations(resultats).enregistrer(workspace_path(INDEX_FILE))
+    except Exception as exc:
+        logging.exception("Erreur lors de l'ecriture des sorties: %s", exc)
+        sys.exit(1)
+
+    echec = False
+    for nom, resultat in resultats.items():
+        if resultat.erreur is not None:
+            logging.error("%s: %s", nom, resultat.erreur)
+            echec = True
+        elif resultat.anomalies:
+            logging.warning("%s: %d anomalies", nom, resultat.anomalies)
+            echec = True
+        else:
+            logging.info("%s: %d lignes", nom, len(resultat.lignes))
+    sys.exit(1 if echec else 0)
+
+
+if __name__ == "__main__":
+    main()
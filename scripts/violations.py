@@ -0,0 +1,177 @@
+"""Bitmap index of the audit rules failed by each requirement.
+
+``python -m scripts.validation`` stores, next to the audit extracts, one bit
+per anomaly rule for every requirement in ``audit/violations.npz``: the
+requirement identifiers, the rule names and the bits packed with
+:func:`numpy.packbits`, a few kilobytes for thousands of requirements.
+Queries only need NumPy.
+
+Usage::
+
+    python -m scripts.violations --resume
+    python -m scripts.violations --exigence REQ-12
+    python -m scripts.violations --echoue mop_manquants preuves_manquantes \\
+        --reussit exigences_incompletes
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+INDEX_FILE = "audit/violations.npz"
+# bump when the stored layout changes
+VERSION = 1
+
+
+@dataclass(frozen=True)
+class IndexViolations:
+    """Rules failed by each requirement, one bit per rule.
+
+    Parameters
+    ----------
+    identifiants : numpy.ndarray
+        Requirement identifiers, one per row of ``bits``.
+    regles : tuple[str, ...]
+        Rule names, bit ``j`` of a row standing for ``regles[j]``.
+    bits : numpy.ndarray
+        ``uint8`` array of shape ``(len(identifiants), ceil(len(regles) / 8))``
+        as returned by :func:`numpy.packbits` along the rule axis.
+    """
+
+    identifiants: np.ndarray
+    regles: tuple[str, ...]
+    bits: np.ndarray
+
+    @classmethod
+    def construire(
+        cls, identifiants: np.ndarray, regles: tuple[str, ...], echecs: np.ndarray
+    ) -> "IndexViolations":
+        """Return the index of the boolean matrix ``echecs`` (requirements x rules)."""
+        echecs = np.asarray(echecs, dtype=bool).reshape(len(identifiants), len(regles))
+        return cls(np.asarray(identifiants, dtype=str), tuple(regles), np.packbits(echecs, axis=1))
+
+    @cached_property
+    def _positions(self) -> dict[str, int]:
+        return {ident: i for i, ident in enumerate(self.identifiants.tolist())}
+
+    def _motif(self, regles: Iterable[str]) -> np.ndarray:
+        """Return the packed row with the bits of ``regles`` set."""
+        motif = np.zeros(self.bits.shape[1], dtype=np.uint8)
+        for nom in regles:
+            if nom not in self.regles:
+                raise KeyError(f"Regle absente de l'index: {nom}")
+            j = self.regles.index(nom)
+            motif[j >> 3] |= np.uint8(0x80 >> (j & 7))
+        return motif
+
+    def regles_de(self, identifiant: str) -> list[str]:
+        """Return the rules failed by the requirement ``identifiant``.
+
+        Raises
+        ------
+        KeyError
+            If the requirement is not indexed.
+        """
+        if identifiant not in self._positions:
+            raise KeyError(f"Exigence absente de l'index: {identifiant}")
+        ligne = np.unpackbits(self.bits[self._positions[identifiant]], count=len(self.regles))
+        return [nom for nom, bit in zip(self.regles, ligne) if bit]
+
+    def masque(self, echoue: Iterable[str] = (), reussit: Iterable[str] = ()) -> np.ndarray:
+        """Return the mask of requirements failing all of ``echoue`` and none of ``reussit``.
+
+        The comparison is made on the packed bytes, without unpacking them.
+        """
+        requis, exclus = self._motif(echoue), self._motif(reussit)
+        return np.all((self.bits & requis) == requis, axis=1) & ~np.any(
+            self.bits & exclus, axis=1
+        )
+
+    def requete(self, echoue: Iterable[str] = (), reussit: Iterable[str] = ()) -> list[str]:
+        """Return the requirements failing every rule of ``echoue`` and none of ``reussit``."""
+        return self.identifiants[self.masque(echoue, reussit)].tolist()
+
+    def comptes(self) -> dict[str, int]:
+        """Return the number of requirements failing each rule."""
+        totaux = np.unpackbits(self.bits, axis=1, count=len(self.regles)).sum(axis=0)
+        return {nom: int(total) for nom, total in zip(self.regles, totaux)}
+
+    def enregistrer(self, chemin: Path) -> None:
+        """Write the index to the ``.npz`` file ``chemin`` atomically."""
+        chemin = Path(chemin)
+        chemin.parent.mkdir(parents=True, exist_ok=True)
+        temporaire = chemin.with_name(f"{chemin.stem}.{os.getpid()}.tmp.npz")
+        np.savez_compressed(
+            temporaire,
+            version=np.array(VERSION),
+            identifiants=self.identifiants,
+            regles=np.array(self.regles, dtype=str),
+            bits=self.bits,
+        )
+        os.replace(temporaire, chemin)
+
+    @classmethod
+    def charger(cls, chemin: Path) -> "IndexViolations":
+        """Read an index written by :meth:`enregistrer`.
+
+        Raises
+        ------
+        ValueError
+            If the file was written with another layout version.
+        """
+        with np.load(chemin, allow_pickle=False) as donnees:
+            if int(donnees["version"]) != VERSION:
+                raise ValueError(f"{chemin}: version d'index {int(donnees['version'])} inconnue")
+            return cls(
+                donnees["identifiants"],
+                tuple(donnees["regles"].tolist()),
+                donnees["bits"],
+            )
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point of ``python -m scripts.violations``.
+
+    Prints the matching requirement identifiers one per line, the rules of
+    one requirement with ``--exigence`` or the count per rule with
+    ``--resume``.
+    """
+    parser = argparse.ArgumentParser(description="Interroge l'index des violations")
+    parser.add_argument("--index", type=Path, help=f"Index file, {INDEX_FILE} by default")
+    parser.add_argument("--echoue", nargs="+", default=[], help="Rules that must fail")
+    parser.add_argument("--reussit", nargs="+", default=[], help="Rules that must pass")
+    parser.add_argument("--exigence", help="List the rules failed by this requirement")
+    parser.add_argument("--resume", action="store_true", help="Count requirements per rule")
+    args = parser.parse_args(argv)
+
+    # like utils.workspace_path, without importing pandas
+    chemin = args.index or Path(os.environ.get("CERTIF_WORKSPACE", ".")) / INDEX_FILE
+    try:
+        index = IndexViolations.charger(chemin)
+    except (OSError, ValueError) as exc:
+        print(f"Index illisible: {exc}", file=sys.stderr)
+        raise SystemExit(1)
+
+    try:
+        if args.resume:
+            for nom, total in index.comptes().items():
+                print(f"{nom}\t{total}")
+        elif args.exigence:
+            print("\n".join(index.regles_de(args.exigence)))
+        else:
+            print("\n".join(index.requete(args.echoue, args.reussit)))
+    except KeyError as exc:
+        print(exc.args[0], file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
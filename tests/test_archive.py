@@ -0,0 +1,72 @@
+"""Tests for the incremental submission archive."""
+
+from __future__ import annotations
+
+import io
+import os
+import sys
+import zipfile
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from scripts.archive import build_archive, load_manifest, update_archive  # noqa: E402
+
+
+class _Pipe(io.RawIOBase):
+    """Write-only, non-seekable sink standing for a pipe."""
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:  # type: ignore[override]
+        self.data += b
+        return len(b)
+
+
+def _source(tmp_path: Path) -> Path:
+    source = tmp_path / "data"
+    (source / "preuves").mkdir(parents=True)
+    (source / "notes.txt").write_text("exigence " * 1000, encoding="utf-8")
+    (source / "preuves" / "rapport.csv").write_text("a,b\n1,2\n" * 500, encoding="utf-8")
+    (source / "classeur.xlsx").write_bytes(os.urandom(2048))
+    return source
+
+
+def test_update_archive_incremental(tmp_path: Path) -> None:
+    source = _source(tmp_path)
+    archive = tmp_path / "audit" / "dossier.zip"
+
+    stats = update_archive(source, archive, workers=2)
+    assert (stats.compressed, stats.stored, stats.reused) == (2, 1, 0)
+    with zipfile.ZipFile(archive) as zf:
+        assert zf.testzip() is None
+        assert sorted(zf.namelist()) == ["classeur.xlsx", "notes.txt", "preuves/rapport.csv"]
+        assert zf.getinfo("classeur.xlsx").compress_type == zipfile.ZIP_STORED
+        assert zf.read("notes.txt") == (source / "notes.txt").read_bytes()
+    assert set(load_manifest(archive)) == {"classeur.xlsx", "notes.txt", "preuves/rapport.csv"}
+
+    mtime = archive.stat().st_mtime_ns
+    assert update_archive(source, archive).unchanged
+    assert archive.stat().st_mtime_ns == mtime
+
+    (source / "notes.txt").write_text("modifie", encoding="utf-8")
+    stats = update_archive(source, archive)
+    assert (stats.compressed, stats.stored, stats.reused) == (1, 0, 2)
+    with zipfile.ZipFile(archive) as zf:
+        assert zf.testzip() is None
+        assert zf.read("notes.txt") == b"modifie"
+        assert zf.read("preuves/rapport.csv") == (source / "preuves" / "rapport.csv").read_bytes()
+
+
+def test_build_archive_streams(tmp_path: Path) -> None:
+    source = _source(tmp_path)
+    pipe = _Pipe()
+    manifest, stats = build_archive(source, pipe, workers=3)
+    assert stats.compressed == 2 and len(manifest) == 3
+    with zipfile.ZipFile(io.BytesIO(bytes(pipe.data))) as zf:
+        assert zf.testzip() is None
+        assert len(zf.namelist()) == 3
@@ -0,0 +1,91 @@
+"""Tests for the multi-dossier batch mode."""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from core.batch import EntreeLot, lancer_lot, lire_manifeste, resumer  # noqa: E402
+
+
+def _config(tmp_path: Path, exit_code: int = 0) -> tuple[Path, Path]:
+    script = tmp_path / "step.py"
+    script.write_text(
+        "import os, sys\n"
+        "from pathlib import Path\n"
+        "Path('audit').mkdir(exist_ok=True)\n"
+        "Path('audit/id.txt').write_text(os.environ['CERTIF_DOSSIER_ID'])\n"
+        f"sys.exit({exit_code})\n",
+        encoding="utf-8",
+    )
+    cfg = tmp_path / "workflow.yaml"
+    cfg.write_text(yaml.dump({"steps": [{"id": "step", "script": str(script)}]}), encoding="utf-8")
+    obj = tmp_path / "objectifs.yaml"
+    obj.write_text(
+        yaml.dump([{"id": "OBJ", "preconditions": ["step"], "actions": ["step"]}]),
+        encoding="utf-8",
+    )
+    return cfg, obj
+
+
+def test_lire_manifeste_csv_jsonl(tmp_path: Path) -> None:
+    csv_file = tmp_path / "lot.csv"
+    csv_file.write_text("id,chemin\nA,dossiers/a\nB,/abs/b\n", encoding="utf-8")
+    entrees = lire_manifeste(csv_file)
+    assert [e.id for e in entrees] == ["A", "B"]
+    assert entrees[0].chemin == tmp_path / "dossiers/a"
+    assert entrees[1].chemin == Path("/abs/b")
+
+    jsonl = tmp_path / "lot.jsonl"
+    jsonl.write_text(json.dumps({"id": "C", "path": "c"}) + "\n\n", encoding="utf-8")
+    assert lire_manifeste(jsonl) == [EntreeLot("C", tmp_path / "c")]
+
+
+def test_lire_manifeste_invalid(tmp_path: Path) -> None:
+    csv_file = tmp_path / "lot.csv"
+    csv_file.write_text("id,chemin\nA,\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        lire_manifeste(csv_file)
+
+
+def test_lancer_lot(tmp_path: Path) -> None:
+    cfg, obj = _config(tmp_path)
+    entrees = []
+    for ident in ("D1", "D2", "D3"):
+        (tmp_path / ident / "data").mkdir(parents=True)
+        entrees.append(EntreeLot(ident, tmp_path / ident))
+    entrees.append(EntreeLot("ABSENT", tmp_path / "absent"))
+    sortie = tmp_path / "resultats.jsonl"
+
+    resultats = lancer_lot(entrees, cfg, obj, concurrence=2, sortie=sortie)
+
+    assert [r.id for r in resultats] == ["D1", "D2", "D3", "ABSENT"]
+    assert all(r.statut == "termine" for r in resultats[:3])
+    assert resultats[0].etapes == {"step": "succes"}
+    assert resultats[0].objectifs == {"OBJ": "atteint"}
+    assert resultats[3].statut == "erreur"
+    for ident in ("D1", "D2", "D3"):
+        assert (tmp_path / ident / "audit" / "id.txt").read_text() == ident
+        assert (tmp_path / ident / "data" / "statut.txt").read_text() == "termine"
+    assert len(sortie.read_text(encoding="utf-8").splitlines()) == 4
+
+    resume = resumer(resultats)
+    assert resume["total"] == 4
+    assert resume["statuts"] == {"erreur": 1, "termine": 3}
+    assert resume["echecs"] == ["ABSENT"]
+
+
+def test_lancer_lot_failure(tmp_path: Path) -> None:
+    cfg, obj = _config(tmp_path, exit_code=1)
+    (tmp_path / "D" / "data").mkdir(parents=True)
+    (resultat,) = lancer_lot([EntreeLot("D", tmp_path / "D")], cfg, obj)
+    assert resultat.statut == "echec"
+    assert resultat.etapes == {"step": "echec"}
+    assert resultat.objectifs == {}
@@ -0,0 +1,43 @@
+"""Tests for the synthetic dossier generator and the benchmark runner."""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks import ParametresGeneration, generer_dossier  # noqa: E402
+from benchmarks.runner import comparer, lancer_benchmarks  # noqa: E402
+from scripts.check_mop import check_mop  # noqa: E402
+
+
+def test_generer_dossier(tmp_path: Path) -> None:
+    parametres = ParametresGeneration(lignes=400, taux_nuls=0.25, taux_doublons=0.1, graine=1)
+    fichiers = generer_dossier(tmp_path, parametres)
+    assert set(fichiers) == {"exigences", "mop", "preuves", "retours"}
+
+    preuves = pd.read_excel(fichiers["preuves"], sheet_name="Liste_documentaire")
+    assert len(preuves) == 400
+    assert preuves["ID"].duplicated().any()
+    assert 0.1 < preuves["Preuve_test"].isna().mean() < 0.4
+
+    retours = pd.read_excel(fichiers["retours"])
+    assert {"Élevée", "elevee"} <= set(retours["Criticité"])
+    assert len(check_mop(fichiers["mop"])) > 0
+    assert generer_dossier(tmp_path / "bis", parametres)  # reproducible with the seed
+    assert pd.read_excel(tmp_path / "bis" / "preuves.xlsx").equals(preuves)
+
+
+def test_lancer_benchmarks_and_compare() -> None:
+    rapport = lancer_benchmarks([50], repetitions=2, pipeline=False, fonctions=["check_mop"])
+    (mesure, generation) = rapport["resultats"]
+    assert (mesure["taille"], mesure["fonction"]) == (50, "check_mop")
+    assert len(mesure["secondes"]) == 2 and mesure["lignes_resultat"] >= 0
+    assert generation["fonction"] == "generation"
+
+    (ligne, _) = comparer(rapport, rapport)
+    assert ligne["ratio"] == 1.0
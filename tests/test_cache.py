@@ -0,0 +1,151 @@
+"""Tests for the process-wide parsed-workbook cache."""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from main import precompute_cache  # noqa: E402
+from scripts import cache, utils  # noqa: E402
+from scripts.cache import WORKBOOK_CACHE, SidecarCache, WorkbookCache  # noqa: E402
+from scripts.gerer_retours import (  # noqa: E402
+    extract_critiques,
+    sidecar_path,
+    update_traitement,
+)
+from scripts.utils import read_first_sheet  # noqa: E402
+from scripts.validation import evaluer_regle  # noqa: E402
+
+
+def _workbook(path: Path, values: list[str]) -> Path:
+    pd.DataFrame({"Commentaire": values, "Criticité": ["Haute"] * len(values)}).to_excel(
+        path, index=False, engine="openpyxl"
+    )
+    return path
+
+
+def test_read_first_sheet_cached_copy(tmp_path: Path) -> None:
+    WORKBOOK_CACHE.clear()
+    path = _workbook(tmp_path / "r.xlsx", ["a", "b"])
+
+    first = read_first_sheet(path)
+    first.loc[0, "Commentaire"] = "modifie"
+    first["Nouvelle"] = 1
+    second = read_first_sheet(path)
+
+    assert WORKBOOK_CACHE.misses == 1 and WORKBOOK_CACHE.hits == 1
+    assert second.loc[0, "Commentaire"] == "a"
+    assert "Nouvelle" not in second.columns
+
+
+def test_modified_file_is_reparsed(tmp_path: Path) -> None:
+    WORKBOOK_CACHE.clear()
+    path = _workbook(tmp_path / "r.xlsx", ["a"])
+    read_first_sheet(path)
+    _workbook(path, ["a", "b", "c"])
+    assert len(read_first_sheet(path)) == 3
+    assert WORKBOOK_CACHE.misses == 2
+
+
+def test_lru_eviction(tmp_path: Path) -> None:
+    cache = WorkbookCache(maxsize=2)
+    paths = [_workbook(tmp_path / f"{i}.xlsx", ["x"]) for i in range(3)]
+    for path in paths:
+        cache.get_or_load(path, (), lambda: pd.DataFrame({"A": [1]}))
+    cache.get_or_load(paths[0], (), lambda: pd.DataFrame({"A": [1]}))
+    assert cache.misses == 4
+
+
+def test_update_traitement_invalidates(tmp_path: Path) -> None:
+    WORKBOOK_CACHE.clear()
+    path = _workbook(tmp_path / "r.xlsx", ["corrigé", "à voir"])
+    extract_critiques(path)
+    update_traitement(path)
+    assert "Traité" in read_first_sheet(path).columns
+
+
+def test_sidecar_roundtrip(tmp_path: Path) -> None:
+    path = _workbook(tmp_path / "r.xlsx", ["a", "b"])
+    sidecars = SidecarCache(tmp_path / "cache")
+    df = pd.DataFrame({"n": range(1000), "s": ["x"] * 1000})
+    first = sidecars.load(path, ("k",), lambda: df)
+
+    def fail() -> pd.DataFrame:
+        raise AssertionError("workbook parsed again")
+
+    second = sidecars.load(path, ("k",), fail)
+    pd.testing.assert_frame_equal(first, second)
+    second.loc[0, "n"] = -1
+    assert sidecars.load(path, ("k",), fail).loc[0, "n"] == 0
+
+
+def test_sidecar_eviction(tmp_path: Path) -> None:
+    sidecars = SidecarCache(tmp_path / "cache", max_bytes=1)
+    for i in range(3):
+        path = _workbook(tmp_path / f"{i}.xlsx", [str(i)])
+        sidecars.load(path, (), lambda: pd.DataFrame({"A": range(100)}))
+    assert len(list((tmp_path / "cache").glob("*.pk5"))) <= 1
+
+
+def test_precompute_cache(tmp_path: Path) -> None:
+    _workbook(tmp_path / "r.xlsx", ["a"])
+    try:
+        assert precompute_cache([tmp_path], tmp_path / "cache", 1 << 20) == 1
+    finally:
+        cache.configure_sidecar(None)
+    assert len(list((tmp_path / "cache").glob("*.pk5"))) == 1
+
+
+def test_precompute_cache_warms_rule_projections(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    mop = tmp_path / "mop.xlsx"
+    df = pd.DataFrame({"ID": ["R1", "R2"], "Applicabilité": ["Oui", "Oui"], "MOP": ["M", None]})
+    df.to_excel(mop, index=False, engine="openpyxl")
+    try:
+        assert precompute_cache([tmp_path], tmp_path / "cache", 1 << 20) == 1
+        # the full sheet and the projection of the audit rules
+        assert len(list((tmp_path / "cache").glob("*.pk5"))) == 2
+
+        WORKBOOK_CACHE.clear()
+
+        def refuse(*args, **kwargs):
+            raise AssertionError("workbook parsed again")
+
+        monkeypatch.setattr(utils, "iter_sheet_chunks", refuse)
+        assert list(evaluer_regle("mop_manquants", mop=mop)["ID"]) == ["R2"]
+    finally:
+        cache.configure_sidecar(None)
+
+
+def test_update_traitement_writes_only_changes(tmp_path: Path) -> None:
+    path = _workbook(tmp_path / "r.xlsx", ["corrigé", "à voir"])
+    with pd.ExcelWriter(path, engine="openpyxl", mode="a") as writer:
+        pd.DataFrame({"x": [1]}).to_excel(writer, sheet_name="Autre", index=False)
+
+    update_traitement(path)
+    assert read_first_sheet(path)["Traité"].tolist() == ["Oui", "Non"]
+    assert "Autre" in pd.ExcelFile(path).sheet_names
+    mtime = path.stat().st_mtime_ns
+    summary = update_traitement(path)
+    assert path.stat().st_mtime_ns == mtime
+    assert dict(zip(summary["Traite"], summary["Occurrences"])) == {"Oui": 1, "Non": 1}
+
+
+def test_update_traitement_sidecar(tmp_path: Path) -> None:
+    path = _workbook(tmp_path / "r.xlsx", ["résolu", "à voir"])
+    mtime = path.stat().st_mtime_ns
+    update_traitement(path, mode="sidecar")
+    sidecar = sidecar_path(path)
+    assert path.stat().st_mtime_ns == mtime
+    assert sorted(json.loads(sidecar.read_text(encoding="utf-8")).values()) == ["Non", "Oui"]
+    written = sidecar.stat().st_mtime_ns
+    update_traitement(path, mode="sidecar")
+    assert sidecar.stat().st_mtime_ns == written
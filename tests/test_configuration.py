@@ -0,0 +1,82 @@
+"""Tests for the compiled configuration cache."""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from core import ObjectifManager  # noqa: E402
+from core.objectifs import charger_catalogue  # noqa: E402
+from workflow import configuration  # noqa: E402
+from workflow.configuration import compiler_workflow, lire_yaml, vider_cache  # noqa: E402
+
+
+@pytest.fixture
+def cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    repertoire = tmp_path / "cache"
+    monkeypatch.setenv("CERTIF_CONFIG_CACHE", str(repertoire))
+    vider_cache()
+    yield repertoire
+    vider_cache()
+
+
+def test_workflow_compiled_once_and_reused(
+    cache: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cfg = tmp_path / "workflow.yaml"
+    cfg.write_text(Path("workflow_certif.yaml").read_text(encoding="utf-8"), encoding="utf-8")
+    config = compiler_workflow(cfg)
+    assert [e.classe for e in config.etapes][:2] == ["Validation", "SoumettreDossier"]
+    assert config.etapes[0].preconditions == (
+        "data/exigences.xlsx", "data/mop.xlsx", "data/preuves.xlsx"
+    )
+    assert compiler_workflow(cfg) is config
+    assert len(list(cache.glob("workflow-*.json"))) == 1
+
+    # a new process finds the compiled form on disk and never parses YAML
+    vider_cache()
+    monkeypatch.setattr(configuration.yaml, "load", lambda *a, **k: pytest.fail("YAML parsed"))
+    assert compiler_workflow(cfg) == config
+    monkeypatch.undo()
+    monkeypatch.setenv("CERTIF_CONFIG_CACHE", str(cache))
+
+    cfg.write_text("steps:\n  - id: seule\n    script: scripts/seule.py\n", encoding="utf-8")
+    (etape,) = compiler_workflow(cfg).etapes
+    assert (etape.id, etape.classe, etape.outputs) == ("seule", "ScriptStep", ())
+
+
+def test_invalid_files_are_rejected(cache: Path, tmp_path: Path) -> None:
+    cfg = tmp_path / "workflow.yaml"
+    cfg.write_text("steps:\n  - id: a\n  - id: a\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="definie deux fois"):
+        compiler_workflow(cfg)
+    cfg.write_text("steps:\n  - id: a\n    outputs: audit/a.csv\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="outputs de a"):
+        compiler_workflow(cfg)
+    assert not list(cache.glob("*.json"))
+
+
+def test_objectives_catalogue_and_raw_yaml(cache: Path, tmp_path: Path) -> None:
+    fichier = tmp_path / "objectifs.yaml"
+    fichier.write_text(
+        "- {id: A}\n- {id: B, dependances: [A], date: 2024-01-01}\n", encoding="utf-8"
+    )
+    catalogue = charger_catalogue(fichier)
+    assert [i for i, _ in catalogue.definitions] == ["A", "B"]
+    assert catalogue.graphe == {"A": [], "B": ["A"]}
+    manager = ObjectifManager(tmp_path / "objectifs.log")
+    manager.charger_yaml(fichier)
+    assert manager.graphe == catalogue.graphe
+
+    # dates do not survive JSON: kept in memory only, and copies are independent
+    brut = lire_yaml(fichier)
+    brut[0]["id"] = "modifie"
+    assert lire_yaml(fichier)[0]["id"] == "A"
+    assert not list(cache.glob("yaml-*.json"))
+    assert configuration.CHARGEUR is getattr(yaml, "CSafeLoader", yaml.SafeLoader)
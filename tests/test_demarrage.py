@@ -0,0 +1,39 @@
+"""Tests for the lazy imports of the entry points and the startup benchmark."""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks.demarrage import ROOT, analyser_importtime, mesurer_cas  # noqa: E402
+
+
+def test_cli_does_not_load_pandas() -> None:
+    code = "import sys, main, core, workflow; print(sorted({'pandas', 'yaml'} & set(sys.modules)))"
+    sortie = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    assert sortie.stdout.strip() == "[]"
+
+
+def test_lazy_exports_resolve() -> None:
+    import core
+    import workflow
+
+    assert workflow.WorkflowCertifEngine.__module__ == "workflow.engine"
+    assert "ObjectifManager" in dir(core)
+    assert core.lancer_lot.__module__ == "core.batch"
+
+
+def test_importtime_is_measured() -> None:
+    modules = analyser_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |     numpy.core\n"
+        "import time:       250 |        350 |   numpy\n"
+    )
+    assert modules == {"numpy.core": (100, 100), "numpy": (250, 350)}
+    mesure = mesurer_cas(["-c", "import json"], repetitions=1)
+    assert mesure["mediane_ms"] > 0 and mesure["differes_charges"] == []
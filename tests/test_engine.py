@@ -5,7 +5,10 @@ import sys
 ROOT = os.path.dirname(os.path.dirname(__file__))
 sys.path.append(ROOT)
 
+import pytest  # noqa: E402
+
 from workflow import CertificationDossier, WorkflowCertifEngine  # noqa: E402
+from workflow.steps import EtapeWorkflow  # noqa: E402
 
 
 
@@ -13,11 +16,11 @@ def test_engine_load_and_run(tmp_path: Path) -> None:
     yaml_path = Path('workflow_certif.yaml')
     engine = WorkflowCertifEngine()
     engine.charger_workflow(yaml_path)
-    assert len(engine.etapes) == 5
+    assert len(engine.etapes) == 3
 
     dossier_dir = tmp_path / 'dossier'
     dossier_dir.mkdir()
-    dossier = CertificationDossier('TEST', dossier_dir)
+    dossier = CertificationDossier('TEST', dossier_dir, espace_travail=dossier_dir)
     # run steps; they will likely fail due to missing scripts but should raise RuntimeError
     try:
         engine.lancer(dossier)
@@ -25,3 +28,42 @@ def test_engine_load_and_run(tmp_path: Path) -> None:
         assert dossier.statut == 'echec'
     else:
         assert dossier.statut == 'termine'
+
+
+def test_script_step_runs_in_workspace(tmp_path: Path) -> None:
+    import pandas as pd
+
+    espace = tmp_path / 'CAF002'
+    (espace / 'data').mkdir(parents=True)
+    pd.DataFrame({'Applicability': ['Oui'], 'MOP': [None]}).to_excel(
+        espace / 'data' / 'mop.xlsx', index=False, engine='openpyxl'
+    )
+    engine = WorkflowCertifEngine()
+    engine.charger_workflow(Path('workflow_certif.yaml'))
+    dossier = CertificationDossier('CAF002', espace / 'data', espace_travail=espace)
+
+    etape = engine.etapes_dict['validation']
+    assert not etape.executer(dossier)
+    assert (espace / 'audit' / 'mop_manquants.csv').exists()
+    assert 'audit/violations.npz' in etape.outputs
+    assert (espace / 'audit' / 'violations.npz').exists()
+    assert (espace / 'logs' / 'validation.log').exists()
+
+
+class RaisingStep(EtapeWorkflow):
+    """Step raising instead of returning its status."""
+
+    def executer(self, dossier: CertificationDossier) -> bool:
+        raise ValueError("classeur illisible")
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_raising_step_is_a_failure(tmp_path: Path, workers: int) -> None:
+    engine = WorkflowCertifEngine()
+    engine.etapes = [RaisingStep(None, id='casse')]
+    dossier = CertificationDossier('TEST', tmp_path, espace_travail=tmp_path)
+
+    with pytest.raises(RuntimeError, match='casse'):
+        engine.lancer(dossier, workers=workers)
+    assert [(r.id, r.statut) for r in engine.resultats] == [('casse', 'echec')]
+    assert dossier.statut == 'echec'
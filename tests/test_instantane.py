@@ -0,0 +1,58 @@
+"""Tests for the filesystem stat snapshot."""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from workflow import InstantaneFS, WorkflowCertifEngine, CertificationDossier  # noqa: E402
+from workflow.steps import EtapeWorkflow  # noqa: E402
+
+
+def test_queries_are_answered_from_one_scan(tmp_path: Path, monkeypatch) -> None:
+    (tmp_path / "a.txt").write_text("abc", encoding="utf-8")
+    (tmp_path / "sous").mkdir()
+    scans: list[str] = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda p: scans.append(p) or scandir(p))
+
+    fs = InstantaneFS()
+    assert fs.existe(tmp_path / "a.txt") and fs.est_fichier(tmp_path / "a.txt")
+    assert fs.taille(tmp_path / "a.txt") == 3
+    assert fs.mtime(tmp_path / "a.txt") == (tmp_path / "a.txt").stat().st_mtime
+    assert fs.est_repertoire(tmp_path / "sous") and not fs.existe(tmp_path / "absent")
+    assert not fs.existe(tmp_path / "absent" / "b.txt")
+    assert scans == [str(tmp_path), str(tmp_path / "absent")]
+
+    (tmp_path / "sous" / "c").mkdir()
+    (tmp_path / "nouveau.txt").write_text("x", encoding="utf-8")
+    assert not fs.existe(tmp_path / "nouveau.txt")  # stale until invalidated
+    fs.invalider(tmp_path / "sous" / "c" / "d.txt")
+    assert fs.existe(tmp_path / "nouveau.txt")
+
+
+class EcritureStep(EtapeWorkflow):
+    """Step writing its declared output."""
+
+    def executer(self, dossier: CertificationDossier) -> bool:
+        sortie = dossier.racine / self.outputs[0]
+        sortie.parent.mkdir(parents=True, exist_ok=True)
+        sortie.write_text("ok", encoding="utf-8")
+        return True
+
+
+def test_engine_refreshes_outputs_of_its_steps(tmp_path: Path) -> None:
+    etape = EcritureStep(None, id="ecriture", outputs=["outputs/resultat.csv"])
+    engine = WorkflowCertifEngine()
+    engine.etapes = [etape]
+    engine.etapes_dict = {"ecriture": etape}
+    dossier = CertificationDossier("ID", tmp_path / "data", espace_travail=tmp_path)
+    conditions = [{"fichier": "outputs/resultat.csv", "existe": True}]
+
+    assert not engine.verifier_conditions_succes(conditions, tmp_path)
+    assert engine.executer_etape(etape, dossier)
+    assert engine.fs.existe(tmp_path / "outputs")
+    assert engine.verifier_conditions_succes(conditions, tmp_path)
@@ -0,0 +1,121 @@
+"""Tests for the queue-based JSON-lines logging."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from core import Objectif, ObjectifManager  # noqa: E402
+from workflow import CertificationDossier, WorkflowCertifEngine  # noqa: E402
+from workflow.logger import (  # noqa: E402
+    RUN_ID,
+    _ECOUTEURS,
+    configurer_journal,
+    contexte,
+    fichier_processus,
+    tronquer,
+)
+from workflow.steps import EtapeWorkflow  # noqa: E402
+
+
+def _flush(nom: str) -> None:
+    ecouteur, _, _ = _ECOUTEURS[nom]
+    ecouteur.stop()
+    ecouteur.start()
+
+
+def test_records_carry_context(tmp_path: Path) -> None:
+    fichier = tmp_path / "journal.log"
+    logger = configurer_journal(fichier, "test_journal_contexte")
+    assert configurer_journal(fichier, "test_journal_contexte") is logger
+
+    with contexte(dossier_id="CAF001", step_id="check_mop"):
+        logger.info("dans %s", "l'etape")
+    logger.warning("hors contexte")
+    _flush("test_journal_contexte")
+
+    premier, second = [json.loads(line) for line in fichier.read_text(encoding="utf-8").splitlines()]
+    assert premier["message"] == "dans l'etape"
+    assert (premier["run_id"], premier["dossier_id"], premier["step_id"]) == (
+        RUN_ID,
+        "CAF001",
+        "check_mop",
+    )
+    assert second["niveau"] == "WARNING" and second["step_id"] is None
+    assert not (tmp_path / "autre.log").exists()
+
+
+def test_tronquer_keeps_end() -> None:
+    assert tronquer("abc", 5) == "abc"
+    assert tronquer("0123456789", 4) == "[... 6 caracteres omis]6789"
+
+
+def test_configurer_journal_switches_file(tmp_path: Path) -> None:
+    """A process reused for another dossier logs into the new file only."""
+    premier, second = tmp_path / "a" / "objectifs.log", tmp_path / "b" / "objectifs.log"
+    logger = configurer_journal(premier, "test_journal_fichiers")
+    logger.info("dossier A")
+    assert configurer_journal(second, "test_journal_fichiers") is logger
+    logger.info("dossier B")
+    _flush("test_journal_fichiers")
+
+    messages = [
+        [json.loads(ligne)["message"] for ligne in f.read_text(encoding="utf-8").splitlines()]
+        for f in (premier, second)
+    ]
+    assert messages == [["dossier A"], ["dossier B"]]
+    assert len(logging.getLogger("test_journal_fichiers").handlers) == 1
+
+
+def test_fichier_processus_per_worker(tmp_path: Path) -> None:
+    fichier = tmp_path / "workflow.log"
+    assert fichier_processus(fichier) == fichier
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        enfant = pool.submit(fichier_processus, fichier).result()
+    assert enfant.parent == tmp_path and enfant.name.startswith("workflow-")
+    assert enfant.suffix == ".log" and enfant != fichier
+
+
+class BavardeStep(EtapeWorkflow):
+    """Step logging one message."""
+
+    def executer(self, dossier: CertificationDossier) -> bool:
+        self.logger.log_info(f"etape de {dossier.id}")
+        return True
+
+
+def _messages(fichier: Path) -> list[str]:
+    lignes = fichier.read_text(encoding="utf-8").splitlines()
+    return [json.loads(ligne)["message"] for ligne in lignes]
+
+
+def test_logs_follow_the_dossier_workspace(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ailleurs, espace = tmp_path / "ailleurs", tmp_path / "espace"
+    ailleurs.mkdir()
+    (espace / "data").mkdir(parents=True)
+    monkeypatch.chdir(ailleurs)
+
+    engine = WorkflowCertifEngine()
+    engine.etapes = [BavardeStep(None, id="bavarde")]
+    engine.etapes_dict = {"bavarde": engine.etapes[0]}
+    dossier = CertificationDossier("D1", espace / "data", espace_travail=espace)
+    engine.lancer(dossier)
+    manager = ObjectifManager()
+    manager.objectifs = {"O": Objectif("O", actions=["bavarde"])}
+    manager.declencher(engine, dossier)
+    _flush("workflow_certif")
+    _flush("objectif_manager")
+
+    assert "etape de D1" in _messages(espace / "logs" / "workflow.log")
+    assert "Statut O: atteint" in _messages(espace / "logs" / "objectifs.log")
+    assert not (ailleurs / "logs" / "workflow.log").exists()
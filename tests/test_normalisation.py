@@ -0,0 +1,32 @@
+"""Tests for the categorical normalisation of enumerated columns."""
+
+from __future__ import annotations
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from scripts.normalisation import CRITICITE, OUI_NON, masque, normaliser, poids  # noqa: E402
+
+
+def test_normaliser_folds_to_canonical_labels() -> None:
+    series = pd.Series(["Élevée", " elevee", "HAUTE", "critique", None], name="Criticité")
+    result = normaliser(series, CRITICITE)
+
+    assert isinstance(result.dtype, pd.CategoricalDtype)
+    assert list(result.cat.categories) == [*CRITICITE.labels, "critique"]
+    assert result.tolist()[:4] == ["élevée", "élevée", "haute", "critique"]
+    assert pd.isna(result.iloc[4])
+    assert normaliser(result, CRITICITE) is result
+
+
+def test_masque_and_poids() -> None:
+    applicability = pd.Series(["Oui", "non", "OUI", None], index=[3, 5, 7, 9])
+    assert masque(applicability, OUI_NON, "oui").tolist() == [True, False, True, False]
+    assert masque(applicability, OUI_NON, "oui").index.tolist() == [3, 5, 7, 9]
+
+    criticity = pd.Series(["Haute", "Basse", "inconnue", None])
+    assert poids(criticity, CRITICITE, {"haute": 3, "basse": 1}).tolist() == [3, 1, 0, 0]
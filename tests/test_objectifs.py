@@ -1,10 +1,13 @@
 from pathlib import Path
 import sys
 import os
+import time
+
+import pytest
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from core import ObjectifManager
+from core import ObjectifManager, graphe_objectifs
 from workflow import WorkflowCertifEngine, CertificationDossier
 from workflow.steps import EtapeWorkflow
 
@@ -43,3 +46,150 @@ def test_objectif_manager(tmp_path: Path) -> None:
     manager.declencher(engine, dossier)
 
     assert manager.objectifs["OBJ"].statut == "atteint"
+
+
+class CountingStep(EtapeWorkflow):
+    """Step counting its runs, optionally rewriting its own input."""
+
+    def __init__(self, id: str, source: Path, sortie: Path | None = None) -> None:
+        outputs = [str(sortie)] if sortie else []
+        super().__init__(None, id=id, preconditions=[str(source)], outputs=outputs)
+        self.source = source
+        self.sortie = sortie
+        self.appels = 0
+
+    def executer(self, dossier: CertificationDossier) -> bool:
+        self.appels += 1
+        if self.sortie:
+            self.sortie.write_text(self.source.read_text(encoding="utf-8") + "!", encoding="utf-8")
+        return True
+
+
+def test_actions_memoised_across_objectives(tmp_path: Path) -> None:
+    source = tmp_path / "retours.txt"
+    source.write_text("a", encoding="utf-8")
+    lecture = CountingStep("lecture", source)
+    mutation = CountingStep("mutation", source, sortie=source)
+    engine = WorkflowCertifEngine()
+    engine.etapes = [lecture, mutation]
+    engine.etapes_dict = {"lecture": lecture, "mutation": mutation}
+    dossier = CertificationDossier("ID", tmp_path / "data")
+
+    yaml_file = tmp_path / "obj.yaml"
+    yaml_file.write_text(
+        """
+- id: A
+  actions: [lecture, mutation]
+- id: B
+  actions: [mutation, lecture]
+""",
+        encoding="utf-8",
+    )
+    manager = ObjectifManager(tmp_path / "objectifs.log")
+    manager.charger_yaml(yaml_file)
+    manager.declencher(engine, dossier)
+
+    assert {o.statut for o in manager.objectifs.values()} == {"atteint"}
+    # mutation rewrote the input of lecture, which had to run again once
+    assert (lecture.appels, mutation.appels) == (2, 1)
+    source.write_text("modifie", encoding="utf-8")
+    assert engine.executer_etape(mutation, dossier)
+    assert mutation.appels == 2
+    engine.invalider()
+    assert engine.executer_etape(lecture, dossier) and lecture.appels == 3
+
+
+def test_trouver_etape_by_script(tmp_path: Path) -> None:
+    engine = WorkflowCertifEngine()
+    engine.charger_workflow(Path("workflow_certif.yaml"))
+    assert engine.trouver_etape("scripts/validation.py") is engine.etapes_dict["validation"]
+    assert engine.trouver_etape("inconnue") is None
+
+
+class SleepingStep(EtapeWorkflow):
+    """Step recording the time window of its execution."""
+
+    def __init__(self, id: str, fenetres: dict[str, tuple[float, float]]) -> None:
+        super().__init__(None, id=id)
+        self.fenetres = fenetres
+
+    def executer(self, dossier: CertificationDossier) -> bool:
+        debut = time.perf_counter()
+        time.sleep(0.2)
+        self.fenetres[self.id] = (debut, time.perf_counter())
+        return self.id != "echec"
+
+
+def _manager(tmp_path: Path, contenu: str) -> ObjectifManager:
+    yaml_file = tmp_path / "obj.yaml"
+    yaml_file.write_text(contenu, encoding="utf-8")
+    manager = ObjectifManager(tmp_path / "objectifs.log")
+    manager.charger_yaml(yaml_file)
+    return manager
+
+
+def test_objectives_follow_dependency_graph(tmp_path: Path) -> None:
+    fenetres: dict[str, tuple[float, float]] = {}
+    engine = WorkflowCertifEngine()
+    engine.etapes = [SleepingStep(i, fenetres) for i in ("a", "b", "c", "echec")]
+    engine.etapes_dict = {e.id: e for e in engine.etapes}
+    manager = _manager(
+        tmp_path,
+        """
+- id: C
+  dependances: {objectifs: [A, B]}
+  actions: [c]
+- id: A
+  actions: [a]
+- id: B
+  dependances: {etapes: [b]}
+- id: E
+  actions: [echec]
+- id: F
+  dependances: [E]
+  actions: [c]
+- id: G
+  dependances: [F]
+""",
+    )
+    manager.declencher(engine, CertificationDossier("ID", tmp_path), workers=4)
+
+    statuts = {o.id: o.statut for o in manager.objectifs.values()}
+    assert statuts == {
+        "A": "atteint", "B": "atteint", "C": "atteint", "E": "bloque", "F": "bloque", "G": "bloque"
+    }
+    # A and B ran side by side, C only after both
+    assert fenetres["a"][0] < fenetres["b"][1] and fenetres["b"][0] < fenetres["a"][1]
+    assert fenetres["c"][0] >= max(fenetres["a"][1], fenetres["b"][1])
+
+
+def test_dependency_cycles_are_rejected(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="A -> B -> A"):
+        _manager(tmp_path, "- {id: A, dependances: [B]}\n- {id: B, dependances: [A]}\n")
+    with pytest.raises(ValueError, match="inconnue"):
+        _manager(tmp_path, "- {id: A, dependances: [Z]}\n")
+    assert graphe_objectifs({}) == {}
+
+
+def test_conflicting_objectives_are_serialised(tmp_path: Path) -> None:
+    fenetres: dict[str, tuple[float, float]] = {}
+    engine = WorkflowCertifEngine()
+    engine.etapes = [SleepingStep(i, fenetres) for i in ("ecrit", "lit", "autre")]
+    engine.etapes[0].outputs = ["audit/rapport.csv"]
+    engine.etapes[1].preconditions = ["audit/"]
+    engine.etapes[2].preconditions = ["data/exigences.xlsx"]
+    engine.etapes_dict = {e.id: e for e in engine.etapes}
+    manager = _manager(
+        tmp_path,
+        """
+- {id: A, actions: [ecrit]}
+- {id: B, actions: [lit]}
+- {id: C, actions: [autre]}
+""",
+    )
+    manager.declencher(engine, CertificationDossier("ID", tmp_path), workers=4)
+
+    assert {o.statut for o in manager.objectifs.values()} == {"atteint"}
+    # B reads what A writes; C shares nothing and runs beside A
+    assert fenetres["lit"][0] >= fenetres["ecrit"][1]
+    assert fenetres["autre"][0] < fenetres["ecrit"][1]
@@ -0,0 +1,61 @@
+"""Tests for declarative sheet schemas."""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from scripts.check_mop import check_mop  # noqa: E402
+from scripts.schema import ColumnSpec, SheetSchema, _resolve  # noqa: E402
+from scripts.utils import read_sheet  # noqa: E402
+
+SCHEMA = SheetSchema.of(
+    identifiant=ColumnSpec((r"^ID$",), (r"id",), "text"),
+    mop=ColumnSpec((r"^MOP$",)),
+    note=ColumnSpec((r"^Note$",), required=False),
+)
+
+
+def test_resolve_memoised() -> None:
+    _resolve.cache_clear()
+    header = ["Titre", "ID", "MOP"]
+    assert SCHEMA.resolve(header) == {"identifiant": "ID", "mop": "MOP"}
+    SCHEMA.resolve(list(header))
+    assert _resolve.cache_info().hits == 1
+    assert SCHEMA.project(header) == [1, 2]
+    with pytest.raises(KeyError):
+        SCHEMA.resolve(["ID"])
+
+
+def test_read_sheet_projects_columns(tmp_path: Path) -> None:
+    path = tmp_path / "mop.xlsx"
+    pd.DataFrame(
+        {"ID": [1, 2], "Libellé": ["a", "b"], "MOP": ["T", None], "Autre": [0, 0]}
+    ).to_excel(path, index=False, engine="openpyxl")
+
+    df = read_sheet(path, SCHEMA)
+    assert list(df.columns) == ["ID", "MOP"]
+    assert df["ID"].tolist() == ["1", "2"]
+    assert df["MOP"].isna().tolist() == [False, True]
+
+
+def test_check_mop_returns_projection(tmp_path: Path) -> None:
+    path = tmp_path / "mop.xlsx"
+    pd.DataFrame(
+        {
+            "ID": ["E1", "E2"],
+            "Description": ["x", "y"],
+            "Applicabilité": ["Oui", "Oui"],
+            "MOP": ["T", None],
+        }
+    ).to_excel(path, index=False, engine="openpyxl")
+
+    result = check_mop(path)
+    assert list(result.columns) == ["ID", "Applicabilité", "MOP"]
+    assert result["ID"].tolist() == ["E2"]
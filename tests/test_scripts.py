@@ -4,11 +4,17 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 import pandas as pd
 from pathlib import Path
 
+import pytest
+from openpyxl import load_workbook
+
+from scripts import gen_matrice_finale
+from scripts.excel import SheetStyle, write_workbook
 from scripts.gen_matrice_finale import generate_matrix
 from scripts.analyse_retours import compute_impact
 from scripts.check_preuves import check_preuves, exigences_sans_preuves
-from scripts.check_mop import check_mop
-from scripts.check_exigences import verify_exigences
+from scripts.check_mop import check_mop, check_mop_chunks
+from scripts.check_exigences import verify_exigences, verify_exigences_chunks
+from scripts.utils import iter_sheet_chunks
 
 
 def test_generate_matrix(tmp_path: Path) -> None:
@@ -87,3 +93,78 @@ def test_verify_exigences(tmp_path: Path) -> None:
     result = verify_exigences(file_path)
     assert len(result) == 1
 
+
+
+def test_iter_sheet_chunks(tmp_path: Path) -> None:
+    df = pd.DataFrame({"ID": [f"R{i}" for i in range(5)], "MOP": [None, "a", None, "b", None]})
+    file_path = tmp_path / "mop.xlsx"
+    df.to_excel(file_path, index=False, engine="openpyxl")
+
+    chunks = list(iter_sheet_chunks(file_path, chunksize=2))
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert list(chunks[0].columns) == ["ID", "MOP"]
+    assert pd.concat(chunks)["MOP"].isna().sum() == 3
+
+
+def test_check_mop_chunks(tmp_path: Path) -> None:
+    df = pd.DataFrame({
+        "Applicability": ["Oui", "Non", "Oui", "Oui"],
+        "MOP": [None, None, "OK", None],
+    })
+    file_path = tmp_path / "mop.xlsx"
+    df.to_excel(file_path, index=False, engine="openpyxl")
+    audit = tmp_path / "audit" / "mop.csv"
+
+    assert check_mop_chunks(file_path, audit, chunksize=1) == 2
+    assert len(pd.read_csv(audit)) == len(check_mop(file_path))
+
+
+def test_verify_exigences_chunks_no_violation(tmp_path: Path) -> None:
+    df = pd.DataFrame({
+        "Applicability": ["Non"],
+        "Justification non-applicabilité": ["ok"],
+    })
+    file_path = tmp_path / "exig.xlsx"
+    df.to_excel(file_path, index=False, engine="openpyxl")
+    audit = tmp_path / "exig.csv"
+
+    assert verify_exigences_chunks(file_path, audit, chunksize=10) == 0
+    assert not audit.exists()
+
+
+def test_write_workbook_chunks_and_style(tmp_path: Path) -> None:
+    chunks = (
+        pd.DataFrame({"ID": [f"REQ{i}", None], "Preuve": ["une preuve assez longue", 2]})
+        for i in range(3)
+    )
+    path = tmp_path / "sortie.xlsx"
+    style = SheetStyle(widths={"ID": 12})
+
+    assert write_workbook(path, {"Matrice": chunks}, style) == 6
+    sheet = load_workbook(path)["Matrice"]
+    assert [c.value for c in sheet[1]] == ["ID", "Preuve"]
+    assert sheet["A1"].font.b and sheet.freeze_panes == "A2"
+    assert sheet.column_dimensions["A"].width == 12
+    assert sheet.column_dimensions["B"].width == len("une preuve assez longue") + 2
+    assert sheet.max_row == 7 and sheet["A3"].value is None and sheet["B3"].value == 2
+
+
+def test_gen_matrice_finale_main_chunks(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    df = pd.DataFrame({
+        "ID": ["REQ1", "REQ2", "REQ3"],
+        "Applicability": ["Oui", "Non", "Oui"],
+        "Preuve_conception": ["doc1", "doc2", "doc3"],
+        "Preuve_test": ["test1", "test2", "test3"],
+    })
+    evidence = tmp_path / "preuves.xlsx"
+    df.to_excel(evidence, index=False, engine="openpyxl")
+    output = tmp_path / "audit" / "matrice_finale.xlsx"
+    monkeypatch.setattr(gen_matrice_finale, "EVIDENCE_FILE", evidence)
+    monkeypatch.setattr(gen_matrice_finale, "OUTPUT_FILE", output)
+    monkeypatch.setattr(gen_matrice_finale, "LOG_FILE", tmp_path / "matrice.log")
+    monkeypatch.setattr(gen_matrice_finale, "CHUNK_SIZE", 1)
+
+    with pytest.raises(SystemExit) as exc:
+        gen_matrice_finale.main()
+    assert exc.value.code == 0
+    assert list(pd.read_excel(output)["ID"]) == ["REQ1", "REQ3"]
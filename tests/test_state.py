@@ -0,0 +1,103 @@
+"""Tests for content-hash based incremental re-execution."""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from workflow import CertificationDossier, WorkflowCertifEngine  # noqa: E402
+from workflow.state import empreinte  # noqa: E402
+from workflow.steps import EtapeWorkflow  # noqa: E402
+
+
+class CountingStep(EtapeWorkflow):
+    """Step copying its precondition to its output and counting runs."""
+
+    def __init__(self, source: Path, cible: Path, ok: bool = True) -> None:
+        super().__init__(None, id="copie", preconditions=[str(source)], outputs=[str(cible)])
+        self.source = source
+        self.cible = cible
+        self.ok = ok
+        self.appels = 0
+
+    def executer(self, dossier: CertificationDossier) -> bool:
+        self.appels += 1
+        self.cible.write_bytes(self.source.read_bytes())
+        return self.ok
+
+
+def _engine(tmp_path: Path, step: EtapeWorkflow) -> WorkflowCertifEngine:
+    engine = WorkflowCertifEngine(fichier_etat=tmp_path / "etat.json")
+    engine.etapes = [step]
+    return engine
+
+
+def test_empreinte_contenu(tmp_path: Path) -> None:
+    fichier = tmp_path / "a.txt"
+    fichier.write_text("x", encoding="utf-8")
+    avant = empreinte([fichier, tmp_path / "absent"])
+    os.utime(fichier, (0, 0))
+    assert empreinte([fichier, tmp_path / "absent"]) == avant
+    fichier.write_text("y", encoding="utf-8")
+    assert empreinte([fichier, tmp_path / "absent"]) != avant
+    assert empreinte([tmp_path]) != empreinte([])
+
+
+def test_skip_unchanged_steps(tmp_path: Path) -> None:
+    source = tmp_path / "in.txt"
+    source.write_text("v1", encoding="utf-8")
+    step = CountingStep(source, tmp_path / "out.txt")
+    dossier = CertificationDossier("D", tmp_path)
+
+    _engine(tmp_path, step).lancer(dossier)
+    resultats = _engine(tmp_path, step).lancer(dossier)
+    assert step.appels == 1
+    assert resultats[0].reutilise and resultats[0].ok
+
+    source.write_text("v2", encoding="utf-8")
+    _engine(tmp_path, step).lancer(dossier)
+    assert step.appels == 2
+
+    (tmp_path / "out.txt").unlink()
+    _engine(tmp_path, step).lancer(dossier)
+    assert step.appels == 3
+
+    _engine(tmp_path, step).lancer(dossier, force=True)
+    assert step.appels == 4
+
+
+def test_helper_module_edit_reruns_step(tmp_path: Path) -> None:
+    paquet = tmp_path / "paquet"
+    paquet.mkdir()
+    for nom in ("__init__", "etape", "aide"):
+        (paquet / f"{nom}.py").write_text("", encoding="utf-8")
+    source = tmp_path / "in.txt"
+    source.write_text("v1", encoding="utf-8")
+    step = CountingStep(source, tmp_path / "out.txt")
+    step.script = paquet / "etape.py"
+    dossier = CertificationDossier("D", tmp_path)
+
+    _engine(tmp_path, step).lancer(dossier)
+    _engine(tmp_path, step).lancer(dossier)
+    assert step.appels == 1
+
+    (paquet / "aide.py").write_text("SEUIL = 2\n", encoding="utf-8")
+    _engine(tmp_path, step).lancer(dossier)
+    assert step.appels == 2
+
+
+def test_skipped_failure_is_reported(tmp_path: Path) -> None:
+    source = tmp_path / "in.txt"
+    source.write_text("v1", encoding="utf-8")
+    step = CountingStep(source, tmp_path / "out.txt", ok=False)
+    dossier = CertificationDossier("D", tmp_path)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            _engine(tmp_path, step).lancer(dossier)
+    assert step.appels == 1
@@ -0,0 +1,133 @@
+"""Tests for the watch mode re-running the steps affected by changes."""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from workflow import CertificationDossier, WorkflowCertifEngine  # noqa: E402
+from workflow.instantane import releve  # noqa: E402
+from workflow.steps import EtapeWorkflow, ScriptStep  # noqa: E402
+from workflow.surveillance import Surveillance, differences  # noqa: E402
+
+
+class CopieStep(EtapeWorkflow):
+    """Step copying its precondition to its output and counting its runs."""
+
+    def __init__(self, id: str, source: str, sortie: str) -> None:
+        super().__init__(None, id=id, preconditions=[source], outputs=[sortie])
+        self.appels = 0
+
+    def executer(self, dossier: CertificationDossier) -> bool:
+        self.appels += 1
+        contenu = (dossier.racine / self.preconditions[0]).read_text(encoding="utf-8")
+        sortie = dossier.racine / self.outputs[0]
+        sortie.parent.mkdir(parents=True, exist_ok=True)
+        sortie.write_text(contenu, encoding="utf-8")
+        return "erreur" not in contenu
+
+
+def test_affected_steps_follow_preconditions() -> None:
+    engine = WorkflowCertifEngine()
+    engine.charger_workflow(Path("workflow_certif.yaml"))
+    surveillance = Surveillance(engine, CertificationDossier("ID", Path("data")))
+
+    ids = [e.id for e in surveillance.etapes_affectees({"preuves.xlsx"})]
+    assert ids == ["validation", "soumettre_dossier", "gerer_retours"]
+    assert surveillance.etapes_affectees(set()) == []
+    assert differences({"a": (1, 1), "b": (1, 1)}, {"a": (1, 2), "c": (1, 1)}) == {"a", "b", "c"}
+
+
+def test_watch_reruns_only_affected_steps(tmp_path: Path) -> None:
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "a.txt").write_text("a", encoding="utf-8")
+    (data / "b.txt").write_text("b", encoding="utf-8")
+    (data / "~$a.txt").write_text("verrou", encoding="utf-8")
+    a = CopieStep("a", "data/a.txt", "audit/a.txt")
+    b = CopieStep("b", "data/b.txt", "audit/b.txt")
+    suite = CopieStep("suite", "audit/b.txt", "audit/suite.txt")
+    engine = WorkflowCertifEngine()
+    engine.etapes = [a, b, suite]
+    engine.etapes_dict = {e.id: e for e in engine.etapes}
+    dossier = CertificationDossier("ID", data, espace_travail=tmp_path)
+    runs: list[list[str]] = []
+    surveillance = Surveillance(
+        engine, dossier, intervalle=0.02, delai=0.05,
+        rapporter=lambda resultats: runs.append([r.statut for r in resultats]),
+    )
+    assert "~$a.txt" not in releve(data)
+
+    fil = threading.Thread(target=surveillance.surveiller, kwargs={"cycles": 1})
+    fil.start()
+    limite = time.monotonic() + 10
+    while not runs and time.monotonic() < limite:
+        time.sleep(0.01)
+    (data / "b.txt").write_text("erreur", encoding="utf-8")
+    fil.join(timeout=10)
+    surveillance.arreter()
+
+    assert not fil.is_alive()
+    assert runs == [["succes"] * 3, ["echec", "annule"]]
+    assert (a.appels, b.appels, suite.appels) == (1, 2, 1)
+    assert (data / "statut.txt").read_text(encoding="utf-8") == "echec"
+
+
+def test_script_step_in_process(tmp_path: Path) -> None:
+    script = tmp_path / "etape.py"
+    script.write_text(
+        "import os, sys\n"
+        "open('sortie.txt', 'w').write(os.environ['CERTIF_STEP_ID'])\n"
+        "sys.exit(int(os.path.exists('echec')))\n",
+        encoding="utf-8",
+    )
+    etape = ScriptStep(script, id="etape")
+    etape.en_processus = True
+    dossier = CertificationDossier("ID", tmp_path, espace_travail=tmp_path)
+    repertoire = os.getcwd()
+
+    assert etape.executer(dossier)
+    assert (tmp_path / "sortie.txt").read_text() == "etape"
+    (tmp_path / "echec").touch()
+    assert not etape.executer(dossier)
+    assert os.getcwd() == repertoire and "CERTIF_STEP_ID" not in os.environ
+
+
+def test_in_process_scripts_keep_their_log_files(tmp_path: Path) -> None:
+    """Each in-process script logs into its own file, like in a subprocess."""
+    from workflow.logger import _ECOUTEURS
+
+    etapes = []
+    for nom in ("un", "deux"):
+        script = tmp_path / f"{nom}.py"
+        script.write_text(
+            "import logging\n"
+            "from pathlib import Path\n"
+            "from workflow.logger import configurer_journal\n"
+            f"configurer_journal(Path('logs/{nom}.log'), nom=None)\n"
+            f"logging.warning('{nom}')\n",
+            encoding="utf-8",
+        )
+        etape = ScriptStep(script, id=nom)
+        etape.en_processus = True
+        etapes.append(etape)
+    engine = WorkflowCertifEngine()
+    engine.etapes = etapes
+    engine.etapes_dict = {e.id: e for e in etapes}
+    (tmp_path / "data").mkdir()
+    dossier = CertificationDossier("ID", tmp_path / "data", espace_travail=tmp_path)
+
+    resultats = Surveillance(engine, dossier).relancer(etapes)
+    assert [r.statut for r in resultats] == ["succes", "succes"]
+    ecouteur = _ECOUTEURS[None][0]
+    ecouteur.stop()
+    ecouteur.start()
+    for nom in ("un", "deux"):
+        lignes = (tmp_path / "logs" / f"{nom}.log").read_text(encoding="utf-8").splitlines()
+        assert [json.loads(ligne)["message"] for ligne in lignes] == [nom]
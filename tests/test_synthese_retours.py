@@ -6,12 +6,13 @@ import os
 import sys
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pytest
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from scripts.synthese_retours import synthese_retours
+from scripts.synthese_retours import join_by_group, synthese_retours
 
 
 def test_synthese_retours_generate(tmp_path: Path) -> None:
@@ -44,3 +45,42 @@ def test_synthese_retours_missing_columns(tmp_path: Path) -> None:
 
     with pytest.raises(ValueError):
         synthese_retours(input_file, output_file)
+
+
+def test_join_by_group_keeps_row_order() -> None:
+    codes = np.array([1, 0, 1, -1, 0, 1])
+    values = pd.Series(["a", "b", "c", "x", None, 4])
+    assert list(join_by_group(codes, values, " | ", 3)) == ["b", "a | c | 4", ""]
+
+
+def test_join_by_group_large_group() -> None:
+    """A group of many comments interleaved with another keeps its row order."""
+    values = pd.Series([f"commentaire {i}" for i in range(100_000)])
+    codes = np.zeros(len(values), dtype=np.intp)
+    codes[::1000] = 1
+    joined = join_by_group(codes, values, " | ", 2)
+    assert joined.shape == (2,)
+    assert joined[0] == " | ".join(values[codes == 0])
+    assert joined[1] == " | ".join(values[::1000])
+
+
+def test_synthese_retours_streaming_without_raw(tmp_path: Path) -> None:
+    """The streaming writer produces the same synthesis, optionally alone."""
+    df = pd.DataFrame({
+        "Exigence": ["REQ2", "REQ1", "REQ1", None],
+        "Commentaire": ["C3", "C1", "C2", "C4"],
+        "Criticité": ["Moyenne", "Haute", "Basse", "Haute"],
+    })
+    input_file = tmp_path / "retours.xlsx"
+    df.to_excel(input_file, index=False, engine="openpyxl")
+    output_file = tmp_path / "synthese.xlsx"
+
+    synthese_retours(input_file, output_file, streaming=True, include_raw=False)
+
+    sheets = pd.read_excel(output_file, sheet_name=None, engine="openpyxl")
+    assert list(sheets) == ["Synthèse"]
+    assert sheets["Synthèse"].to_dict("list") == {
+        "Exigence": ["REQ1", "REQ2"],
+        "Commentaire": ["C1 | C2", "C3"],
+        "Criticité": ["Haute, Basse", "Moyenne"],
+    }
@@ -0,0 +1,59 @@
+"""Tests for the Chrome trace instrumentation."""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from workflow import CertificationDossier  # noqa: E402
+from workflow import tracing  # noqa: E402
+from workflow.steps import ScriptStep  # noqa: E402
+
+
+@pytest.fixture
+def trace_dir(tmp_path: Path):
+    repertoire = tmp_path / "trace"
+    tracing.activer_trace(repertoire, "test")
+    yield repertoire
+    tracing.desactiver_trace()
+
+
+def test_span_records_nested_events(trace_dir: Path) -> None:
+    with tracing.span("externe", "workflow") as details:
+        details["lignes"] = 3
+        with tracing.span("interne", "regle"):
+            pass
+    trace = json.loads(tracing.ecrire_trace().read_text(encoding="utf-8"))
+
+    spans = {e["name"]: e for e in trace["traceEvents"] if e["ph"] == "X"}
+    assert spans["externe"]["args"]["lignes"] == 3
+    assert spans["interne"]["args"]["parent"] == spans["externe"]["args"]["id"]
+    assert spans["externe"]["dur"] >= spans["interne"]["dur"]
+    assert not list(trace_dir.glob("*.part.json"))
+
+
+def test_child_script_spans_are_merged(trace_dir: Path, tmp_path: Path) -> None:
+    espace = tmp_path / "CAF001"
+    (espace / "data").mkdir(parents=True)
+    pd.DataFrame({"Applicability": ["Oui"], "MOP": ["T"]}).to_excel(
+        espace / "data" / "mop.xlsx", index=False, engine="openpyxl"
+    )
+    etape = ScriptStep(Path("scripts/check_mop.py"), id="check_mop")
+    dossier = CertificationDossier("CAF001", espace / "data", espace_travail=espace)
+
+    assert etape.executer(dossier)
+    evenements = json.loads(tracing.ecrire_trace().read_text(encoding="utf-8"))["traceEvents"]
+
+    script = next(e for e in evenements if e.get("cat") == "script")
+    regle = next(e for e in evenements if e["name"] == "check_mop" and e.get("cat") == "regle")
+    assert regle["pid"] != script["pid"]
+    assert regle["args"]["parent"] == script["args"]["id"]
+    assert regle["args"]["dossier_id"] == "CAF001"
+    assert any(e["name"] == "read_sheet" and e["args"]["lignes"] == 1 for e in evenements)
@@ -0,0 +1,193 @@
+"""Tests for the single-pass validation engine."""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from scripts import validation, violations  # noqa: E402
+from scripts.cache import WORKBOOK_CACHE  # noqa: E402
+from scripts.validation import (  # noqa: E402
+    REGLES,
+    IndexIdentifiants,
+    Tables,
+    ecrire,
+    evaluer,
+    flux_violations,
+    index_violations,
+)
+from scripts.violations import IndexViolations  # noqa: E402
+
+
+@pytest.fixture
+def dossier(tmp_path: Path) -> dict[str, Path]:
+    """Write a small dossier with one violation per rule."""
+    tables = {
+        "exigences": pd.DataFrame({
+            "ID": ["REQ1", "REQ2", "REQ3"],
+            "Applicabilité": ["Oui", "oui ", "Non"],
+            "Justification non-applicabilité": ["ok", None, None],
+        }),
+        "mop": pd.DataFrame({
+            "ID": ["REQ1", "REQ2"],
+            "Applicabilité": ["Oui", "Non"],
+            "MOP": [None, None],
+        }),
+        "preuves": pd.DataFrame({
+            "ID": ["REQ1", "REQ1", "REQ3"],
+            "Applicabilité": ["Oui", "Oui", "Oui"],
+            "Preuve_conception": ["doc", None, "doc"],
+            "Preuve_test": ["test", None, "test"],
+            "Commentaire": ["a", "b", "c"],
+        }),
+    }
+    chemins = {}
+    for nom, df in tables.items():
+        chemins[nom] = tmp_path / f"{nom}.xlsx"
+        df.to_excel(chemins[nom], index=False, engine="openpyxl")
+    return chemins
+
+
+def test_evaluer_parses_each_workbook_once(dossier: dict[str, Path]) -> None:
+    WORKBOOK_CACHE.clear()
+    misses = WORKBOOK_CACHE.misses
+    resultats = evaluer(dossier)
+    assert WORKBOOK_CACHE.misses - misses == 3
+    assert set(resultats) == set(REGLES)
+
+    assert list(resultats["exigences_incompletes"].valeur()["ID"]) == ["REQ2"]
+    assert list(resultats["mop_manquants"].valeur()["ID"]) == ["REQ1"]
+    assert len(resultats["preuves_manquantes"].valeur()) == 1
+    # REQ1 has an empty evidence row, REQ2 has none
+    assert list(resultats["exigences_sans_preuves"].valeur()["ID"]) == ["REQ1", "REQ2"]
+
+    matrice = resultats["matrice_finale"].valeur()
+    assert list(matrice.columns) == [
+        "ID", "Applicabilité", "Preuve_conception", "Preuve_test", "Commentaire"
+    ]
+    assert list(matrice["Commentaire"]) == ["a", "c"]
+    assert resultats["matrice_finale"].anomalies == 0
+
+
+def test_numeric_ids_with_blank_cell_match(tmp_path: Path) -> None:
+    exigences = tmp_path / "exigences.xlsx"
+    preuves = tmp_path / "preuves.xlsx"
+    pd.DataFrame({"ID": [1, 2, 3], "Applicabilité": ["Oui"] * 3}).to_excel(
+        exigences, index=False, engine="openpyxl"
+    )
+    # the blank cell makes the identifiers read as floats
+    pd.DataFrame({
+        "ID": [1, 2, None],
+        "Applicabilité": ["Oui"] * 3,
+        "Preuve_conception": ["doc"] * 3,
+        "Preuve_test": ["test"] * 3,
+    }).to_excel(preuves, index=False, engine="openpyxl")
+
+    resultats = evaluer({"exigences": exigences, "preuves": preuves}, ["exigences_sans_preuves"])
+    assert list(resultats["exigences_sans_preuves"].valeur()["ID"]) == [3]
+    assert index_violations(resultats).identifiants.tolist() == ["1", "2", "3"]
+
+
+def test_missing_column_fails_only_its_rules(dossier: dict[str, Path], tmp_path: Path) -> None:
+    mop = tmp_path / "mop_sans_colonne.xlsx"
+    pd.DataFrame({"Applicabilité": ["Oui"]}).to_excel(mop, index=False, engine="openpyxl")
+
+    resultats = evaluer({**dossier, "mop": mop})
+    assert isinstance(resultats["mop_manquants"].erreur, KeyError)
+    with pytest.raises(KeyError, match="Colonnes manquantes"):
+        resultats["mop_manquants"].valeur()
+    assert resultats["exigences_incompletes"].erreur is None
+
+
+def test_ecrire_outputs(dossier: dict[str, Path], tmp_path: Path) -> None:
+    resultats = evaluer(dossier, ["mop_manquants", "matrice_finale"])
+    ecrits = ecrire(resultats, tmp_path / "sortie")
+    assert sorted(p.name for p in ecrits) == ["matrice_finale.xlsx", "mop_manquants.csv"]
+    assert len(pd.read_csv(tmp_path / "sortie" / "audit" / "mop_manquants.csv")) == 1
+
+
+def test_outputs_keep_workbook_values(dossier: dict[str, Path], tmp_path: Path) -> None:
+    resultats = evaluer(dossier)
+    assert list(resultats["exigences_incompletes"].valeur()["Applicabilité"]) == ["oui "]
+    ecrire(resultats, tmp_path / "sortie")
+    mop = pd.read_csv(tmp_path / "sortie" / "audit" / "mop_manquants.csv")
+    assert list(mop["Applicabilité"]) == ["Oui"]
+
+    audit = tmp_path / "flux" / "mop_manquants.csv"
+    assert flux_violations("mop_manquants", dossier["mop"], audit, 1) == 1
+    assert pd.read_csv(audit).equals(mop)
+
+
+def test_main_exit_code(
+    dossier: dict[str, Path], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "data").mkdir()
+    for nom, chemin in dossier.items():
+        chemin.rename(tmp_path / "data" / chemin.name)
+    monkeypatch.setenv("CERTIF_WORKSPACE", str(tmp_path))
+    monkeypatch.setattr(validation, "LOG_FILE", tmp_path / "logs" / "validation.log")
+
+    with pytest.raises(SystemExit) as exc:
+        validation.main(["matrice_finale"])
+    assert exc.value.code == 0
+    assert (tmp_path / "audit" / "matrice_finale.xlsx").exists()
+
+    with pytest.raises(SystemExit) as exc:
+        validation.main([])
+    assert exc.value.code == 1
+    assert (tmp_path / "audit" / "exigences_sans_preuves.csv").exists()
+    assert IndexViolations.charger(tmp_path / "audit" / "violations.npz").regles_de("REQ2")
+
+
+def test_index_violations(dossier: dict[str, Path], tmp_path: Path) -> None:
+    index = index_violations(evaluer(dossier))
+    assert set(index.regles) == {
+        "exigences_incompletes", "mop_manquants", "preuves_manquantes", "exigences_sans_preuves"
+    }
+    assert index.regles_de("REQ1") == [
+        "mop_manquants", "preuves_manquantes", "exigences_sans_preuves"
+    ]
+    assert index.regles_de("REQ3") == []
+    assert index.requete(["mop_manquants", "preuves_manquantes"]) == ["REQ1"]
+    assert index.requete(["exigences_sans_preuves"], ["mop_manquants"]) == ["REQ2"]
+    assert index.comptes()["exigences_sans_preuves"] == 2
+
+    chemin = tmp_path / "audit" / "violations.npz"
+    index.enregistrer(chemin)
+    relu = IndexViolations.charger(chemin)
+    assert relu.regles == index.regles
+    assert relu.requete(reussit=index.regles) == ["REQ3"]
+    with pytest.raises(KeyError, match="absente"):
+        relu.requete(["inconnue"])
+
+
+def test_violations_cli(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    chemin = tmp_path / "violations.npz"
+    echecs = np.array([[True, False, True], [True, True, False], [False, False, False]])
+    index = IndexViolations.construire(np.array(["A", "B", "C"]), ("r1", "r2", "r3"), echecs)
+    index.enregistrer(chemin)
+    violations.main(["--index", str(chemin), "--echoue", "r1", "--reussit", "r2"])
+    assert capsys.readouterr().out.split() == ["A"]
+    violations.main(["--index", str(chemin), "--exigence", "B"])
+    assert capsys.readouterr().out.split() == ["r1", "r2"]
+    with pytest.raises(SystemExit):
+        violations.main(["--index", str(chemin), "--exigence", "Z"])
+
+
+def test_index_identifiants_with_duplicates() -> None:
+    preuves = pd.Series(["A", "B", "A", None, "A"])
+    index = IndexIdentifiants.construire(preuves)
+    assert list(index.valeurs) == ["A", "B"]
+    assert list(index.compter()) == [3, 1]
+    assert list(index.compter(np.array([True, True, False, True, False]))) == [1, 1]
+    assert list(index.positions(pd.Series(["B", "Z", "A"]))) == [1, 2, 0]
+
+    tables = Tables(preuves=pd.DataFrame({"ID": preuves}))
+    assert tables.index("preuves", "ID") is tables.index("preuves", "ID")
@@ -1,27 +1,65 @@
-"""Object-oriented certification workflow package."""
-
-from .models import CertificationDossier
-from .engine import WorkflowCertifEngine
-from .steps import (
-    CheckExigences,
-    CheckMOP,
-    CheckPreuves,
-    SoumettreDossier,
-    GererRetours,
-    AnalyseRetours,
-)
-from .reporting import RapportImpact
-from .logger import LoggerCertif
-
-__all__ = [
-    "CertificationDossier",
-    "WorkflowCertifEngine",
-    "CheckExigences",
-    "CheckMOP",
-    "CheckPreuves",
-    "SoumettreDossier",
-    "GererRetours",
-    "AnalyseRetours",
-    "RapportImpact",
-    "LoggerCertif",
-]
+"""Object-oriented certification workflow package.
+
+Public names are resolved lazily (PEP 562): importing the package, or a
+light submodule such as :mod:`workflow.logger`, does not load the engine,
+YAML or pandas until one of them is actually used.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .engine import WorkflowCertifEngine as WorkflowCertifEngine
+    from .instantane import InstantaneFS as InstantaneFS
+    from .logger import LoggerCertif as LoggerCertif
+    from .logger import configurer_journal as configurer_journal
+    from .logger import contexte as contexte
+    from .models import CertificationDossier as CertificationDossier
+    from .reporting import RapportImpact as RapportImpact
+    from .scheduler import OrdonnanceurDAG as OrdonnanceurDAG
+    from .scheduler import ResultatEtape as ResultatEtape
+    from .state import EtatExecution as EtatExecution
+    from .steps import AnalyseRetours as AnalyseRetours
+    from .steps import CheckExigences as CheckExigences
+    from .steps import CheckMOP as CheckMOP
+    from .steps import CheckPreuves as CheckPreuves
+    from .steps import GererRetours as GererRetours
+    from .steps import SoumettreDossier as SoumettreDossier
+    from .steps import Validation as Validation
+
+_EXPORTS = {
+    "CertificationDossier": "models",
+    "WorkflowCertifEngine": "engine",
+    "CheckExigences": "steps",
+    "CheckMOP": "steps",
+    "CheckPreuves": "steps",
+    "SoumettreDossier": "steps",
+    "GererRetours": "steps",
+    "Validation": "steps",
+    "AnalyseRetours": "steps",
+    "RapportImpact": "reporting",
+    "LoggerCertif": "logger",
+    "configurer_journal": "logger",
+    "contexte": "logger",
+    "OrdonnanceurDAG": "scheduler",
+    "ResultatEtape": "scheduler",
+    "EtatExecution": "state",
+    "InstantaneFS": "instantane",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(nom: str) -> Any:
+    module = _EXPORTS.get(nom)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nom!r}")
+    valeur = getattr(importlib.import_module(f".{module}", __name__), nom)
+    globals()[nom] = valeur
+    return valeur
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_EXPORTS])
@@ -0,0 +1,219 @@
+"""Compiled, cached form of the workflow and objectives YAML files.
+
+A configuration file is parsed with the libyaml loader when available,
+validated and compiled once into JSON-compatible data keyed by the SHA-256
+of its content. The compiled data is kept in memory for the process and in
+``CERTIF_CONFIG_CACHE`` (``.cache/config`` of the repository by default, an
+empty value disables it) so that the next processes, such as batch workers,
+skip YAML entirely while the file is unchanged.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+import yaml
+
+from . import steps
+from .steps import EtapeWorkflow
+
+T = TypeVar("T")
+
+# bump when the compiled layout changes, to ignore stale cache files
+VERSION = 1
+CACHE_DEFAUT = Path(__file__).resolve().parent.parent / ".cache" / "config"
+CHARGEUR = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# step ids implemented by a dedicated class of :mod:`workflow.steps`
+CLASSES_ETAPES = {
+    "check_exigences": "CheckExigences",
+    "check_mop": "CheckMOP",
+    "check_preuves": "CheckPreuves",
+    "validation": "Validation",
+    "soumettre_dossier": "SoumettreDossier",
+    "gerer_retours": "GererRetours",
+    "analyse_retours": "AnalyseRetours",
+}
+
+_MEMOIRE: dict[str, Any] = {}
+_VERROU = threading.Lock()
+
+
+def repertoire_cache() -> Path | None:
+    """Return the persistent cache directory, ``None`` when disabled."""
+    valeur = os.environ.get("CERTIF_CONFIG_CACHE")
+    if valeur is None:
+        return CACHE_DEFAUT
+    return Path(valeur) if valeur else None
+
+
+def compiler(
+    chemin: Path,
+    espece: str,
+    compilation: Callable[[Any, Path], Any],
+    construction: Callable[[Any], T],
+) -> T:
+    """Return the compiled form of the YAML file ``chemin``.
+
+    Parameters
+    ----------
+    chemin : Path
+        YAML file to load.
+    espece : str
+        Kind of configuration, part of the cache key.
+    compilation : Callable[[Any, Path], Any]
+        Validate the parsed YAML and return JSON-compatible data; raises
+        ``ValueError`` for an invalid file, which is never cached.
+    construction : Callable[[Any], T]
+        Build the typed structure from the compiled data, once per process.
+    """
+    contenu = Path(chemin).read_bytes()
+    cle = f"{espece}-v{VERSION}-{hashlib.sha256(contenu).hexdigest()}"
+    with _VERROU:
+        if cle in _MEMOIRE:
+            return _MEMOIRE[cle]
+
+    repertoire = repertoire_cache()
+    fichier = repertoire / f"{cle}.json" if repertoire else None
+    donnees: Any = None
+    if fichier is not None:
+        try:
+            donnees = json.loads(fichier.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            donnees = None
+    if donnees is None:
+        donnees = compilation(yaml.load(contenu, Loader=CHARGEUR), Path(chemin))
+        if fichier is not None:
+            _ecrire(fichier, donnees)
+
+    resultat = construction(donnees)
+    with _VERROU:
+        return _MEMOIRE.setdefault(cle, resultat)
+
+
+def _ecrire(fichier: Path, donnees: Any) -> None:
+    """Write ``donnees`` atomically, ignoring an unwritable cache.
+
+    Data that JSON would not restore identically (dates, non-string keys)
+    is only cached in memory.
+    """
+    try:
+        texte = json.dumps(donnees, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return
+    if json.loads(texte) != donnees:
+        return
+    temporaire = fichier.with_name(f"{fichier.name}.{os.getpid()}.tmp")
+    try:
+        fichier.parent.mkdir(parents=True, exist_ok=True)
+        temporaire.write_text(texte, encoding="utf-8")
+        os.replace(temporaire, fichier)
+    except OSError:
+        temporaire.unlink(missing_ok=True)
+
+
+def vider_cache() -> None:
+    """Forget the configurations compiled by this process."""
+    with _VERROU:
+        _MEMOIRE.clear()
+
+
+def lire_yaml(chemin: Path) -> Any:
+    """Return the parsed content of ``chemin``, a fresh copy on every call."""
+    return copy.deepcopy(compiler(chemin, "yaml", lambda data, _: data, lambda data: data))
+
+
+@dataclass(frozen=True)
+class DefinitionEtape:
+    """Validated definition of a workflow step."""
+
+    id: str
+    classe: str
+    script: str | None
+    preconditions: tuple[str, ...]
+    outputs: tuple[str, ...]
+
+    def instancier(self) -> EtapeWorkflow:
+        """Return a new step object for this definition."""
+        classe = getattr(steps, self.classe)
+        return classe(
+            Path(self.script) if self.script else None,
+            id=self.id,
+            preconditions=list(self.preconditions),
+            outputs=list(self.outputs),
+        )
+
+
+@dataclass(frozen=True)
+class ConfigWorkflow:
+    """Compiled ``workflow_certif.yaml``."""
+
+    nom: str
+    etapes: tuple[DefinitionEtape, ...]
+
+    @staticmethod
+    def depuis(donnees: dict[str, Any]) -> "ConfigWorkflow":
+        """Build the configuration from its compiled data."""
+        return ConfigWorkflow(
+            nom=donnees["nom"],
+            etapes=tuple(
+                DefinitionEtape(
+                    id=e["id"],
+                    classe=e["classe"],
+                    script=e["script"],
+                    preconditions=tuple(e["preconditions"]),
+                    outputs=tuple(e["outputs"]),
+                )
+                for e in donnees["etapes"]
+            ),
+        )
+
+
+def _liste_chaines(valeur: Any, champ: str, chemin: Path) -> list[str]:
+    if valeur is None:
+        return []
+    if not isinstance(valeur, list) or not all(isinstance(v, str) for v in valeur):
+        raise ValueError(f"{chemin}: {champ} doit etre une liste de chemins")
+    return valeur
+
+
+def compiler_etapes(data: Any, chemin: Path) -> dict[str, Any]:
+    """Validate a parsed workflow file and return its compiled data."""
+    if not isinstance(data, dict) or not isinstance(data.get("steps", []), list):
+        raise ValueError(f"{chemin}: 'steps' doit etre une liste d'etapes")
+    etapes: list[dict[str, Any]] = []
+    vus: set[str] = set()
+    for step_cfg in data.get("steps", []):
+        ident = step_cfg.get("id") if isinstance(step_cfg, dict) else None
+        if not ident or not isinstance(ident, str):
+            raise ValueError(f"{chemin}: etape sans identifiant")
+        if ident in vus:
+            raise ValueError(f"{chemin}: etape {ident} definie deux fois")
+        vus.add(ident)
+        script = step_cfg.get("script")
+        if script is not None and not isinstance(script, str):
+            raise ValueError(f"{chemin}: script de {ident} invalide")
+        etapes.append(
+            {
+                "id": ident,
+                "classe": CLASSES_ETAPES.get(ident, "ScriptStep"),
+                "script": script or None,
+                "preconditions": _liste_chaines(
+                    step_cfg.get("preconditions"), f"preconditions de {ident}", chemin
+                ),
+                "outputs": _liste_chaines(step_cfg.get("outputs"), f"outputs de {ident}", chemin),
+            }
+        )
+    return {"nom": str(data.get("name", "")), "etapes": etapes}
+
+
+def compiler_workflow(chemin: Path) -> ConfigWorkflow:
+    """Return the compiled workflow configuration stored in ``chemin``."""
+    return compiler(chemin, "workflow", compiler_etapes, ConfigWorkflow.depuis)
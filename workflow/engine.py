@@ -2,57 +2,67 @@
 
 from __future__ import annotations
 
+import threading
+import time
 from pathlib import Path
 from typing import Any, List
 
-import yaml
-
+from .instantane import InstantaneFS
+from .logger import contexte, journal_workflow
+from .tracing import span
 from .models import CertificationDossier
-from .steps import (
-    EtapeWorkflow,
-    CheckExigences,
-    CheckMOP,
-    CheckPreuves,
-    SoumettreDossier,
-    AnalyseRetours,
-    GererRetours,
-    ScriptStep,
-)
+from .configuration import compiler_workflow, lire_yaml
+from .steps import EtapeWorkflow
+from .scheduler import OrdonnanceurDAG, ResultatEtape, chemins_chevauchent
+from .state import EtatExecution, modifie_ses_entrees
 
 
 class WorkflowCertifEngine:
-    """Load and run certification steps defined in a YAML file."""
+    """Load and run certification steps defined in a YAML file.
+
+    Parameters
+    ----------
+    fichier_etat : Path | None
+        Run-state file enabling incremental re-execution. When given, a step
+        whose script, preconditions and outputs are unchanged since its last
+        run is skipped and its previous result reported.
+
+    Notes
+    -----
+    Within the lifetime of an engine (one run), a step that succeeded is not
+    launched again for the same dossier while the fingerprint of its script
+    and preconditions is unchanged, whether it is requested by :meth:`lancer`
+    or by an objective. Running a step invalidates the memoised results of
+    the steps reading its outputs, and steps rewriting their own
+    preconditions (such as ``gerer_retours``) are memoised with the
+    fingerprint of the inputs they leave behind. Concurrent requests for the
+    same step and dossier are serialised, so a shared step runs only once.
 
-    def __init__(self) -> None:
+    Existence checks of objectives and success conditions go through
+    ``fs``, an :class:`InstantaneFS` snapshot refreshed for the outputs of
+    every step the engine runs.
+    """
+
+    def __init__(self, fichier_etat: Path | None = None) -> None:
         self.etapes: List[EtapeWorkflow] = []
         self.etapes_dict: dict[str, EtapeWorkflow] = {}
         self.objectifs: dict[str, Any] = {}
+        self.resultats: List[ResultatEtape] = []
+        self.etat = EtatExecution(fichier_etat) if fichier_etat else None
+        self._memo: dict[tuple[str, str], str] = {}
+        self._memo_verrou = threading.Lock()
+        self._verrous_etapes: dict[tuple[str, str], threading.Lock] = {}
+        self.fs = InstantaneFS()
 
     def charger_workflow(self, yaml_path: Path) -> None:
-        """Populate ``self.etapes`` from ``yaml_path``."""
-        with yaml_path.open("r", encoding="utf-8") as fh:
-            config = yaml.safe_load(fh)
-        mapping = {
-            "check_exigences": CheckExigences,
-            "check_mop": CheckMOP,
-            "check_preuves": CheckPreuves,
-            "soumettre_dossier": SoumettreDossier,
-            "gerer_retours": GererRetours,
-            "analyse_retours": AnalyseRetours,
-        }
-        self.etapes = []
-        self.etapes_dict = {}
-        for step_cfg in config.get("steps", []):
-            step_cls = mapping.get(step_cfg["id"], ScriptStep)
-            script = Path(step_cfg.get("script", "")) if step_cfg.get("script") else None
-            instance = step_cls(script)
-            self.etapes.append(instance)
-            self.etapes_dict[step_cfg["id"]] = instance
+        """Populate ``self.etapes`` from ``yaml_path``, compiled and cached."""
+        config = compiler_workflow(yaml_path)
+        self.etapes = [definition.instancier() for definition in config.etapes]
+        self.etapes_dict = {etape.id: etape for etape in self.etapes}
 
     def charger_objectifs(self, yaml_path: Path) -> None:
         """Load objectives definition from ``yaml_path``."""
-        with yaml_path.open("r", encoding="utf-8") as fh:
-            self.objectifs = yaml.safe_load(fh)
+        self.objectifs = lire_yaml(yaml_path)
 
     def atteindre_objectif(self, nom: str, dossier: CertificationDossier) -> None:
         """Execute steps required to reach ``nom``."""
@@ -60,25 +70,29 @@ class WorkflowCertifEngine:
         if not obj:
             raise ValueError(f"Objectif inconnu: {nom}")
         steps = obj.get("preconditions", [])
-        for step_id in steps:
-            step = self.etapes_dict.get(step_id)
-            if not step:
-                continue
-            if not step.executer(dossier):
-                dossier.statut = "echec"
-                dossier.sauvegarder_statut()
-                raise RuntimeError(f"Étape échouée: {step_id}")
-        if self.verifier_conditions_succes(obj.get("conditions_succès", [])):
-            dossier.statut = "termine"
-        else:
-            dossier.statut = "incomplet"
+        with span(nom, "objectif", dossier_id=dossier.id) as details:
+            for step_id in steps:
+                step = self.trouver_etape(step_id)
+                if not step:
+                    continue
+                if not self.executer_etape(step, dossier):
+                    dossier.statut = "echec"
+                    dossier.sauvegarder_statut()
+                    raise RuntimeError(f"Étape échouée: {step_id}")
+            if self.verifier_conditions_succes(obj.get("conditions_succès", []), dossier.racine):
+                dossier.statut = "termine"
+            else:
+                dossier.statut = "incomplet"
+            details["statut"] = dossier.statut
         dossier.sauvegarder_statut()
 
-    def verifier_conditions_succes(self, conditions: list[dict[str, Any]]) -> bool:
-        """Return ``True`` if all ``conditions`` are satisfied."""
+    def verifier_conditions_succes(
+        self, conditions: list[dict[str, Any]], racine: Path = Path(".")
+    ) -> bool:
+        """Return ``True`` if all ``conditions`` are satisfied under ``racine``."""
         for cond in conditions:
-            path = Path(cond.get("fichier", ""))
-            if cond.get("existe") and not path.exists():
+            path = racine / cond.get("fichier", "")
+            if cond.get("existe") and not self.fs.existe(path):
                 return False
         return True
 
@@ -91,13 +105,173 @@ class WorkflowCertifEngine:
         done = sum(1 for s in steps if s in self.etapes_dict)
         return done / len(steps)
 
-    def lancer(self, dossier: CertificationDossier) -> None:
-        """Run all loaded steps sequentially."""
-        for etape in self.etapes:
-            ok = etape.executer(dossier)
-            if not ok:
-                dossier.statut = "echec"
-                dossier.sauvegarder_statut()
-                raise RuntimeError("Étape échouée")
+    def lancer(
+        self, dossier: CertificationDossier, workers: int = 1, force: bool = False
+    ) -> List[ResultatEtape]:
+        """Run all loaded steps and return their results in declaration order.
+
+        Parameters
+        ----------
+        dossier : CertificationDossier
+            Dossier processed by the steps.
+        workers : int
+            With ``1`` the steps run sequentially and the first failure stops
+            the run. With more, a dependency graph is built from the declared
+            ``preconditions`` and ``outputs`` and independent steps run
+            concurrently; a failure only cancels the steps depending on it.
+            In both cases a step raising an exception counts as failed.
+        force : bool
+            Run every step even when the run state reports it as unchanged.
+
+        Raises
+        ------
+        RuntimeError
+            If at least one step failed.
+        """
+        journal_workflow(dossier.racine / "logs")
+        with span("lancer", "workflow", dossier_id=dossier.id, workers=workers):
+            if workers > 1:
+                ordonnanceur = OrdonnanceurDAG(self.etapes, workers)
+                resultats = ordonnanceur.executer(
+                    lambda e: self._executer_etape(e, dossier, force)
+                )
+            else:
+                resultats = []
+                for etape in self.etapes:
+                    try:
+                        resultats.append(self._executer_etape(etape, dossier, force))
+                    except Exception as exc:  # reported like on the DAG path
+                        etape.logger.log_error(f"Erreur etape {etape.id}: {exc}")
+                        resultats.append(ResultatEtape(etape.id, "echec"))
+                    if not resultats[-1].ok:
+                        break
+        self.resultats = resultats
+        if self.etat:
+            self.etat.sauvegarder()
+
+        echecs = [r.id for r in resultats if r.statut == "echec"]
+        if echecs:
+            dossier.statut = "echec"
+            dossier.sauvegarder_statut()
+            raise RuntimeError(f"Étape échouée: {', '.join(echecs)}")
         dossier.statut = "termine"
         dossier.sauvegarder_statut()
+        return resultats
+
+    def trouver_etape(self, reference: str) -> EtapeWorkflow | None:
+        """Return the step identified by ``reference``, a step id or its script path."""
+        etape = self.etapes_dict.get(reference)
+        if etape is not None:
+            return etape
+        cible = Path(reference)
+        for etape in self.etapes:
+            if etape.script and Path(etape.script) == cible:
+                return etape
+        return None
+
+    def executer_etape(
+        self, etape: EtapeWorkflow, dossier: CertificationDossier, force: bool = False
+    ) -> bool:
+        """Run ``etape`` unless it already succeeded in this run on the same inputs.
+
+        Returns
+        -------
+        bool
+            ``True`` if the step succeeded now or earlier in the run.
+        """
+        return self.lancer_etape(etape, dossier, force).ok
+
+    def lancer_etape(
+        self, etape: EtapeWorkflow, dossier: CertificationDossier, force: bool = False
+    ) -> ResultatEtape:
+        """Run ``etape`` like :meth:`executer_etape` and return its detailed result."""
+        return self._executer_etape(etape, dossier, force)
+
+    def invalider(self, etape_id: str | None = None) -> None:
+        """Forget the memoised results of ``etape_id``, or of every step."""
+        with self._memo_verrou:
+            if etape_id is None:
+                self._memo.clear()
+            else:
+                for cle in [c for c in self._memo if c[0] == etape_id]:
+                    del self._memo[cle]
+
+    def _memoise(self, etape: EtapeWorkflow, dossier: CertificationDossier) -> bool:
+        """Return ``True`` if ``etape`` already succeeded on its current inputs."""
+        with self._memo_verrou:
+            connue = self._memo.get((etape.id, dossier.id))
+        return connue is not None and connue == EtatExecution.empreinte_entrees(
+            etape, dossier.racine
+        )
+
+    def _memoriser(
+        self, etape: EtapeWorkflow, dossier: CertificationDossier, ok: bool, entrees: str
+    ) -> None:
+        """Record the run of ``etape`` and invalidate the steps reading its outputs."""
+        lecteurs = [
+            e.id
+            for e in self.etapes
+            if e is not etape
+            and any(chemins_chevauchent(p, o) for p in e.preconditions for o in etape.outputs)
+        ]
+        if ok and (not entrees or modifie_ses_entrees(etape)):
+            entrees = EtatExecution.empreinte_entrees(etape, dossier.racine)
+        with self._memo_verrou:
+            for etape_id in lecteurs:
+                self._memo.pop((etape_id, dossier.id), None)
+            if ok:
+                self._memo[(etape.id, dossier.id)] = entrees
+            else:
+                self._memo.pop((etape.id, dossier.id), None)
+
+    def _executer_etape(
+        self, etape: EtapeWorkflow, dossier: CertificationDossier, force: bool = False
+    ) -> ResultatEtape:
+        """Run ``etape`` on ``dossier`` unless the run state allows skipping it."""
+        journal_workflow(dossier.racine / "logs")
+        with contexte(dossier_id=dossier.id, step_id=etape.id):
+            with span(etape.id, "etape") as details:
+                resultat = self._executer_etape_suivie(etape, dossier, force)
+                details.update(statut=resultat.statut, reutilise=resultat.reutilise)
+        return resultat
+
+    def _executer_etape_suivie(
+        self, etape: EtapeWorkflow, dossier: CertificationDossier, force: bool
+    ) -> ResultatEtape:
+        """Body of :meth:`_executer_etape`, run inside the logging context."""
+        with self._memo_verrou:
+            verrou = self._verrous_etapes.setdefault((etape.id, dossier.id), threading.Lock())
+        # objectives running concurrently may request the same step
+        with verrou:
+            return self._executer_etape_exclusive(etape, dossier, force)
+
+    def _executer_etape_exclusive(
+        self, etape: EtapeWorkflow, dossier: CertificationDossier, force: bool
+    ) -> ResultatEtape:
+        """Run ``etape`` while holding its per-dossier lock."""
+        if not force and self._memoise(etape, dossier):
+            etape.logger.log_info(f"Etape {etape.id} deja executee dans ce run")
+            return ResultatEtape(etape.id, "succes", 0.0, reutilise=True)
+        entrees = ""
+        if self.etat:
+            if not force:
+                precedent = self.etat.resultat_precedent(dossier.id, etape, dossier.racine)
+                if precedent:
+                    etape.logger.log_info(
+                        f"Etape {etape.id} inchangee, resultat precedent: {precedent.statut}"
+                    )
+                    if precedent.ok:
+                        self._memoriser(etape, dossier, True, "")
+                    return precedent
+            entrees = self.etat.empreinte_entrees(etape, dossier.racine)
+
+        debut = time.perf_counter()
+        ok = etape.executer(dossier)
+        for sortie in etape.outputs:
+            self.fs.invalider(dossier.racine / sortie)
+        statut = "succes" if ok else "echec"
+        resultat = ResultatEtape(etape.id, statut, time.perf_counter() - debut)
+        self._memoriser(etape, dossier, ok, entrees)
+        if self.etat:
+            self.etat.enregistrer(dossier.id, etape, resultat, entrees, dossier.racine)
+        return resultat
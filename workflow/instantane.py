@@ -0,0 +1,147 @@
+"""In-memory snapshot of directory listings answering stat queries."""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+
+
+def _cle(chemin: str | Path) -> str:
+    """Return the absolute, normalised form of ``chemin`` used as cache key."""
+    return os.path.normpath(os.path.abspath(chemin))
+
+
+class InstantaneFS:
+    """Answer existence, size and mtime queries from cached directory scans.
+
+    The first query about a path scans its parent directory once with
+    :func:`os.scandir`; later queries about any entry of that directory are
+    answered from memory. Sizes and mtimes are read through the cached
+    :class:`os.DirEntry`, so each entry is stat-ed at most once.
+
+    The snapshot does not watch the filesystem: whoever writes a path must
+    call :meth:`invalider`. The engine does so for the outputs of every step
+    it runs.
+    """
+
+    def __init__(self) -> None:
+        self._repertoires: dict[str, dict[str, os.DirEntry[str]]] = {}
+        self._verrou = threading.Lock()
+
+    def _listing(self, repertoire: str) -> dict[str, os.DirEntry[str]]:
+        """Return the entries of ``repertoire``, scanning it on first use."""
+        with self._verrou:
+            entrees = self._repertoires.get(repertoire)
+        if entrees is not None:
+            return entrees
+        try:
+            with os.scandir(repertoire) as it:
+                entrees = {e.name: e for e in it}
+        except (FileNotFoundError, NotADirectoryError):
+            entrees = {}
+        with self._verrou:
+            return self._repertoires.setdefault(repertoire, entrees)
+
+    def _entree(self, chemin: str | Path) -> os.DirEntry[str] | None:
+        cle = _cle(chemin)
+        parent, nom = os.path.split(cle)
+        if not nom:  # filesystem root
+            return None
+        return self._listing(parent).get(nom)
+
+    def existe(self, chemin: str | Path) -> bool:
+        """Return ``True`` if ``chemin`` exists, like :meth:`Path.exists`."""
+        if not os.path.basename(_cle(chemin)):  # filesystem root
+            return os.path.exists(chemin)
+        entree = self._entree(chemin)
+        if entree is None:
+            return False
+        try:
+            entree.stat()
+        except OSError:  # dangling symlink
+            return False
+        return True
+
+    def est_fichier(self, chemin: str | Path) -> bool:
+        """Return ``True`` if ``chemin`` is an existing regular file."""
+        entree = self._entree(chemin)
+        return entree is not None and entree.is_file()
+
+    def est_repertoire(self, chemin: str | Path) -> bool:
+        """Return ``True`` if ``chemin`` is an existing directory."""
+        entree = self._entree(chemin)
+        return entree is not None and entree.is_dir()
+
+    def taille(self, chemin: str | Path) -> int | None:
+        """Return the size in bytes of ``chemin``, ``None`` if it is missing."""
+        stat = self._stat(chemin)
+        return stat.st_size if stat else None
+
+    def mtime(self, chemin: str | Path) -> float | None:
+        """Return the modification time of ``chemin``, ``None`` if it is missing."""
+        stat = self._stat(chemin)
+        return stat.st_mtime if stat else None
+
+    def _stat(self, chemin: str | Path) -> os.stat_result | None:
+        entree = self._entree(chemin)
+        if entree is None:
+            return None
+        try:
+            return entree.stat()
+        except OSError:
+            return None
+
+    def invalider(self, chemin: str | Path | None = None) -> None:
+        """Forget what is known about ``chemin``, or everything.
+
+        The listings of the ancestors of ``chemin`` are dropped, since a
+        write may create intermediate directories, as well as the listings of
+        ``chemin`` and of its subdirectories when it is one.
+        """
+        with self._verrou:
+            if chemin is None:
+                self._repertoires.clear()
+                return
+            cle = _cle(chemin)
+            courant, parent = cle, os.path.dirname(cle)
+            while parent != courant:
+                self._repertoires.pop(parent, None)
+                courant, parent = parent, os.path.dirname(parent)
+            prefixe = cle.rstrip(os.sep) + os.sep
+            for repertoire in [r for r in self._repertoires if r == cle or r.startswith(prefixe)]:
+                del self._repertoires[repertoire]
+
+
+# lock files left open by Excel and LibreOffice next to the edited workbook
+_IGNORES = ("~$", ".~lock.")
+
+
+def releve(repertoire: str | Path) -> dict[str, tuple[int, int]]:
+    """Return the size and mtime (ns) of every file under ``repertoire``.
+
+    Keys are paths relative to ``repertoire`` with ``/`` separators. Office
+    lock files are ignored and a missing directory yields an empty mapping.
+    """
+    resultat: dict[str, tuple[int, int]] = {}
+    a_visiter = [("", os.fspath(repertoire))]
+    while a_visiter:
+        prefixe, chemin = a_visiter.pop()
+        try:
+            with os.scandir(chemin) as it:
+                entrees = list(it)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        for entree in entrees:
+            if entree.name.startswith(_IGNORES):
+                continue
+            relatif = prefixe + entree.name
+            try:
+                if entree.is_dir():
+                    a_visiter.append((relatif + "/", entree.path))
+                elif entree.is_file():
+                    stat = entree.stat()
+                    resultat[relatif] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:  # removed while scanning
+                continue
+    return resultat
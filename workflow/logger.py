@@ -1,29 +1,212 @@
-"""Logging utilities for the certification workflow."""
+"""Logging utilities for the certification workflow.
+
+Records are written as JSON lines by a single background listener per
+logger: the emitting thread only enqueues them, so file writes never block the
+engine or the steps. Every record carries the run, dossier and step
+identifiers, taken from :func:`contexte` or, in step scripts, from the
+``CERTIF_RUN_ID``, ``CERTIF_DOSSIER_ID`` and ``CERTIF_STEP_ID`` variables
+exported by the engine, so that logs of parallel runs can be correlated.
+"""
 
 from __future__ import annotations
 
+import atexit
+import contextvars
+import json
 import logging
+import multiprocessing
+import os
+import queue
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Iterator
+
+#: Identifier of the current run, shared with the step scripts.
+RUN_ID = os.environ.get("CERTIF_RUN_ID") or uuid.uuid4().hex[:12]
+#: Maximum number of characters of a captured payload (script output...).
+MAX_PAYLOAD = int(os.environ.get("CERTIF_LOG_MAX_PAYLOAD", 4096))
+#: Size in bytes triggering the rotation of a log file.
+MAX_BYTES = int(os.environ.get("CERTIF_LOG_MAX_BYTES", 10 * 1024 * 1024))
+BACKUP_COUNT = 5
+
+_CHAMPS = {"run_id": "CERTIF_RUN_ID", "dossier_id": "CERTIF_DOSSIER_ID", "step_id": "CERTIF_STEP_ID"}
+_CONTEXTE: dict[str, contextvars.ContextVar[str | None]] = {
+    champ: contextvars.ContextVar(champ, default=None) for champ in _CHAMPS
+}
+_ECOUTEURS: dict[str | None, tuple[QueueListener, QueueHandler, Path]] = {}
+_VERROU = threading.Lock()
+
+
+@contextmanager
+def contexte(**champs: str) -> Iterator[None]:
+    """Attach ``run_id``, ``dossier_id`` or ``step_id`` to the records logged inside."""
+    jetons = [(_CONTEXTE[nom], _CONTEXTE[nom].set(valeur)) for nom, valeur in champs.items()]
+    try:
+        yield
+    finally:
+        for variable, jeton in reversed(jetons):
+            variable.reset(jeton)
+
+
+def tronquer(texte: str, limite: int | None = None) -> str:
+    """Return ``texte`` cut to its last ``limite`` characters.
+
+    The end of a script output usually holds the error, so it is kept.
+    """
+    limite = MAX_PAYLOAD if limite is None else limite
+    if len(texte) <= limite:
+        return texte
+    return f"[... {len(texte) - limite} caracteres omis]{texte[-limite:]}"
+
+
+def identifiants() -> dict[str, str | None]:
+    """Return the current run, dossier and step identifiers."""
+    valeurs = {
+        champ: _CONTEXTE[champ].get() or os.environ.get(variable)
+        for champ, variable in _CHAMPS.items()
+    }
+    valeurs["run_id"] = valeurs["run_id"] or RUN_ID
+    return valeurs
+
+
+class FiltreContexte(logging.Filter):
+    """Stamp records with the identifiers of the run, dossier and step."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for champ, valeur in identifiants().items():
+            setattr(record, champ, valeur)
+        return True
+
+
+class FormateurJSON(logging.Formatter):
+    """Format records as one JSON object per line.
+
+    Tracebacks are already part of the message, :class:`QueueHandler` having
+    merged them before enqueuing the record.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        donnees = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "niveau": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for champ in _CHAMPS:
+            donnees[champ] = getattr(record, champ, None)
+        return json.dumps(donnees, ensure_ascii=False, default=str)
+
+
+def configurer_journal(
+    fichier: Path, nom: str | None = "workflow_certif", niveau: int = logging.INFO
+) -> logging.Logger:
+    """Return logger ``nom`` writing JSON lines to ``fichier`` through a queue.
+
+    The first call for a logger installs a :class:`QueueHandler` on it and
+    starts a :class:`QueueListener` owning a rotating file handler; later calls
+    with the same file return the configured logger without touching the
+    filesystem. A call with another file drains the listener into the previous
+    file and switches it to the new one, so that a process reused for another
+    dossier or script (batch workers, in-process watch runs) never writes
+    into the first file it configured. ``nom=None`` configures the root
+    logger, which the step scripts use.
+    """
+    logger = logging.getLogger(nom)
+    fichier = Path(fichier).resolve()
+    with _VERROU:
+        actuel = _ECOUTEURS.get(nom)
+        if actuel is not None and actuel[2] == fichier:
+            return logger
+        if actuel is not None:
+            ecouteur, entree, _ = actuel
+            _arreter(ecouteur)
+        else:
+            entree = QueueHandler(queue.SimpleQueue())
+            entree.addFilter(FiltreContexte())
+            logger.addHandler(entree)
+            if nom is not None:
+                # keep records out of the root file of a script running in process
+                logger.propagate = False
+        fichier.parent.mkdir(parents=True, exist_ok=True)
+        sortie = RotatingFileHandler(
+            fichier, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8", delay=True
+        )
+        sortie.setFormatter(FormateurJSON())
+        ecouteur = QueueListener(entree.queue, sortie, respect_handler_level=True)
+        ecouteur.start()
+        logger.setLevel(niveau)
+        _ECOUTEURS[nom] = (ecouteur, entree, fichier)
+    return logger
+
+
+def _arreter(ecouteur: QueueListener) -> None:
+    """Write the pending records of ``ecouteur`` and close its files."""
+    ecouteur.stop()
+    for handler in ecouteur.handlers:
+        handler.close()
+
+
+def fichier_processus(fichier: Path) -> Path:
+    """Return ``fichier``, suffixed with the process id in a child process.
+
+    Rotating handlers of several processes must not share one file: rotation
+    would lose or overwrite records. Pool workers therefore log to
+    ``<nom>-<pid><suffixe>`` next to the file of the main process.
+    """
+    if multiprocessing.parent_process() is None:
+        return fichier
+    return fichier.with_name(f"{fichier.stem}-{os.getpid()}{fichier.suffix}")
+
+
+@atexit.register
+def arreter_journaux() -> None:
+    """Flush and stop every listener and detach the queue handlers."""
+    with _VERROU:
+        for nom, (ecouteur, entree, _) in _ECOUTEURS.items():
+            logging.getLogger(nom).removeHandler(entree)
+            _arreter(ecouteur)
+        _ECOUTEURS.clear()
+
+
+def journal_workflow(log_dir: Path) -> logging.Logger:
+    """Send the ``workflow_certif`` records to ``workflow.log`` in ``log_dir``.
+
+    The engine calls it with the ``logs/`` directory of the dossier
+    workspace it works on.
+    """
+    return configurer_journal(fichier_processus(log_dir / "workflow.log"))
 
 
 class LoggerCertif:
-    """Simple wrapper around :mod:`logging` for workflow messages."""
+    """Simple wrapper around :mod:`logging` for workflow messages.
+
+    Instances share the ``workflow_certif`` logger, so creating one is cheap.
+    With ``log_dir`` the logger writes to ``workflow.log`` in that directory;
+    without, it keeps the file of the last dossier workspace, or
+    ``logs/workflow.log`` in the current directory when none was configured.
+    Each process of a pool writes its own file, see :func:`fichier_processus`.
+    """
 
     def __init__(self, log_dir: Path | None = None) -> None:
-        log_dir = log_dir or Path("logs")
-        log_dir.mkdir(parents=True, exist_ok=True)
-        log_file = log_dir / "workflow.log"
-        logging.basicConfig(
-            filename=log_file,
-            level=logging.INFO,
-            format="%(asctime)s - %(levelname)s - %(message)s",
-        )
-        self._logger = logging.getLogger("workflow_certif")
+        if log_dir is not None:
+            self._logger = journal_workflow(log_dir)
+        else:
+            self._logger = logging.getLogger("workflow_certif")
+
+    def _journal(self) -> logging.Logger:
+        """Return the logger, configured on the default file if still unset."""
+        if self._logger.name not in _ECOUTEURS:
+            journal_workflow(Path("logs"))
+        return self._logger
 
     def log_info(self, message: str) -> None:
         """Log an informational ``message``."""
-        self._logger.info(message)
+        self._journal().info(message)
 
     def log_error(self, message: str) -> None:
         """Log an error ``message``."""
-        self._logger.error(message)
+        self._journal().error(message)
@@ -4,12 +4,15 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
-
-from .reporting import RapportImpact
 from .logger import LoggerCertif
 
+if TYPE_CHECKING:  # pandas is only loaded when an impact report is built
+    import pandas as pd
+
+    from .reporting import RapportImpact
+
 
 @dataclass
 class CertificationDossier:
@@ -23,14 +26,31 @@ class CertificationDossier:
         Root directory containing the certification files.
     statut : str
         Current workflow status.
+    espace_travail : Path | None
+        Workspace holding the ``data/``, ``audit/`` and ``logs/`` directories
+        of the dossier. Paths declared by steps and objectives are resolved
+        against it. ``None`` uses the current directory.
     """
 
     id: str
     chemin_dossier: Path
     statut: str = "en_preparation"
+    espace_travail: Path | None = None
     impact: RapportImpact | None = field(default=None, init=False)
     logger: LoggerCertif = field(default_factory=LoggerCertif, init=False)
 
+    def __post_init__(self) -> None:
+        self.logger = LoggerCertif(self.racine / "logs")
+
+    @property
+    def racine(self) -> Path:
+        """Return the workspace of the dossier."""
+        return self.espace_travail if self.espace_travail is not None else Path(".")
+
+    def resoudre(self, chemin: str | Path) -> Path:
+        """Return ``chemin`` resolved against the dossier workspace."""
+        return self.racine / chemin
+
     def charger_documents(self) -> None:
         """Load documents for the dossier.
 
@@ -53,6 +73,8 @@ class CertificationDossier:
 
     def enregistrer_impact(self, df: pd.DataFrame) -> None:
         """Store an impact report inside the dossier."""
+        from .reporting import RapportImpact
+
         self.impact = RapportImpact(df)
         csv_path = self.chemin_dossier / "impact.csv"
         self.impact.exporter_csv(csv_path)
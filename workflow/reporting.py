@@ -4,15 +4,24 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _tableau_vide() -> pd.DataFrame:
+    """Return an empty frame, importing pandas on first use only."""
+    import pandas as pd
+
+    return pd.DataFrame()
 
 
 @dataclass
 class RapportImpact:
     """Container for impact reports."""
 
-    contenu: pd.DataFrame = field(default_factory=pd.DataFrame)
+    contenu: pd.DataFrame = field(default_factory=_tableau_vide)
 
     def generer(self, df: pd.DataFrame) -> None:
         """Load impact ``df`` into the report."""
@@ -0,0 +1,167 @@
+"""Dependency-aware scheduling of workflow steps."""
+
+from __future__ import annotations
+
+import contextvars
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import Callable, Sequence
+
+from .steps import EtapeWorkflow
+
+
+@dataclass
+class ResultatEtape:
+    """Outcome of a single step execution.
+
+    Parameters
+    ----------
+    id : str
+        Identifier of the step.
+    statut : str
+        ``"succes"``, ``"echec"`` or ``"annule"`` when a dependency failed.
+    duree : float
+        Wall-clock duration in seconds.
+    reutilise : bool
+        ``True`` when the step was skipped and its previous result reported.
+    """
+
+    id: str
+    statut: str
+    duree: float = 0.0
+    reutilise: bool = False
+
+    @property
+    def ok(self) -> bool:
+        """Return ``True`` when the step succeeded."""
+        return self.statut == "succes"
+
+
+def _parties(chemin: str) -> tuple[str, ...]:
+    """Return the normalised components of ``chemin``."""
+    return PurePosixPath(os.path.normpath(chemin).replace(os.sep, "/")).parts
+
+
+def chemins_chevauchent(a: str, b: str) -> bool:
+    """Return ``True`` if ``a`` and ``b`` designate the same file or nest.
+
+    A directory such as ``data/`` overlaps every file it contains.
+    """
+    pa, pb = _parties(a), _parties(b)
+    if not pa or not pb or pa == (".",) or pb == (".",):
+        return False
+    n = min(len(pa), len(pb))
+    return pa[:n] == pb[:n]
+
+
+def _conflit(avant: EtapeWorkflow, apres: EtapeWorkflow) -> bool:
+    """Return ``True`` if ``apres`` must wait for ``avant``.
+
+    Read-after-write, write-after-read and write-after-write hazards on the
+    declared ``preconditions`` and ``outputs`` are all considered.
+    """
+    paires = [
+        (avant.outputs, apres.preconditions),
+        (avant.preconditions, apres.outputs),
+        (avant.outputs, apres.outputs),
+    ]
+    return any(
+        chemins_chevauchent(a, b) for gauche, droite in paires for a in gauche for b in droite
+    )
+
+
+def construire_graphe(etapes: Sequence[EtapeWorkflow]) -> dict[int, set[int]]:
+    """Return, for each step index, the indices of the steps it depends on.
+
+    Edges only go from a step to a later one in declaration order, so the
+    graph is acyclic and preserves the results of a sequential run.
+    """
+    graphe: dict[int, set[int]] = {i: set() for i in range(len(etapes))}
+    for j, apres in enumerate(etapes):
+        for i in range(j):
+            if _conflit(etapes[i], apres):
+                graphe[j].add(i)
+    return graphe
+
+
+def dependants(graphe: dict[int, set[int]], index: int) -> set[int]:
+    """Return every step transitively depending on ``index``."""
+    resultat: set[int] = set()
+    a_visiter = [index]
+    while a_visiter:
+        courant = a_visiter.pop()
+        for j, deps in graphe.items():
+            if courant in deps and j not in resultat:
+                resultat.add(j)
+                a_visiter.append(j)
+    return resultat
+
+
+class OrdonnanceurDAG:
+    """Run workflow steps concurrently while honouring their dependencies.
+
+    Parameters
+    ----------
+    etapes : Sequence[EtapeWorkflow]
+        Steps in declaration order.
+    workers : int
+        Maximum number of steps running at the same time.
+    """
+
+    def __init__(self, etapes: Sequence[EtapeWorkflow], workers: int = 4) -> None:
+        if workers < 1:
+            raise ValueError("workers doit etre superieur ou egal a 1")
+        self.etapes = list(etapes)
+        self.workers = workers
+        self.graphe = construire_graphe(self.etapes)
+
+    def executer(
+        self, fonction: Callable[[EtapeWorkflow], ResultatEtape]
+    ) -> list[ResultatEtape]:
+        """Run ``fonction`` on every step and return results in declaration order.
+
+        When a step fails, the steps depending on it are not started and are
+        reported with the ``"annule"`` status. Independent steps still run.
+        """
+        restants = {i: set(deps) for i, deps in self.graphe.items()}
+        resultats: dict[int, ResultatEtape] = {}
+        prets = sorted(i for i, deps in restants.items() if not deps)
+        en_cours: dict[Future[ResultatEtape], int] = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while prets or en_cours:
+                while prets and len(en_cours) < self.workers:
+                    index = prets.pop(0)
+                    # each step sees the caller's logging and tracing context
+                    contexte = contextvars.copy_context()
+                    future = pool.submit(contexte.run, fonction, self.etapes[index])
+                    en_cours[future] = index
+                termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+                for future in sorted(termines, key=en_cours.__getitem__):
+                    index = en_cours.pop(future)
+                    resultats[index] = self._resultat(future, index)
+                    if resultats[index].ok:
+                        for j, deps in restants.items():
+                            if index in deps:
+                                deps.discard(index)
+                                if not deps and j not in resultats:
+                                    prets.append(j)
+                        prets.sort()
+                    else:
+                        for j in sorted(dependants(self.graphe, index)):
+                            resultats.setdefault(j, ResultatEtape(self.etapes[j].id, "annule"))
+                            if j in prets:
+                                prets.remove(j)
+
+        return [resultats[i] for i in range(len(self.etapes))]
+
+    def _resultat(self, future: Future[ResultatEtape], index: int) -> ResultatEtape:
+        """Return the result of ``future``, turning exceptions into failures."""
+        try:
+            return future.result()
+        except Exception as exc:  # step crashed inside the worker thread
+            etape = self.etapes[index]
+            etape.logger.log_error(f"Erreur etape {etape.id}: {exc}")
+            return ResultatEtape(etape.id, "echec")
@@ -0,0 +1,145 @@
+"""Persistent run state used to skip unchanged workflow steps."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any, Iterable
+
+from .scheduler import ResultatEtape, chemins_chevauchent
+from .steps import EtapeWorkflow
+
+_BLOC = 1 << 20
+
+
+def _hacher_fichier(chemin: Path, h: Any) -> None:
+    """Feed the content of ``chemin`` into ``h``."""
+    with chemin.open("rb") as fh:
+        for bloc in iter(lambda: fh.read(_BLOC), b""):
+            h.update(bloc)
+
+
+def empreinte(chemins: Iterable[str | Path]) -> str:
+    """Return a SHA-256 fingerprint of the content of ``chemins``.
+
+    Directories are hashed recursively in sorted order and missing paths
+    contribute a fixed marker, so deleting an output changes the fingerprint.
+    """
+    h = hashlib.sha256()
+    for chemin in chemins:
+        chemin = Path(chemin)
+        h.update(str(chemin).encode("utf-8") + b"\0")
+        if chemin.is_file():
+            _hacher_fichier(chemin, h)
+        elif chemin.is_dir():
+            for fichier in sorted(p for p in chemin.rglob("*") if p.is_file()):
+                h.update(fichier.relative_to(chemin).as_posix().encode("utf-8") + b"\0")
+                _hacher_fichier(fichier, h)
+        else:
+            h.update(b"<absent>")
+        h.update(b"\1")
+    return h.hexdigest()
+
+
+def sources_script(script: str | Path) -> list[Path]:
+    """Return the source files a run of ``script`` depends on.
+
+    A script living in a package, run as a module, imports its sibling
+    modules: every Python file of the package is returned so that editing
+    a helper invalidates the steps using it.
+    """
+    script = Path(script)
+    if not (script.parent / "__init__.py").exists():
+        return [script]
+    return sorted(script.parent.rglob("*.py"))
+
+
+def modifie_ses_entrees(etape: EtapeWorkflow) -> bool:
+    """Return ``True`` if ``etape`` writes one of its own preconditions."""
+    return any(
+        chemins_chevauchent(p, o) for p in etape.preconditions for o in etape.outputs
+    )
+
+
+class EtatExecution:
+    """Fingerprints of the last execution of each step, stored as JSON.
+
+    Parameters
+    ----------
+    fichier : Path
+        JSON file holding the state between runs.
+    """
+
+    def __init__(self, fichier: Path) -> None:
+        self.fichier = fichier
+        self._verrou = threading.Lock()
+        self._etat: dict[str, dict[str, dict[str, str]]] = {}
+        if fichier.exists():
+            try:
+                self._etat = json.loads(fichier.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._etat = {}
+
+    @staticmethod
+    def empreinte_entrees(etape: EtapeWorkflow, racine: Path = Path(".")) -> str:
+        """Return the fingerprint of the sources and preconditions of ``etape``.
+
+        The sources are the script and, for a script of a package, the
+        modules of that package (see :func:`sources_script`). Preconditions
+        are resolved against the dossier workspace ``racine``.
+        """
+        chemins: list[str | Path] = [racine / p for p in etape.preconditions]
+        if etape.script:
+            chemins[:0] = sources_script(etape.script)
+        return empreinte(chemins)
+
+    @staticmethod
+    def empreinte_sorties(etape: EtapeWorkflow, racine: Path = Path(".")) -> str:
+        """Return the fingerprint of the outputs of ``etape`` under ``racine``."""
+        return empreinte(racine / o for o in etape.outputs)
+
+    def resultat_precedent(
+        self, dossier_id: str, etape: EtapeWorkflow, racine: Path = Path(".")
+    ) -> ResultatEtape | None:
+        """Return the previous result if inputs and outputs are unchanged."""
+        with self._verrou:
+            precedent = self._etat.get(dossier_id, {}).get(etape.id)
+        if not precedent:
+            return None
+        if precedent.get("entrees") != self.empreinte_entrees(etape, racine):
+            return None
+        if precedent.get("sorties") != self.empreinte_sorties(etape, racine):
+            return None
+        return ResultatEtape(etape.id, precedent["statut"], 0.0, reutilise=True)
+
+    def enregistrer(
+        self,
+        dossier_id: str,
+        etape: EtapeWorkflow,
+        resultat: ResultatEtape,
+        entrees: str,
+        racine: Path = Path("."),
+    ) -> None:
+        """Record ``resultat`` with the fingerprints of ``etape``.
+
+        ``entrees`` is the input fingerprint taken before the run. It is
+        recomputed for steps rewriting their own preconditions.
+        """
+        if modifie_ses_entrees(etape):
+            entrees = self.empreinte_entrees(etape, racine)
+        enregistrement = {
+            "statut": resultat.statut,
+            "entrees": entrees,
+            "sorties": self.empreinte_sorties(etape, racine),
+        }
+        with self._verrou:
+            self._etat.setdefault(dossier_id, {})[etape.id] = enregistrement
+
+    def sauvegarder(self) -> None:
+        """Write the state file."""
+        with self._verrou:
+            contenu = json.dumps(self._etat, indent=2, sort_keys=True)
+        self.fichier.parent.mkdir(parents=True, exist_ok=True)
+        self.fichier.write_text(contenu, encoding="utf-8")
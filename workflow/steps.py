@@ -2,19 +2,32 @@
 
 from __future__ import annotations
 
+import os
+import runpy
 import subprocess
+import sys
 from pathlib import Path
 from abc import ABC, abstractmethod
 
 from .models import CertificationDossier
-from .logger import LoggerCertif
+from .logger import RUN_ID, LoggerCertif, tronquer
+from .tracing import environnement_trace, span
 
 
 class EtapeWorkflow(ABC):
     """Base class for workflow steps."""
 
-    def __init__(self, script: Path | None = None) -> None:
+    def __init__(
+        self,
+        script: Path | None = None,
+        id: str = "",
+        preconditions: list[str] | None = None,
+        outputs: list[str] | None = None,
+    ) -> None:
         self.script = script
+        self.id = id
+        self.preconditions = list(preconditions or [])
+        self.outputs = list(outputs or [])
         self.logger = LoggerCertif()
 
     @abstractmethod
@@ -24,19 +37,107 @@ class EtapeWorkflow(ABC):
 
 
 class ScriptStep(EtapeWorkflow):
-    """Generic step executing an external Python script."""
+    """Generic step executing an external Python script.
+
+    The script runs inside the dossier workspace, which is also exported as
+    ``CERTIF_WORKSPACE`` together with ``CERTIF_RUN_ID``, ``CERTIF_DOSSIER_ID``
+    and ``CERTIF_STEP_ID``, so that its relative inputs and outputs never clash
+    with those of another dossier and its log records can be correlated.
+    Captured output is logged truncated to :data:`workflow.logger.MAX_PAYLOAD`.
+
+    With ``en_processus`` set, the script runs inside the current interpreter
+    instead, so that its imports (pandas, openpyxl) and the workbook cache
+    stay warm between runs. This changes the working directory and the
+    environment of the process while the script runs, and is therefore
+    reserved to sequential executions such as the ``watch`` mode.
+    """
+
+    en_processus: bool = False
+
+    def commande(self) -> tuple[list[str], Path | None]:
+        """Return the command line and the directory to add to ``PYTHONPATH``.
+
+        Scripts living in a package are run as modules so that their relative
+        imports resolve.
+        """
+        script = Path(self.script).resolve()
+        if (script.parent / "__init__.py").exists():
+            module = f"{script.parent.name}.{script.stem}"
+            return [sys.executable, "-m", module], script.parent.parent
+        return [sys.executable, str(script)], None
 
     def executer(self, dossier: CertificationDossier) -> bool:
         if not self.script:
             self.logger.log_info("Aucun script a executer")
             return True
-        result = subprocess.run(["python", str(self.script)], capture_output=True, text=True)
+        if self.en_processus:
+            return self._executer_en_processus(dossier)
+        commande, chemin_import = self.commande()
+        env = dict(os.environ)
+        env.update(self._variables(dossier))
+        if chemin_import:
+            env["PYTHONPATH"] = os.pathsep.join(
+                p for p in (str(chemin_import), env.get("PYTHONPATH", "")) if p
+            )
+        with span(self.id, "script", commande=" ".join(commande[1:])) as details:
+            env.update(environnement_trace())
+            result = subprocess.run(
+                commande, capture_output=True, text=True, cwd=dossier.racine, env=env
+            )
+            details["code_retour"] = result.returncode
         if result.returncode != 0:
-            self.logger.log_error(result.stderr)
-        else:
-            self.logger.log_info(result.stdout)
+            self.logger.log_error(
+                f"Etape {self.id} en echec ({result.returncode}): {tronquer(result.stderr)}"
+            )
+        elif result.stdout:
+            self.logger.log_info(tronquer(result.stdout))
         return result.returncode == 0
 
+    def _variables(self, dossier: CertificationDossier) -> dict[str, str]:
+        """Return the environment variables describing the run to the script."""
+        return {
+            "CERTIF_WORKSPACE": str(dossier.racine.resolve()),
+            "CERTIF_RUN_ID": RUN_ID,
+            "CERTIF_DOSSIER_ID": dossier.id,
+            "CERTIF_STEP_ID": self.id,
+        }
+
+    def _executer_en_processus(self, dossier: CertificationDossier) -> bool:
+        """Run the script with :mod:`runpy` inside the dossier workspace."""
+        commande, chemin_import = self.commande()
+        variables = self._variables(dossier)
+        anciennes = {cle: os.environ.get(cle) for cle in variables}
+        repertoire, arguments = os.getcwd(), sys.argv
+        if chemin_import and str(chemin_import) not in sys.path:
+            sys.path.insert(0, str(chemin_import))
+        code = 0
+        with span(self.id, "script", commande=" ".join(commande[1:]), en_processus=True) as details:
+            os.environ.update(variables)
+            os.chdir(dossier.racine)
+            sys.argv = [commande[-1]]
+            try:
+                if chemin_import:
+                    runpy.run_module(commande[-1], run_name="__main__", alter_sys=True)
+                else:
+                    runpy.run_path(commande[-1], run_name="__main__")
+            except SystemExit as exc:
+                code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+            except Exception as exc:  # a broken script must not stop the process
+                self.logger.log_error(f"Etape {self.id} en erreur: {exc}")
+                code = 1
+            finally:
+                os.chdir(repertoire)
+                sys.argv = arguments
+                for cle, valeur in anciennes.items():
+                    if valeur is None:
+                        os.environ.pop(cle, None)
+                    else:
+                        os.environ[cle] = valeur
+            details["code_retour"] = code
+        if code != 0:
+            self.logger.log_error(f"Etape {self.id} en echec ({code})")
+        return code == 0
+
 
 class CheckPreuves(ScriptStep):
     """Step verifying evidences."""
@@ -58,5 +159,9 @@ class CheckExigences(ScriptStep):
     """Step verifying documentary requirements."""
 
 
+class Validation(ScriptStep):
+    """Step evaluating every audit rule in one pass."""
+
+
 class GererRetours(ScriptStep):
     """Step handling evaluator feedback."""
@@ -0,0 +1,168 @@
+"""Watch the data of a dossier and re-run the steps affected by changes."""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Iterable
+
+from .engine import WorkflowCertifEngine
+from .instantane import releve
+from .models import CertificationDossier
+from .scheduler import ResultatEtape, chemins_chevauchent, construire_graphe, dependants
+from .steps import EtapeWorkflow, ScriptStep
+from .tracing import span
+
+
+def differences(
+    avant: dict[str, tuple[int, int]], apres: dict[str, tuple[int, int]]
+) -> set[str]:
+    """Return the paths added, removed or modified between two :func:`releve`."""
+    return {c for c in avant.keys() | apres.keys() if avant.get(c) != apres.get(c)}
+
+
+class Surveillance:
+    """Poll the data directory of a dossier and re-run the affected steps.
+
+    Each changed file is mapped to the steps declaring it, or a directory
+    containing it, in their ``preconditions``; those steps and the steps
+    depending on them are re-run in declaration order inside the current
+    process, where scripts keep their imports and caches warm.
+
+    Parameters
+    ----------
+    engine : WorkflowCertifEngine
+        Engine holding the loaded steps; its memoisation skips steps whose
+        inputs are byte-identical despite a new mtime.
+    dossier : CertificationDossier
+        Watched dossier; its ``chemin_dossier`` is polled and its status is
+        saved after every run.
+    intervalle : float
+        Seconds between two polls.
+    delai : float
+        Debouncing delay: a run starts once the directory has been stable
+        for this many seconds, so that a workbook being saved is read whole.
+    rapporter : Callable[[list[ResultatEtape]], None] | None
+        Called with the results of every run.
+    """
+
+    def __init__(
+        self,
+        engine: WorkflowCertifEngine,
+        dossier: CertificationDossier,
+        intervalle: float = 0.5,
+        delai: float = 0.3,
+        rapporter: Callable[[list[ResultatEtape]], None] | None = None,
+    ) -> None:
+        self.engine = engine
+        self.dossier = dossier
+        self.intervalle = intervalle
+        self.delai = delai
+        self.rapporter = rapporter
+        self.graphe = construire_graphe(engine.etapes)
+        self._releve: dict[str, tuple[int, int]] = {}
+        self._arret = threading.Event()
+        for etape in engine.etapes:
+            if isinstance(etape, ScriptStep):
+                etape.en_processus = True
+
+    def _relatif(self, chemin: str) -> str:
+        """Return ``chemin``, relative to the data directory, relative to the workspace."""
+        absolu = os.path.abspath(os.path.join(self.dossier.chemin_dossier, chemin))
+        return Path(os.path.relpath(absolu, os.path.abspath(self.dossier.racine))).as_posix()
+
+    def etapes_affectees(self, changements: Iterable[str]) -> list[EtapeWorkflow]:
+        """Return, in declaration order, the steps to re-run after ``changements``.
+
+        ``changements`` are paths relative to the data directory.
+        """
+        chemins = [self._relatif(c) for c in changements]
+        indices: set[int] = set()
+        for i, etape in enumerate(self.engine.etapes):
+            if any(chemins_chevauchent(p, c) for p in etape.preconditions for c in chemins):
+                indices.add(i)
+                indices |= dependants(self.graphe, i)
+        return [self.engine.etapes[i] for i in sorted(indices)]
+
+    def relancer(self, etapes: Iterable[EtapeWorkflow]) -> list[ResultatEtape]:
+        """Run ``etapes`` in order and update the dossier status.
+
+        A step depending on a failed or cancelled step is reported as
+        ``"annule"`` without being run.
+        """
+        index = {id(e): i for i, e in enumerate(self.engine.etapes)}
+        resultats: list[ResultatEtape] = []
+        echoues: set[int] = set()
+        with span("surveillance", "workflow", dossier_id=self.dossier.id) as details:
+            for etape in etapes:
+                i = index[id(etape)]
+                if self.graphe[i] & echoues:
+                    resultats.append(ResultatEtape(etape.id, "annule"))
+                    echoues.add(i)
+                    continue
+                resultats.append(self.engine.lancer_etape(etape, self.dossier))
+                if not resultats[-1].ok:
+                    echoues.add(i)
+            details["etapes"] = len(resultats)
+        self.engine.fs.invalider()
+        # statut.txt reflects the last run of every step, not only this batch
+        self.engine.resultats = [
+            r for r in self.engine.resultats if r.id not in {n.id for n in resultats}
+        ] + resultats
+        echec = any(r.statut != "succes" for r in self.engine.resultats)
+        self.dossier.statut = "echec" if echec else "termine"
+        self.dossier.sauvegarder_statut()
+        # outputs written under the data directory must not trigger a new run
+        self._releve = releve(self.dossier.chemin_dossier)
+        if self.rapporter:
+            self.rapporter(resultats)
+        return resultats
+
+    def attendre_changements(self) -> set[str]:
+        """Block until the data directory changed then settled, and return the changes.
+
+        Returns an empty set when :meth:`arreter` is called or when the
+        directory settled back to its previous state.
+        """
+        actuel = self._releve
+        while actuel == self._releve:
+            if self._arret.wait(self.intervalle):
+                return set()
+            actuel = releve(self.dossier.chemin_dossier)
+        while True:
+            if self._arret.wait(self.delai):
+                return set()
+            suivant = releve(self.dossier.chemin_dossier)
+            if suivant == actuel:
+                break
+            actuel = suivant
+        return differences(self._releve, actuel)
+
+    def surveiller(self, cycles: int | None = None) -> None:
+        """Run every step once, then re-run the affected steps on each change.
+
+        Parameters
+        ----------
+        cycles : int | None
+            Stop after this many change-triggered runs; run until
+            :meth:`arreter` otherwise.
+        """
+        self._arret.clear()
+        self.relancer(self.engine.etapes)
+        effectues = 0
+        while cycles is None or effectues < cycles:
+            changements = self.attendre_changements()
+            if self._arret.is_set():
+                return
+            if not changements:
+                continue
+            etapes = self.etapes_affectees(changements)
+            for etape in etapes:
+                etape.logger.log_info(f"Relance de {etape.id} apres modification")
+            self.relancer(etapes)
+            effectues += 1
+
+    def arreter(self) -> None:
+        """Stop :meth:`surveiller` at its next poll."""
+        self._arret.set()
@@ -0,0 +1,223 @@
+"""Timing spans exported in the Chrome trace event format.
+
+Tracing is off unless :func:`activer_trace` is called, in which case spans
+are recorded as complete (``"X"``) events with wall-clock timestamps, so that
+events from several processes share one timeline. The trace directory and
+the enclosing span are exported as ``CERTIF_TRACE_DIR`` and
+``CERTIF_TRACE_PARENT``: step scripts started by the engine activate tracing
+on import and write their events to a fragment file when they exit, and
+:func:`ecrire_trace` merges every fragment of the run into
+``trace-<run_id>.json``, which Perfetto or ``chrome://tracing`` can open.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextvars
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, TypeVar
+
+from .logger import RUN_ID, identifiants
+
+TRACE_ENV = "CERTIF_TRACE_DIR"
+PARENT_ENV = "CERTIF_TRACE_PARENT"
+FRAGMENT_SUFFIX = ".part.json"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_PARENT: contextvars.ContextVar[str | None] = contextvars.ContextVar("trace_parent", default=None)
+
+
+class Traceur:
+    """Collect the spans of the current process.
+
+    Parameters
+    ----------
+    repertoire : Path
+        Directory receiving the fragment file of the process.
+    nom : str
+        Process name shown on the timeline.
+    """
+
+    def __init__(self, repertoire: Path, nom: str) -> None:
+        self.repertoire = repertoire
+        self.nom = nom
+        self.pid = os.getpid()
+        self.evenements: list[dict[str, Any]] = []
+        self._compteur = itertools.count(1)
+        self._verrou = threading.Lock()
+
+    def _processus_courant(self) -> None:
+        """Drop the events inherited from a parent process after a fork."""
+        if os.getpid() != self.pid:
+            self.pid = os.getpid()
+            self.evenements = []
+
+    def nouvel_id(self) -> str:
+        """Return a span identifier unique within the run."""
+        return f"{os.getpid()}.{next(self._compteur)}"
+
+    def ajouter(self, evenement: dict[str, Any]) -> None:
+        """Record ``evenement``."""
+        with self._verrou:
+            self._processus_courant()
+            self.evenements.append(evenement)
+
+    def ecrire_fragment(self) -> Path | None:
+        """Write the events of the process to its fragment file and forget them."""
+        with self._verrou:
+            self._processus_courant()
+            if not self.evenements:
+                return None
+            meta = {
+                "name": "process_name",
+                "ph": "M",
+                "pid": self.pid,
+                "args": {"name": f"{self.nom} ({self.pid})"},
+            }
+            evenements, self.evenements = [meta, *self.evenements], []
+        self.repertoire.mkdir(parents=True, exist_ok=True)
+        fragment = self.repertoire / f"{RUN_ID}-{self.pid}{FRAGMENT_SUFFIX}"
+        with fragment.open("a", encoding="utf-8") as fh:
+            for evenement in evenements:
+                fh.write(json.dumps(evenement, ensure_ascii=False, default=str) + "\n")
+        return fragment
+
+
+_TRACEUR: Traceur | None = None
+
+
+def activer_trace(repertoire: Path, nom: str | None = None) -> Traceur:
+    """Enable tracing for this process and the processes it starts."""
+    global _TRACEUR
+    repertoire = repertoire.resolve()
+    os.environ[TRACE_ENV] = str(repertoire)
+    _TRACEUR = Traceur(repertoire, nom or Path(sys.argv[0]).stem or "python")
+    return _TRACEUR
+
+
+def desactiver_trace() -> None:
+    """Disable tracing, dropping the events not yet written."""
+    global _TRACEUR
+    _TRACEUR = None
+    os.environ.pop(TRACE_ENV, None)
+
+
+def trace_active() -> bool:
+    """Return ``True`` if spans are being recorded."""
+    return _TRACEUR is not None
+
+
+def environnement_trace() -> dict[str, str]:
+    """Return the variables propagating the trace context to a child process."""
+    if _TRACEUR is None:
+        return {}
+    env = {TRACE_ENV: str(_TRACEUR.repertoire)}
+    parent = _PARENT.get() or os.environ.get(PARENT_ENV)
+    if parent:
+        env[PARENT_ENV] = parent
+    return env
+
+
+@contextmanager
+def span(nom: str, categorie: str = "workflow", **args: Any) -> Iterator[dict[str, Any]]:
+    """Record the execution of the enclosed block as a span.
+
+    The yielded mapping holds the span arguments; callers add results such as
+    row counts to it. Run, dossier and step identifiers are added
+    automatically. Without an active tracer the block just runs.
+    """
+    traceur = _TRACEUR
+    if traceur is None:
+        yield args
+        return
+    ident = traceur.nouvel_id()
+    parent = _PARENT.get() or os.environ.get(PARENT_ENV)
+    jeton = _PARENT.set(ident)
+    debut = time.time_ns()
+    try:
+        yield args
+    except BaseException as exc:
+        args["erreur"] = repr(exc)
+        raise
+    finally:
+        fin = time.time_ns()
+        _PARENT.reset(jeton)
+        traceur.ajouter(
+            {
+                "name": nom,
+                "cat": categorie,
+                "ph": "X",
+                "ts": debut / 1000,
+                "dur": (fin - debut) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {**identifiants(), "id": ident, "parent": parent, **args},
+            }
+        )
+
+
+def trace(categorie: str) -> Callable[[F], F]:
+    """Decorator recording each call as a span named after the function.
+
+    The length of the result, when it has one, is recorded as ``lignes``.
+    """
+
+    def decorateur(func: F) -> F:
+        @functools.wraps(func)
+        def enveloppe(*args: Any, **kwargs: Any) -> Any:
+            if _TRACEUR is None:
+                return func(*args, **kwargs)
+            with span(func.__name__, categorie) as details:
+                resultat = func(*args, **kwargs)
+                if hasattr(resultat, "__len__"):
+                    details["lignes"] = len(resultat)
+                return resultat
+
+        return enveloppe  # type: ignore[return-value]
+
+    return decorateur
+
+
+def ecrire_fragment() -> Path | None:
+    """Write the pending spans of this process, if tracing is active."""
+    return _TRACEUR.ecrire_fragment() if _TRACEUR else None
+
+
+def ecrire_trace(sortie: Path | None = None) -> Path | None:
+    """Merge the fragments of the run into one Chrome trace file.
+
+    Returns
+    -------
+    Path | None
+        The trace file, ``trace-<run_id>.json`` in the trace directory by
+        default, or ``None`` if tracing is not active.
+    """
+    if _TRACEUR is None:
+        return None
+    ecrire_fragment()
+    repertoire = _TRACEUR.repertoire
+    evenements = []
+    for fragment in sorted(repertoire.glob(f"{RUN_ID}-*{FRAGMENT_SUFFIX}")):
+        with fragment.open("r", encoding="utf-8") as fh:
+            evenements.extend(json.loads(line) for line in fh if line.strip())
+        fragment.unlink()
+    sortie = sortie or repertoire / f"trace-{RUN_ID}.json"
+    sortie.write_text(
+        json.dumps({"traceEvents": evenements, "displayTimeUnit": "ms"}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    return sortie
+
+
+if os.environ.get(TRACE_ENV):
+    activer_trace(Path(os.environ[TRACE_ENV]), os.environ.get("CERTIF_STEP_ID"))
+    atexit.register(ecrire_fragment)